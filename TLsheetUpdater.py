@@ -1,122 +1,27 @@
 # app.py
 # TL Sheet Updater and Auditor Streamlit Application
+# The loading, planning, writing and validation logic lives in tl_engine.py; this file is the Streamlit UI.
 
 import streamlit as st
-import gspread
-from google.oauth2.service_account import Credentials as ServiceAccountCredentials # Though using OAuth now
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow # For OAuth
-import os.path # For checking credentials file
-
-from datetime import datetime, timedelta
-import pytz
+
+from datetime import datetime
 import pandas as pd
-import requests
+import numpy as np
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
 import io
-import zipfile
+import importlib.util
 import traceback
-import re
-
-# --- Configuration (Part 2 - Adapted for Streamlit) ---
-# Ensure these IDs and names are correct
-SOURCE_SPREADSHEET_ID = '1Fo3-zzub663AnMLIPpgHVpP5Dsb7Zk2H554PFDHliY8'
-DEST_SPREADSHEET_ID = '17SFltoaYiEVVHDN7flctrHn1TKj01xCCyrsoiCN7L8c'
-SOURCE_SHEET_INDEX = 0 # 'Form responses 1'
-# DEST_TARGET_MONTH_SHEET_NAME will be set by user input
-
-EXCEL_SHAREPOINT_URL = 'https://panaceasolutionsllc-my.sharepoint.com/:x:/p/saqib/EQuk1cHbsH9KtafkGnzmaiABUBtt4x-5vamjr5hdpGsQwg'
-
-# Column indices (0-based for reading lists of lists from gspread)
-# Source Sheet (SS1 - 'Form responses 1')
-SRC_COL_DATE_OF_SERVICE = 2
-SRC_COL_COVERAGE_TYPE = 3
-SRC_COL_PROVIDER_NAME_READ = 4 # For validation
-SRC_COL_SCHEDULED_ZOOM = 6
-SRC_COL_UPLOADED_EOD = 7
-SRC_COL_SCRIBE_NAME = 13
-
-# Destination Sheet (SS2 - 'May' tab, etc.)
-DEST_COL_A_SCRIBE_NAME_READ = 0
-DEST_COL_B_LEAD_READ = 1
-DEST_COL_C_DATE_READ = 2
-DEST_COL_E_TASK_ASSIGNED_READ = 4
-DEST_COL_F_PROVIDER_COVERED_READ = 5
-DEST_COL_Q_SCHEDULED_READ = 16
-DEST_COL_R_UPLOADED_READ = 17
-
-# Column numbers (1-based for gspread cell updates)
-DEST_COL_Q_SCHEDULED_WRITE = 17
-DEST_COL_R_UPLOADED_WRITE = 18
-
-SPECIAL_PROVIDER_FULL_NAMES = [
-    "Alison Blake", "Amanda DeBois", "Heather Reynolds",
-    "Melanie Arrington", "Nikki Kelly", "Sarah Driggs", "Danelle Schmutz"
-]
-
-# !!! USER ACTION REQUIRED: Verify/Update this list precisely !!!
-# Providers managed by "Saqib Sherwani" - names as they appear in SS2 Column F
-MY_MANAGED_PROVIDERS = [
-    "Erin Henderson",
-    "Kei Batangan",
-    "Dr. Christine Potterjones", # Corrected from "Dr. Christine Potterjones" if that was a typo
-    "Amanda Reda Goglio",
-    "Dr. Kirmani Moe",
-    "Dr. Mark Basham",
-    "Alison Blake",       # Also in SPECIAL_PROVIDER_FULL_NAMES
-    "Amanda DeBois",      # Also in SPECIAL_PROVIDER_FULL_NAMES
-    "Heather Reynolds",   # Also in SPECIAL_PROVIDER_FULL_NAMES
-    "Melanie Arrington",  # Also in SPECIAL_PROVIDER_FULL_NAMES
-    "Nikki Kelly",        # Also in SPECIAL_PROVIDER_FULL_NAMES
-    "Sarah Driggs",       # Also in SPECIAL_PROVIDER_FULL_NAMES
-    "Danelle Schmutz",    # Also in SPECIAL_PROVIDER_FULL_NAMES
-    "Celeste Callinan",
-    "Seana Wishart",
-    "Beth Sanford",
-    "Dr. Kaleb Wartgow",
-    "Chinor Fattahi"
-    # Add any other specific providers from SS2 Col F that are managed by Saqib Sherwani
-    # and remove any that are not. The list you provided has been used here.
-    # Ensure these names are exactly as they appear in SS2, Column F.
-]
-
-
-# Path to your OAuth credentials.json file
-CREDENTIALS_FILE = 'credentials.json' # Download from Google Cloud Console
-TOKEN_FILE = 'token.json' # Will be created after first successful auth
-OAUTH_SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
-
-
-# --- Helper Functions (Part 3 - Adapted for Streamlit) ---
-
-# @st.cache_data # Cache simple parsing functions # Removed cache for now from normalize, not a heavy func
-def normalize_provider_name(name_str):
-    if not isinstance(name_str, str): return ""
-    name = str(name_str).strip()
-    name = re.sub(r'^[Dd][Rr][sS]?\.\s*', '', name)
-    suffixes_patterns = [
-        r',\s*NP-C', r',\s*FNP-C', r',\s*PA-C', r',\s*NP', r',\s*PA',
-        r',\s*FNP', r',\s*Ng', r',\s*APRN', r',\s*MD', r',\s*DO', r',\s*DNP',
-        r'\s+NP-C$', r'\s+FNP-C$', r'\s+PA-C$', r'\s+NP$', r'\s+PA$',
-        r'\s+FNP$', r'\s+Ng$', r'\s+APRN$', r'\s+MD$', r'\s+DO$', r'\s+DNP$'
-    ]
-    for suffix_pattern in suffixes_patterns:
-        name = re.sub(suffix_pattern, '', name, flags=re.IGNORECASE)
-    name = re.sub(r'\s*\([^)]*\)$', '', name)
-    name = name.replace(',', '')
-    return name.strip().lower()
-
-# @st.cache_data # Removed cache, parse_date_flexible is called many times with different inputs
-def parse_date_flexible(date_str):
-    if not date_str or not isinstance(date_str, str): return None
-    date_str = date_str.strip()
-    formats_to_try = ["%d/%m/%Y", "%m/%d/%Y", "%d/%m/%y", "%m/%d/%y", "%Y-%m-%d"]
-    for fmt in formats_to_try:
-        try: return datetime.strptime(date_str, fmt).date()
-        except ValueError: continue
-    try: return datetime.fromisoformat(date_str.split(' ')[0]).date()
-    except ValueError: pass
-    return None
+import time
+import threading
+import contextlib
+
+from tl_engine import (
+    notify, authorize_service_account, cache_stats, instrumented_run, load_team_config, load_snapshots, list_month_tabs, run_update, run_verify, render_finding,
+    run_update_months, run_verify_months, combine_month_tables, snapshot_name_resolution, IST_TIMEZONE, default_cutoff_date, current_month_name,
+    UPDATE_KIND_CELLS, UPDATE_KIND_EXCEL_MISMATCH, UPDATE_KIND_SS1_R_INFO, UPDATE_KIND_CONFLICT,
+)
+
+notify.use(st) # Engine messages show up as st.error / st.warning / st.info / st.success
 
 @st.cache_resource # Cache the gspread client resource
 def authenticate_gspread_service_account():
@@ -133,8 +38,7 @@ def authenticate_gspread_service_account():
             return None
 
         # Authorize the client
-        creds = ServiceAccountCredentials.from_service_account_info(creds_dict, scopes=OAUTH_SCOPES)
-        client = gspread.authorize(creds)
+        client = authorize_service_account(creds_dict)
         st.success("Successfully authenticated with Google Sheets using Service Account!")
         return client
 
@@ -144,183 +48,6 @@ def authenticate_gspread_service_account():
         return None
 
 
-@st.cache_data(ttl=3600)
-def load_and_map_excel_data(_excel_url, _special_provider_full_names_list, _date_parser_func, _cutoff_date):
-    # st.info(f"Downloading Excel data (up to {_cutoff_date.strftime('%Y-%m-%d')})...")
-    if "?" in _excel_url: download_url = _excel_url + "&download=1"
-    else: download_url = _excel_url + "?download=1"
-
-    excel_lookup_dict = {}; dynamic_excel_col_for_provider = {}
-    try:
-        headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
-        response = requests.get(download_url, headers=headers, timeout=45, allow_redirects=True)
-        response.raise_for_status()
-        # st.info("Excel: Initial HTTP request successful.")
-        if not response.content.startswith(b'PK\x03\x04'):
-            st.error("Excel Error: Downloaded content is not a valid Excel file (PK header missing)."); return None, None
-        
-        excel_content_io = io.BytesIO(response.content)
-        df_excel = pd.read_excel(excel_content_io, sheet_name="Count", engine='openpyxl', header=1)
-        # st.info(f"Excel: Successfully read 'Count' tab. Columns: {df_excel.columns.tolist()}")
-
-        date_column_name = None
-        for col in df_excel.columns:
-            if str(col).strip().lower() == 'date': date_column_name = col; break
-        if not date_column_name:
-            if len(df_excel.columns) > 1 and 'unnamed: 0' in str(df_excel.columns[0]).lower():
-                potential_date_col = df_excel.columns[1]
-                if str(potential_date_col).strip().lower() == 'date': date_column_name = potential_date_col
-                elif df_excel[potential_date_col].astype(str).str.contains(r'\d{1,2}[/-]\d{1,2}[/-]\d{2,4}',regex=True).any():
-                    date_column_name = potential_date_col; st.info(f"Excel: Guessed Date column: {date_column_name}")
-            elif 'Date' in df_excel.columns: date_column_name = 'Date'
-        if not date_column_name: st.error("Excel Error: 'Date' column not identified."); return None, None
-        # st.info(f"Excel: Using '{date_column_name}' as Date column.")
-
-        def convert_excel_date(val):
-            if pd.isna(val): return None
-            if isinstance(val, datetime): return val.date()
-            parsed_dt = _date_parser_func(str(val).strip())
-            if parsed_dt: return parsed_dt
-            excel_formats = ["%m/%d/%Y", "%m/%d/%y", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d"]
-            for fmt in excel_formats:
-                try: return datetime.strptime(str(val).strip().split(" ")[0], fmt.split(" ")[0]).date()
-                except ValueError: continue
-            return None
-        df_excel['ParsedDate'] = df_excel[date_column_name].apply(convert_excel_date)
-
-        for full_name in _special_provider_full_names_list:
-            first_name = full_name.split(' ')[0]
-            for col_hdr in df_excel.columns:
-                if str(col_hdr).strip().startswith(first_name + "/"):
-                    dynamic_excel_col_for_provider[full_name] = str(col_hdr).strip(); break
-            if full_name not in dynamic_excel_col_for_provider:
-                st.warning(f"Excel: Column not found for special provider: {full_name}")
-        # st.info(f"Excel: Dynamic provider mapping: {len(dynamic_excel_col_for_provider)} mapped.")
-        
-        for ss2_name, excel_col in dynamic_excel_col_for_provider.items():
-            if excel_col in df_excel.columns:
-                for _, row in df_excel.iterrows():
-                    p_date = row['ParsedDate']
-                    if p_date and p_date <= _cutoff_date:
-                        excel_lookup_dict[(p_date, ss2_name)] = row[excel_col]
-        # st.info(f"Excel lookup dict: {len(excel_lookup_dict)} entries (up to {_cutoff_date.strftime('%Y-%m-%d')}).")
-        if len(excel_lookup_dict) == 0 and df_excel['ParsedDate'].notna().any():
-             st.warning("Excel Warning: excel_lookup_dict empty but parseable dates exist. Check provider column names or date range.")
-        return excel_lookup_dict, dynamic_excel_col_for_provider
-    except Exception as e: st.error(f"Error loading/processing Excel: {e}"); return None, None
-
-@st.cache_data(ttl=3600)
-def build_ss1_validation_map(_source_data_list, _date_parser_func, _cutoff_date):
-    ss1_map = {}
-    if not _source_data_list or len(_source_data_list) <= 1: return ss1_map
-    processed_count = 0
-    for idx, row in enumerate(_source_data_list[1:]):
-        try:
-            req_idx = [SRC_COL_DATE_OF_SERVICE, SRC_COL_SCRIBE_NAME, SRC_COL_COVERAGE_TYPE, SRC_COL_PROVIDER_NAME_READ]
-            if len(row) <= max(req_idx): continue
-            p_date = _date_parser_func(str(row[SRC_COL_DATE_OF_SERVICE]))
-            if not p_date or p_date > _cutoff_date: continue
-            scribe_norm = str(row[SRC_COL_SCRIBE_NAME]).strip().lower() # Corrected: remove extra ']'
-            if scribe_norm:
-                key = (p_date, scribe_norm)
-                if key not in ss1_map: ss1_map[key] = []
-                ss1_map[key].append({
-                    "coverage_type": str(row[SRC_COL_COVERAGE_TYPE]).strip(), # Corrected: remove extra ']'
-                    "provider_name_ss1": str(row[SRC_COL_PROVIDER_NAME_READ]).strip(), # Corrected: remove extra ']'
-                    "ss1_row_num": idx + 2
-                })
-                processed_count +=1
-        except Exception: pass
-    return ss1_map
-
-# run_comprehensive_validation_checks (from previous response, with syntax corrections)
-def run_comprehensive_validation_checks(dest_data_list, ss1_reports_map, excel_data_lookup_dict,
-                                        special_provider_full_names, my_managed_providers_list,
-                                        date_parser_func, cutoff_date):
-    validation_errors = []
-    if not dest_data_list or len(dest_data_list) <= 1:
-        validation_errors.append("Validation Aborted: Destination data (SS2) is empty."); return validation_errors
-    
-    # st.info(f"Running Validation on SS2 (Lead: Saqib Sherwani, up to {cutoff_date.strftime('%Y-%m-%d')})...")
-    ss2_active_coverage_map = {}
-    processed_for_validation = 0
-
-    for idx, ss2_row_data in enumerate(dest_data_list[1:]):
-        ss2_row_num_1_based = idx + 2
-        try:
-            min_cols_ss2 = max(DEST_COL_A_SCRIBE_NAME_READ, DEST_COL_B_LEAD_READ, DEST_COL_C_DATE_READ,
-                               DEST_COL_E_TASK_ASSIGNED_READ, DEST_COL_F_PROVIDER_COVERED_READ)
-            if len(ss2_row_data) <= min_cols_ss2: continue
-            if str(ss2_row_data[DEST_COL_B_LEAD_READ]).strip() != "Saqib Sherwani": continue
-            
-            parsed_date_ss2 = date_parser_func(str(ss2_row_data[DEST_COL_C_DATE_READ]))
-            if not parsed_date_ss2 or parsed_date_ss2 > cutoff_date: continue
-
-            provider_ss2_raw = str(ss2_row_data[DEST_COL_F_PROVIDER_COVERED_READ]).strip() # Corrected
-            if provider_ss2_raw not in my_managed_providers_list: continue
-            
-            processed_for_validation += 1
-            scribe_name_ss2_raw = str(ss2_row_data[DEST_COL_A_SCRIBE_NAME_READ]).strip() # Corrected
-            task_ss2_raw = str(ss2_row_data[DEST_COL_E_TASK_ASSIGNED_READ]).strip()      # Corrected
-            task_ss2_norm = task_ss2_raw.lower()
-            norm_provider_ss2_f = normalize_provider_name(provider_ss2_raw)
-
-            if task_ss2_norm in ["primary coverage", "backup coverage"]:
-                ckey = (parsed_date_ss2, norm_provider_ss2_f)
-                if ckey not in ss2_active_coverage_map: ss2_active_coverage_map[ckey] = []
-                ss2_active_coverage_map[ckey].append({
-                    "scribe": scribe_name_ss2_raw, "task": task_ss2_raw,
-                    "ss2_row_num": ss2_row_num_1_based, "provider_as_in_col_f": provider_ss2_raw
-                })
-
-            is_special = provider_ss2_raw in special_provider_full_names
-            if is_special:
-                excel_key = (parsed_date_ss2, provider_ss2_raw)
-                excel_val = "No Excel Entry"; excel_num_count = 0
-                if excel_data_lookup_dict and excel_key in excel_data_lookup_dict:
-                    excel_val = excel_data_lookup_dict[excel_key]
-                    try:
-                        if not pd.isna(excel_val) and str(excel_val).strip().upper() != "NW":
-                            excel_num_count = int(float(str(excel_val)))
-                    except ValueError: excel_num_count = 0
-                if excel_num_count > 0:
-                    if task_ss2_norm not in ["primary coverage", "backup coverage"]:
-                        validation_errors.append(f"VALIDATION (RMS): '{provider_ss2_raw}' on {parsed_date_ss2.strftime('%Y-%m-%d')} (SS2 Row {ss2_row_num_1_based}), Excel count '{excel_val}', but SS2 Task '{task_ss2_raw}' not Primary/Backup.")
-                elif task_ss2_norm in ["primary coverage", "backup coverage"]:
-                     validation_errors.append(f"VALIDATION (RMS): SS2 (Row {ss2_row_num_1_based}) assigns Task '{task_ss2_raw}' to '{provider_ss2_raw}' on {parsed_date_ss2.strftime('%Y-%m-%d')}, but Excel shows no positive count (found: '{excel_val}').")
-            else: # Non-Special
-                scribe_name_ss2_norm = scribe_name_ss2_raw.lower() # Already done, but good for clarity
-                if not scribe_name_ss2_norm and task_ss2_norm in ["primary coverage", "backup coverage"]:
-                    validation_errors.append(f"VALIDATION (Non-RMS): SS2 Row {ss2_row_num_1_based}, Task '{task_ss2_raw}', Scribe Name missing for Provider '{provider_ss2_raw}'."); continue
-                ss1_key = (parsed_date_ss2, scribe_name_ss2_norm)
-                if ss1_key in ss1_reports_map:
-                    ss1_entries = [e for e in ss1_reports_map.get(ss1_key, []) if e["coverage_type"].lower().strip() in ["primary coverage", "backup coverage"]] # Corrected list comprehension
-                    if not ss1_entries and task_ss2_norm in ["primary coverage", "backup coverage"]:
-                        all_tasks = [e["coverage_type"] for e in ss1_reports_map.get(ss1_key, [])] # Corrected list comprehension
-                        details = f"(SS1 tasks: {', '.join(all_tasks)})" if all_tasks else "(SS1 no tasks)"
-                        validation_errors.append(f"VALIDATION (Non-RMS): SS2 (Row {ss2_row_num_1_based}: Scribe '{scribe_name_ss2_raw}', Provider '{provider_ss2_raw}') Task '{task_ss2_raw}' on {parsed_date_ss2.strftime('%Y-%m-%d')}, but no Primary/Backup in SS1. {details}")
-                    elif len(ss1_entries) > 1:
-                        validation_errors.append(f"VALIDATION (Non-RMS): Scribe '{scribe_name_ss2_raw}' on {parsed_date_ss2.strftime('%Y-%m-%d')} has multiple ({len(ss1_entries)}) Primary/Backup in SS1. SS2 (Row {ss2_row_num_1_based}) for '{provider_ss2_raw}' ambiguous.")
-                    elif len(ss1_entries) == 1:
-                        ss1_cov = ss1_entries[0]; norm_ss1_prov = normalize_provider_name(ss1_cov["provider_name_ss1"])
-                        if task_ss2_norm in ["primary coverage", "backup coverage"]:
-                            if norm_provider_ss2_f != norm_ss1_prov: # Comparing normalized names
-                                validation_errors.append(f"VALIDATION (Non-RMS): Scribe '{scribe_name_ss2_raw}' on {parsed_date_ss2.strftime('%Y-%m-%d')} (SS2 Row {ss2_row_num_1_based}), SS2 Provider '{provider_ss2_raw}', but SS1 (Row {ss1_cov['ss1_row_num']}) reports for '{ss1_cov['provider_name_ss1']}'.")
-                        else:
-                            validation_errors.append(f"VALIDATION (Non-RMS): SS1 (Row {ss1_cov['ss1_row_num']}) reports Scribe '{scribe_name_ss2_raw}' did '{ss1_cov['coverage_type']}' for '{ss1_cov['provider_name_ss1']}' on {parsed_date_ss2.strftime('%Y-%m-%d')}, but SS2 Task (Row {ss2_row_num_1_based}) is '{task_ss2_raw}'.")
-                elif task_ss2_norm in ["primary coverage", "backup coverage"]:
-                    validation_errors.append(f"VALIDATION (Non-RMS): SS2 (Row {ss2_row_num_1_based}: Scribe '{scribe_name_ss2_raw}', Provider '{provider_ss2_raw}') Task '{task_ss2_raw}' on {parsed_date_ss2.strftime('%Y-%m-%d')}, but NO entries in SS1 for Scribe/Date.")
-        except Exception: pass # Silently skip problematic rows in validation pass to avoid stopping the whole validation
-
-    for (date_k, norm_prov_k), assigns in ss2_active_coverage_map.items():
-        if not assigns: continue
-        prov_col_f_check = assigns[0]["provider_as_in_col_f"]
-        if prov_col_f_check in my_managed_providers_list and len(assigns) > 1:
-            details = "; ".join([f"Scribe '{a['scribe']}' Task='{a['task']}' (SS2 Row {a['ss2_row_num']})" for a in assigns])
-            validation_errors.append(f"VALIDATION (Uniqueness): Provider '{prov_col_f_check}' on {date_k.strftime('%Y-%m-%d')} has {len(assigns)} active coverages in SS2: {details}")
-    return validation_errors
-
-
 # --- Streamlit App UI and Logic (Part 4) ---
 st.set_page_config(page_title="TL Sheet Updater and Auditor", layout="wide")
 st.title("💻 TL Sheet Updater and Auditor")
@@ -336,251 +63,277 @@ if st.session_state.gc is None:
 
 gc = st.session_state.gc
 
+# --- Team Configuration ---
+# Leads, their managed providers and the RMS providers (tl_team.json, see tl_engine.load_team_config)
+try:
+    team_config = load_team_config()
+except Exception as e:
+    st.error(f"Could not read the team configuration: {e}")
+    st.stop()
+selected_leads = list(team_config.leads)
+if len(selected_leads) > 1:
+    selected_leads = st.sidebar.multiselect("Leads to Report:", selected_leads, default=selected_leads) or selected_leads
+
 # --- Date Filtering ---
-ist_timezone = pytz.timezone('Asia/Kolkata')
-now_ist = datetime.now(ist_timezone)
-yesterday_ist_date = (now_ist - timedelta(days=1)).date()
+now_ist = datetime.now(IST_TIMEZONE)
+yesterday_ist_date = default_cutoff_date(now_ist)
 st.sidebar.markdown(f"**Processing data up to (IST): {yesterday_ist_date.strftime('%Y-%m-%d')}**")
+refresh_requested = st.sidebar.button("Refresh data")
+rebuild_ss1_requested = st.sidebar.button("Rebuild SS1 cache",
+                                          help="Re-read every SS1 response, picking up edits to older ones. Refresh only fetches new responses; a full re-read also happens once a day.")
+collect_metrics = st.sidebar.toggle("Collect run metrics", value=True,
+                                    help="Time each stage and count API calls, bytes and cache hits for loads, updates and verifications.")
+
+# Snapshot of SS1, SS2 and the Excel lookup (and the list of month tabs) held in st.session_state, so widget
+# reruns (month change, button clicks) reuse already-fetched data instead of hitting the APIs again.
+SNAPSHOT_TTL_SECONDS = 900 # Refresh automatically after 15 minutes
+
+# Metrics of the last few instrumented runs (load / update / verify) for the sidebar panel; each run is also
+# appended to the engine's run log.
+RUN_METRICS_KEPT = 10
+
+@contextlib.contextmanager
+def instrumented_action(label):
+    with instrumented_run(label, enabled=collect_metrics) as metrics:
+        yield
+    if metrics:
+        history = st.session_state.setdefault('run_metrics', [])
+        history.insert(0, metrics.as_dict()); del history[RUN_METRICS_KEPT:]
+
+def _script_thread_initializer():
+    # Worker threads get this run's script context so engine messages (st.error etc.) render in the page
+    script_ctx = get_script_run_ctx()
+    return lambda: add_script_run_ctx(threading.current_thread(), script_ctx)
 
 # --- Month Selection ---
-months = ["May", "June", "July", "August", "September", "October", "November", "December"] 
-current_month_name = now_ist.strftime("%B")
-default_month_index = months.index(current_month_name) if current_month_name in months else months.index("May") # Default to May if current month not in list
-selected_month = st.sidebar.selectbox("Select Month to Process:", months, index=default_month_index)
-# DEST_TARGET_MONTH_SHEET_NAME is dynamically set by selected_month for this session
+# Month tabs are discovered from SS2 (any tab named after a month); the fixed list is only a fallback.
+FALLBACK_MONTHS = ["May", "June", "July", "August", "September", "October", "November", "December"]
+
+def discover_month_tabs(gspread_client, force_refresh=False):
+    cached = st.session_state.get('month_tabs')
+    if not force_refresh and cached and time.time() - cached["loaded_at"] < SNAPSHOT_TTL_SECONDS: return cached["tabs"]
+    tabs = list_month_tabs(gspread_client) or FALLBACK_MONTHS
+    st.session_state['month_tabs'] = {"tabs": tabs, "loaded_at": time.time()}
+    return tabs
+
+months = discover_month_tabs(gc, force_refresh=refresh_requested)
+this_month_name = current_month_name(now_ist)
+default_month_index = months.index(this_month_name) if this_month_name in months else 0 # First tab if current month not in list
+range_mode = st.sidebar.toggle("Process a range of months", help="Load SS1 and Excel once and process several SS2 month tabs together.")
+if range_mode and len(months) > 1:
+    range_start, range_end = st.sidebar.select_slider("Months to Process:", options=months,
+                                                      value=(months[max(0, default_month_index - 1)], months[default_month_index]))
+    selected_months = months[months.index(range_start): months.index(range_end) + 1]
+else:
+    selected_months = [st.sidebar.selectbox("Select Month to Process:", months, index=default_month_index)]
+selected_month = selected_months[0] if len(selected_months) == 1 else f"{selected_months[0]} – {selected_months[-1]}"
 
 # --- Data Loading ---
-# Using a general key for caching to force re-evaluation if month or gc changes
-# However, gc object itself might not be directly hashable for st.cache_data if its internal state changes
-# A simpler approach for Streamlit is to load data within button actions or manage via session_state for complex objects
-
-# Function to load data (not cached here, will be called inside button actions to ensure freshness if needed)
-# Placed with other helper functions
-
-@st.cache_data(ttl=900) # Cache for 15 minutes
-def load_all_data(_gc_client_ref, _source_id, _dest_id, _src_idx, _dest_month_name, 
-                  _excel_url, _special_providers, _date_parser, _cutoff_date):
-    # This function helps group data loading for caching.
-    # It calls get_sheet_data, which now needs the corrected gspread_client.
-    active_gc = st.session_state.get('gc', None)
-    if not active_gc:
-        st.warning("Gspread client not authenticated for load_all_data. Cannot load data.")
-        return None, None, None, None
-
-    data_ss1, _ = get_sheet_data(active_gc, _source_id, _src_idx, "Source SS1")
-    data_ss2, ws_ss2 = get_sheet_data(active_gc, _dest_id, _dest_month_name, "Destination SS2")
-    data_excel_lookup, _ = load_and_map_excel_data(_excel_url, _special_providers, _date_parser, _cutoff_date)
-    return data_ss1, data_ss2, ws_ss2, data_excel_lookup
-
-# Corrected get_sheet_data function
-def get_sheet_data(gspread_client, spreadsheet_id, sheet_name_or_index, sheet_type="Destination"):
-    try:
-        # Explicitly use open_by_key as it's known to work in your environment
-        if hasattr(gspread_client, 'open_by_key'):
-            spreadsheet = gspread_client.open_by_key(spreadsheet_id)
-        elif hasattr(gspread_client, 'open_by_id'): # Fallback, though likely to fail for you
-            st.warning(f"Attempting to use 'open_by_id' for {sheet_type} as 'open_by_key' was not found (this is unexpected).")
-            spreadsheet = gspread_client.open_by_id(spreadsheet_id)
-        else:
-            st.error(f"CRITICAL: gspread client for {sheet_type} has neither 'open_by_key' nor 'open_by_id'.")
-            return None, None
+def _snapshot_is_fresh(snap, cutoff_date):
+    return (snap is not None and snap["cutoff_date"] == cutoff_date
+            and time.time() - snap["loaded_at"] < SNAPSHOT_TTL_SECONDS)
 
-        # Proceed to get worksheet
-        if isinstance(sheet_name_or_index, int):
-            worksheet = spreadsheet.get_worksheet(sheet_name_or_index)
-        else:
-            worksheet = spreadsheet.worksheet(sheet_name_or_index)
-        
-        st.info(f"Successfully accessed the sheet: '{worksheet.title}' in '{spreadsheet.title}'")
-        return worksheet.get_all_values(), worksheet
-        
-    except gspread.exceptions.WorksheetNotFound:
-        st.error(f"Error: Tab '{sheet_name_or_index}' not found in {sheet_type} Spreadsheet (ID: {spreadsheet_id}).")
-    except AttributeError as ae: # Catch the specific error if it still occurs
-        st.error(f"AttributeError when trying to open {sheet_type} sheet (ID: {spreadsheet_id}, Tab: {sheet_name_or_index}): {ae}")
-        st.error("This indicates an issue with the gspread client object's methods. Please ensure gspread is correctly installed and authenticated.")
-        traceback.print_exc() # For more detailed error in logs
-    except Exception as e:
-        st.error(f"An unexpected error occurred reading {sheet_type} sheet (ID: {spreadsheet_id}, Tab: {sheet_name_or_index}): {e}")
-        traceback.print_exc()
-    return None, None
+def load_all_data(gspread_client, dest_month_names, cutoff_date, force_refresh=False, resync_source=False):
+    """
+    Returns {month: session snapshot} for dest_month_names, loading (together) only the tabs that are missing,
+    expired or forced. SS1 and the Excel lookup cover all months, so they are shared between the month snapshots.
+    A forced refresh syncs only new SS1 responses into the local store; resync_source rebuilds it from the whole sheet.
+    A month maps to None if its SS2 tab cannot be read.
+    """
+    snapshots = st.session_state.setdefault('data_snapshots', {})
+    stale = [m for m in dest_month_names if force_refresh or not _snapshot_is_fresh(snapshots.get(m), cutoff_date)]
+    if stale:
+        shared_snap = snapshots.get('_shared')
+        if force_refresh or not _snapshot_is_fresh(shared_snap, cutoff_date): shared_snap = None
+        label = ", ".join(f"'{m}'" for m in stale)
+        status = st.status(f"Loading data for {label}...", expanded=False)
+        with instrumented_action(f"load {label}"):
+            loaded, shared_snap = load_snapshots(
+                gspread_client, stale, cutoff_date, shared=shared_snap, previous={m: snapshots.get(m) for m in stale},
+                on_loaded=lambda source_label, elapsed: status.write(f"{source_label}: done in {elapsed:.1f} s"),
+                thread_initializer=_script_thread_initializer(), team_config=team_config, resync_source=resync_source)
+        failed = [m for m in stale if loaded[m] is None]
+        if len(failed) == len(stale): status.update(label=f"Could not load {label} from SS2", state="error")
+        else: status.update(label=f"Data for {label} loaded" + (f" ({', '.join(failed)} failed)" if failed else ""),
+                            state="error" if failed else "complete")
+        if shared_snap is not None: snapshots['_shared'] = shared_snap
+        for m in stale:
+            if loaded[m] is not None: snapshots[m] = loaded[m]
+            else: snapshots.pop(m, None)
+    return {m: snapshots.get(m) for m in dest_month_names}
+
+# --- Results Viewer ---
+# Update and validation results are kept in session_state as tables and shown through one paged grid,
+# so a month with thousands of lines costs one widget instead of one st.text per line.
+RESULTS_PAGE_SIZES = [50, 200, 1000]
+PARQUET_EXPORT = any(importlib.util.find_spec(engine) for engine in ("pyarrow", "fastparquet"))
+
+def _export_frame(table):
+    # Lists, tuples and mixed raw values are flattened to text so CSV/Parquet writers accept every column
+    return table.apply(lambda col: col if col.name == "date" or col.dtype != object
+                       else col.map(lambda v: v if v is None or isinstance(v, str) or (np.isscalar(v) and pd.isna(v)) else str(v)))
+
+def show_results_table(table, key, category_col, render_message=None, file_stem="results"):
+    """Filterable, paged view of a results table (one st.dataframe) plus CSV/Parquet export of the filtered rows."""
+    f1, f2, f3, f4 = st.columns(4)
+    categories = f1.multiselect(category_col.replace("_", " ").title(), sorted(table[category_col].dropna().unique()), key=f"{key}_cat")
+    scribe_q = f2.text_input("Scribe contains", key=f"{key}_scribe").strip().lower()
+    provider_q = f3.text_input("Provider contains", key=f"{key}_provider").strip().lower()
+    known_dates = table["date"].dropna()
+    date_range = f4.date_input("Date range", value=(known_dates.min(), known_dates.max()), key=f"{key}_dates") if len(known_dates) else ()
+
+    mask = pd.Series(True, index=table.index)
+    if categories: mask &= table[category_col].isin(categories)
+    if scribe_q: mask &= table["scribe"].fillna("").astype(str).str.lower().str.contains(scribe_q, regex=False)
+    if provider_q: mask &= table["provider"].fillna("").astype(str).str.lower().str.contains(provider_q, regex=False)
+    if len(date_range) == 2 and tuple(date_range) != (known_dates.min(), known_dates.max()): # Undated rows stay until the range is narrowed
+        mask &= table["date"].map(lambda d: d is not None and not pd.isna(d) and date_range[0] <= d <= date_range[1])
+    for col in ("month", "lead"): # Combined multi-month / multi-lead results
+        values = list(dict.fromkeys(table[col].dropna())) if col in table.columns else []
+        if len(values) > 1:
+            shown = st.multiselect(col.title(), values, key=f"{key}_{col}")
+            if shown: mask &= table[col].isin(shown)
+    filtered = table[mask]
+
+    p1, p2, p3 = st.columns([1, 1, 2])
+    page_size = p1.selectbox("Rows per page", RESULTS_PAGE_SIZES, key=f"{key}_page_size")
+    page_count = max(1, -(-len(filtered) // page_size))
+    page = p2.number_input(f"Page (of {page_count})", min_value=1, max_value=page_count, value=1, key=f"{key}_page")
+    p3.caption(f"{len(filtered)} of {len(table)} rows match the filters.")
+    page_rows = filtered.iloc[(page - 1) * page_size: page * page_size]
+    if render_message: # Report text is produced only for the rows on screen
+        page_rows = page_rows.assign(message=[render_message(r) for r in page_rows.itertuples(index=False)])
+        page_rows = page_rows[["message"] + [c for c in page_rows.columns if c != "message"]]
+    st.dataframe(_export_frame(page_rows), hide_index=True, width="stretch")
+
+    # The files are only built when a download button is clicked, not on every rerun
+    def csv_bytes(): return _export_frame(filtered).to_csv(index=False).encode("utf-8")
+    def parquet_bytes():
+        buffer = io.BytesIO(); _export_frame(filtered).to_parquet(buffer, index=False)
+        return buffer.getvalue()
+    d1, d2 = st.columns(2)
+    d1.download_button("Download CSV", csv_bytes, file_name=f"{file_stem}.csv", mime="text/csv", key=f"{key}_csv")
+    if PARQUET_EXPORT:
+        d2.download_button("Download Parquet", parquet_bytes, file_name=f"{file_stem}.parquet",
+                           mime="application/octet-stream", key=f"{key}_parquet")
+    else: d2.caption("Parquet export needs pyarrow.")
+
+def show_name_matches(matches):
+    """Expander listing the SS1 names matched to SS2 names by similarity, and whether this run used each match."""
+    if not len(matches): return
+    applied = int(matches["applied"].sum())
+    title = (f"{applied} SS1 names auto-resolved to SS2 names" if applied == len(matches)
+             else f"{len(matches)} SS1 names resemble SS2 names, {applied} applied")
+    with st.expander(f"{title} (review these)"):
+        st.caption("Names with no exact match in SS2 that were matched by similarity; 'kind' says whether the scribe or the provider, "
+                   "'applied' whether this run used the match. Updates use scribe matches only when name_matching.apply_to_updates "
+                   "is set in the team config.")
+        st.dataframe(_export_frame(matches), hide_index=True, width="stretch")
 
 # --- Main Application Logic ---
 st.header(f"Actions for Month: {selected_month}")
 
-# Load destination sheet first to check if tab exists
-dest_data, dest_worksheet = get_sheet_data(gc, DEST_SPREADSHEET_ID, selected_month, "Destination SS2")
-
-if dest_data and dest_worksheet:
-    # Load other data only if destination sheet is accessible
-    source_data, _ = get_sheet_data(gc, SOURCE_SPREADSHEET_ID, SOURCE_SHEET_INDEX, "Source SS1")
-    excel_data_lookup, _ = load_and_map_excel_data(EXCEL_SHAREPOINT_URL, SPECIAL_PROVIDER_FULL_NAMES, parse_date_flexible, yesterday_ist_date)
-
-    dest_lookup_map = {}
-    if len(dest_data) > 1:
-        for i, row in enumerate(dest_data[1:]):
-            try:
-                if len(row) > max(DEST_COL_A_SCRIBE_NAME_READ, DEST_COL_C_DATE_READ):
-                    p_date = parse_date_flexible(str(row[DEST_COL_C_DATE_READ]))
-                    if p_date and p_date <= yesterday_ist_date:
-                        s_norm = str(row[DEST_COL_A_SCRIBE_NAME_READ]).strip().lower()
-                        if s_norm: dest_lookup_map[(s_norm, p_date)] = i + 2
-            except: pass 
-    # st.info(f"Built SS2 lookup map with {len(dest_lookup_map)} entries for Scribe/Date matching (up to {yesterday_ist_date.strftime('%Y-%m-%d')}).")
+month_snapshots = load_all_data(gc, selected_months, yesterday_ist_date, force_refresh=refresh_requested or rebuild_ss1_requested,
+                                resync_source=rebuild_ss1_requested)
+for month in selected_months:
+    if month_snapshots[month] is None and len(selected_months) > 1:
+        st.error(f"Could not load data for sheet '{month}' in Destination (SS2); it is left out of this run.")
+loaded_snapshots = {m: snap for m, snap in month_snapshots.items() if snap is not None}
+results_key = "|".join(selected_months) # Results are kept per month selection
+
+if loaded_snapshots:
+    snapshot = next(iter(loaded_snapshots.values()))
+    loaded_at_ist = datetime.fromtimestamp(min(s["loaded_at"] for s in loaded_snapshots.values()), IST_TIMEZONE)
+    st.sidebar.caption(f"Data loaded at {loaded_at_ist.strftime('%H:%M:%S')} IST (auto-refresh after {SNAPSHOT_TTL_SECONDS // 60} min).")
+
+    ambiguous_dates = [(sheet, *entry) for sheet, date_col in
+                       [(f"SS2 {m}" if len(loaded_snapshots) > 1 else "SS2", s["ss2_index"].date_column) for m, s in loaded_snapshots.items()]
+                       + [("SS1", snapshot["source_date_column"])]
+                       for entry in date_col.ambiguous]
+    if ambiguous_dates:
+        with st.sidebar.expander(f"⚠️ {len(ambiguous_dates)} ambiguous dates (day/month order)"):
+            st.caption("These were read with the first matching format (day-first), but most of the column uses another format.")
+            st.dataframe(pd.DataFrame(ambiguous_dates, columns=["Sheet", "Value", "Read as", "Column format", "Would be"]), hide_index=True)
 
 
     # Button for Updating Patient Counts
     if st.button(f"Update TL Sheet with Patient Counts for '{selected_month}'"):
-        with st.spinner(f"Processing updates for {selected_month}... This may take a moment."):
-            updates_to_make = []
-            processed_details_update = [] # Renamed to avoid conflict if validation uses same name
-            excel_val_mismatches_upd = []
-            ss1_r_mismatches_upd = []
-            excel_processed_s2_rows_upd = set()
-
-            # Phase 1: Excel Updates
-            if excel_data_lookup is not None and len(dest_data) > 1:
-                for s2_idx, s2_row in enumerate(dest_data[1:]):
-                    s2_num = s2_idx + 2
-                    min_cols = max(DEST_COL_F_PROVIDER_COVERED_READ, DEST_COL_C_DATE_READ, DEST_COL_E_TASK_ASSIGNED_READ, DEST_COL_Q_SCHEDULED_READ, DEST_COL_R_UPLOADED_READ)
-                    if len(s2_row) <= min_cols: continue
-                    p_date_s2 = parse_date_flexible(str(s2_row[DEST_COL_C_DATE_READ]))
-                    if not p_date_s2 or p_date_s2 > yesterday_ist_date: continue
-                    prov_s2 = str(s2_row[DEST_COL_F_PROVIDER_COVERED_READ]).strip()
-
-                    if prov_s2 in SPECIAL_PROVIDER_FULL_NAMES:
-                        excel_processed_s2_rows_upd.add(s2_num)
-                        excel_key = (p_date_s2, prov_s2)
-                        if excel_key in excel_data_lookup:
-                            excel_raw_c = excel_data_lookup[excel_key]; excel_num_c = 0
-                            try:
-                                if not pd.isna(excel_raw_c) and str(excel_raw_c).strip().upper() != "NW":
-                                    excel_num_c = int(float(str(excel_raw_c)))
-                            except ValueError: excel_num_c = 0
-                            
-                            if excel_num_c > 0:
-                                task_raw = str(s2_row[DEST_COL_E_TASK_ASSIGNED_READ]).strip()
-                                if task_raw.lower() in ["primary coverage", "backup coverage"]:
-                                    ex_q = str(s2_row[DEST_COL_Q_SCHEDULED_READ]).strip()
-                                    ex_r = str(s2_row[DEST_COL_R_UPLOADED_READ]).strip()
-                                    q_u = False; r_u = False; q_m = f"Q Exists('{ex_q}')"; r_m = f"R Exists('{ex_r}')"
-                                    if not ex_q: updates_to_make.append(gspread.Cell(s2_num, DEST_COL_Q_SCHEDULED_WRITE, excel_num_c)); q_u=True; q_m=f"Q to {excel_num_c}"
-                                    if not ex_r: updates_to_make.append(gspread.Cell(s2_num, DEST_COL_R_UPLOADED_WRITE, excel_num_c)); r_u=True; r_m=f"R to {excel_num_c}"
-                                    if q_u or r_u: processed_details_update.append({"s":f"Excel-{prov_s2}","d":p_date_s2.strftime('%Y-%m-%d'),"dr":s2_num,"qn":q_m,"rs":r_m,"qa":q_u,"ra":r_u})
-                                else: excel_val_mismatches_upd.append(f"UPDATE EXCEL VAL: SS2R {s2_num} ('{prov_s2}', {p_date_s2}). ExcelCnt={excel_num_c}, SS2Task='{task_raw}'. No upd.")
-            # st.info(f"Revitalize Roster {len(excel_processed_s2_rows_upd)} rows for RMS providers.")
-
-            # Phase 2: SS1 Updates
-            if source_data and len(source_data) > 1:
-                for i, src_row in enumerate(source_data[1:]):
-                    try:
-                        if len(src_row) <= max(SRC_COL_COVERAGE_TYPE, SRC_COL_DATE_OF_SERVICE, SRC_COL_SCRIBE_NAME, SRC_COL_SCHEDULED_ZOOM, SRC_COL_UPLOADED_EOD): continue
-                        p_src_date = parse_date_flexible(str(src_row[SRC_COL_DATE_OF_SERVICE]))
-                        if not p_src_date or p_src_date > yesterday_ist_date: continue
-                        if str(src_row[SRC_COL_COVERAGE_TYPE]).strip().lower() not in ["primary coverage", "backup coverage"]: continue
-                        s_src_norm = str(src_row[SRC_COL_SCRIBE_NAME]).strip().lower()
-                        if not s_src_norm: continue
-                        
-                        match_key = (s_src_norm, p_src_date)
-                        if match_key in dest_lookup_map:
-                            dest_r_num = dest_lookup_map[match_key]
-                            if dest_r_num in excel_processed_s2_rows_upd: continue
-
-                            q_u_ss1=False; r_u_ss1=False; q_s_ss1="No Q change"; r_s_ss1="No R change"
-                            dest_idx = dest_r_num - 1
-                            
-                            ss2_target_row = dest_data[dest_idx] if 0 <= dest_idx < len(dest_data) else []
-                            
-                            ex_q = str(ss2_target_row[DEST_COL_Q_SCHEDULED_READ]).strip() if len(ss2_target_row) > DEST_COL_Q_SCHEDULED_READ else ""
-                            s_val_q = str(src_row[SRC_COL_SCHEDULED_ZOOM]).strip()
-                            if not ex_q and s_val_q: updates_to_make.append(gspread.Cell(dest_r_num, DEST_COL_Q_SCHEDULED_WRITE,s_val_q)); q_u_ss1=True; q_s_ss1=f"SS1:Q to '{s_val_q}'"
-                            elif ex_q: q_s_ss1=f"SS1:Q Exists('{ex_q}')"
-                            
-                            ex_r = str(ss2_target_row[DEST_COL_R_UPLOADED_READ]).strip() if len(ss2_target_row) > DEST_COL_R_UPLOADED_READ else ""
-                            s_val_r = str(src_row[SRC_COL_UPLOADED_EOD]).strip()
-                            if not ex_r and s_val_r: updates_to_make.append(gspread.Cell(dest_r_num,DEST_COL_R_UPLOADED_WRITE,s_val_r)); r_u_ss1=True; r_s_ss1=f"SS1:R to '{s_val_r}'"
-                            elif ex_r: 
-                                r_s_ss1=f"SS1:R Exists('{ex_r}')"
-                                if s_val_r and ex_r != s_val_r: ss1_r_mismatches_upd.append(f"SS1_R_INFO: Scribe {str(src_row[SRC_COL_SCRIBE_NAME])}, {p_src_date},DRow {dest_r_num}. DestR:'{ex_r}',SrcR:'{s_val_r}'. No upd.")
-                            
-                            if q_u_ss1 or r_u_ss1: processed_details_update.append({"s":str(src_row[SRC_COL_SCRIBE_NAME]),"d":p_src_date.strftime('%Y-%m-%d'),"dr":dest_r_num,"qn":q_s_ss1,"rs":r_s_ss1,"qa":q_u_ss1,"ra":r_u_ss1})
-                    except Exception: pass 
-            # st.info("Update EOD Report processing complete for other providers.")
-
-            if updates_to_make:
-                st.info(f"Attempting to apply {len(updates_to_make)} cell updates to '{dest_worksheet.title}'...")
-                try:
-                    dest_worksheet.update_cells(updates_to_make, value_input_option='USER_ENTERED')
-                    st.success(f"Successfully applied {len(updates_to_make)} cell updates!")
-                except Exception as e:
-                    st.error(f"Error applying updates to Google Sheet: {e}")
+        with st.spinner(f"Processing updates for {selected_month}... This may take a moment."), instrumented_action(f"update {selected_month}"):
+            if len(loaded_snapshots) == 1:
+                outcomes = {m: run_update(snap, yesterday_ist_date, team_config) for m, snap in loaded_snapshots.items()}
+                table = next(iter(outcomes.values())).table; name_matches = next(iter(outcomes.values())).name_matches
             else:
-                st.info("No updates to apply to the TL Sheet based on current data.")
-
-            # Display Summary of Updates
-            st.subheader("Update Process Summary:")
-            updated_rows_count = len(set(cell.row for cell in updates_to_make))
-            st.write(f"Number of unique destination rows with cell changes applied: {updated_rows_count}")
-            
-            actionable_details = [d for d in processed_details_update if d["qa"] or d["ra"]]
-            if actionable_details:
-                st.write("Details of updates made (up to 20 shown directly):")
-                display_lines = []
-                for detail in sorted(actionable_details, key=lambda x: (x["dr"], x["d"])):
-                    source_type = "Excel" if detail["s"].startswith("N/A (Excel") else "SS1"
-                    display_lines.append(f"- DestRow: {detail['dr']}, Date: {detail['d']}, Src: {source_type}, Scribe: {detail['s']}, Q: {detail['qn']}, R: {detail['rs']}")
-                
-                if len(display_lines) > 20:
-                    for line in display_lines[:20]: st.text(line)
-                    with st.expander(f"Show all {len(display_lines)} update details"):
-                        for line in display_lines: st.text(line)
-                else:
-                    for line in display_lines: st.text(line)
-            else: st.write("No values in TL Sheet were changed in this run.")
-
-            if excel_val_mismatches_upd:
-                st.warning("Excel Validation Mismatches During Update Phase (No update made for these):")
-                with st.expander("Show Excel Validation Mismatches"):
-                    for msg in excel_val_mismatches_upd: st.text(f"  - {msg}")
-            if ss1_r_mismatches_upd:
-                st.info("SS1 Column R Information (R not updated due to existing value or mismatch):")
-                with st.expander("Show SS1 R Mismatches/Info"):
-                    for msg in ss1_r_mismatches_upd: st.text(f"  - {msg}")
+                outcomes = run_update_months(loaded_snapshots, yesterday_ist_date, team_config, thread_initializer=_script_thread_initializer())
+                table = combine_month_tables({m: o.table for m, o in outcomes.items()})
+                name_matches = combine_month_tables({m: o.name_matches for m, o in outcomes.items()})
+            skipped_rows = sum(o.plan.skipped_rows for o in outcomes.values())
+            if skipped_rows: st.caption(f"{skipped_rows} rows unchanged since the last run were not re-planned.")
+            st.session_state.setdefault('update_results', {})[results_key] = {
+                "table": table, "updated_rows_count": sum(o.updated_rows_count for o in outcomes.values()), "name_matches": name_matches
+            }
         st.balloons()
 
+    update_result = st.session_state.get('update_results', {}).get(results_key)
+    if update_result:
+        st.subheader("Update Process Summary:")
+        st.write(f"Number of unique destination rows with cell changes applied: {update_result['updated_rows_count']}")
+        table = update_result["table"]; kinds = table["kind"].value_counts()
+        if not kinds.get(UPDATE_KIND_CELLS, 0): st.write("No values in TL Sheet were changed in this run.")
+        elif len(team_config.leads) > 1:
+            per_lead = table[table["kind"] == UPDATE_KIND_CELLS]["lead"].replace("", "(no lead)").value_counts()
+            st.caption("Rows updated per lead: " + ", ".join(f"{lead} {n}" for lead, n in per_lead.items()))
+        if kinds.get(UPDATE_KIND_EXCEL_MISMATCH, 0):
+            st.warning(f"{kinds[UPDATE_KIND_EXCEL_MISMATCH]} Excel validation mismatches during the update phase (no update made for these).")
+        if kinds.get(UPDATE_KIND_CONFLICT, 0):
+            st.warning(f"{kinds[UPDATE_KIND_CONFLICT]} conflicts: cells edited on the sheet since the data was loaded (not overwritten).")
+        if kinds.get(UPDATE_KIND_SS1_R_INFO, 0):
+            st.info(f"{kinds[UPDATE_KIND_SS1_R_INFO]} SS1 Column R notes (R not updated due to existing value or mismatch).")
+        show_name_matches(update_result["name_matches"])
+        show_results_table(table, key=f"upd_{results_key}", category_col="kind", file_stem=f"tl_updates_{'_'.join(selected_months)}")
+
 
     if st.button(f"Verfify Entries in '{selected_month}' TL Report"):
-        with st.spinner(f"Running comprehensive validation for {selected_month}..."):
-            ss1_val_map = {}
-            if source_data:
-                ss1_val_map = build_ss1_validation_map(source_data, parse_date_flexible, yesterday_ist_date)
-            
-            # Use the excel_data_lookup that was already loaded for the update phase if available
-            excel_lookup_for_val = excel_data_lookup if 'excel_data_lookup' in locals() and excel_data_lookup is not None else None
-
-
-            validation_issues = run_comprehensive_validation_checks(
-                dest_data, ss1_val_map, excel_lookup_for_val,
-                SPECIAL_PROVIDER_FULL_NAMES, MY_MANAGED_PROVIDERS,
-                parse_date_flexible, yesterday_ist_date
-            )
-
-            st.subheader(f"Data Validation Report (Lead: Saqib Sherwani, up to {yesterday_ist_date.strftime('%Y-%m-%d')})")
-            if validation_issues:
-                st.warning(f"Found {len(validation_issues)} issues in TL Reports:")
-                # Display logic for validation_issues (e.g., first 20 then expander)
-                if len(validation_issues) > 20:
-                    st.text("First 20 validation issues:")
-                    for i, error_msg in enumerate(validation_issues[:20]): st.text(f"  {i+1}. {error_msg}")
-                    with st.expander(f"Show all {len(validation_issues)} validation issues"):
-                        for i, error_msg in enumerate(validation_issues): st.text(f"  {i+1}. {error_msg}")
-                else:
-                    for i, error_msg in enumerate(validation_issues): st.text(f"  {i+1}. {error_msg}")
-            else:
-                st.success("No discrepancies found in SS2 for providers managed by Saqib Sherwani based on the defined validation rules.")
+        with st.spinner(f"Running comprehensive validation for {selected_month}..."), instrumented_action(f"verify {selected_month}"):
+            findings = (run_verify(snapshot, yesterday_ist_date, team_config) if len(loaded_snapshots) == 1
+                        else run_verify_months(loaded_snapshots, yesterday_ist_date, team_config=team_config))
+            name_matches = (snapshot_name_resolution(snapshot, team_config).matches if len(loaded_snapshots) == 1
+                            else combine_month_tables({m: snapshot_name_resolution(s, team_config).matches for m, s in loaded_snapshots.items()}))
+            st.session_state.setdefault('validation_results', {})[results_key] = {"findings": findings, "cutoff_date": yesterday_ist_date,
+                                                                                  "name_matches": name_matches}
         st.balloons()
+
+    validation_result = st.session_state.get('validation_results', {}).get(results_key)
+    if validation_result:
+        all_findings = validation_result["findings"]
+        show_name_matches(validation_result["name_matches"])
+        for lead in selected_leads: # One report per lead, all from the same validation pass
+            findings = all_findings[all_findings["lead"] == lead]
+            st.subheader(f"Data Validation Report (Lead: {lead}, up to {validation_result['cutoff_date'].strftime('%Y-%m-%d')})")
+            if len(findings):
+                st.warning(f"Found {len(findings)} issues in TL Reports:")
+                show_results_table(findings, key=f"val_{results_key}_{lead}", category_col="rule", render_message=render_finding,
+                                   file_stem=f"tl_validation_{'_'.join(selected_months)}_{lead.replace(' ', '_')}")
+            else:
+                st.success(f"No discrepancies found in SS2 for providers managed by {lead} based on the defined validation rules.")
 else:
     st.error(f"Could not load data for sheet '{selected_month}' in Destination (SS2). Please ensure the tab exists and try again, or select a different month.")
 
+# --- Run Metrics ---
+with st.sidebar.expander("Run metrics"):
+    run_history = st.session_state.get('run_metrics', [])
+    if run_history:
+        run_index = st.selectbox("Run", range(len(run_history)), key="metrics_run", format_func=lambda i: (
+            f"{run_history[i]['run']} at {datetime.fromisoformat(run_history[i]['started']).astimezone(IST_TIMEZONE).strftime('%H:%M:%S')}"))
+        run = run_history[run_index]
+        st.caption(f"{run['wall_seconds']:.2f} s wall time" + (f"; failed: {run['error']}" if run["error"] else "")
+                   + ". Stage times are summed over concurrent workers.")
+        if run["stages"]: st.dataframe(pd.DataFrame(run["stages"]), hide_index=True)
+        if run["http"]: st.dataframe(pd.DataFrame(run["http"]), hide_index=True)
+        if run["counters"]: st.dataframe(pd.DataFrame(list(run["counters"].items()), columns=["event", "count"]), hide_index=True)
+    else:
+        st.caption("No runs recorded yet." if collect_metrics else "Run metrics are switched off.")
+    st.caption("Process-wide caches") # SS1 index / Excel lookup caches, across sessions
+    st.dataframe(pd.DataFrame(cache_stats()), hide_index=True)
+
 st.sidebar.markdown("---")
 st.sidebar.info("This app was created by Saqib Sherwani for his own use - automating patient count entries in TL Sheet.")
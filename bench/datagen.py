@@ -0,0 +1,88 @@
+# bench/datagen.py
+# Synthetic SS1 form responses, an SS2 month tab and the SharePoint 'Count' workbook, shaped like the real sheets
+# (same column positions, mixed date formats, credential suffixes, case drift, typos and middle initials in the
+# typed SS1 names, partly filled Q/R) at any scale.
+
+import io
+import random
+from collections import namedtuple
+from datetime import date, datetime, timedelta
+
+import openpyxl
+
+import tl_engine as engine
+
+Dataset = namedtuple("Dataset", ["ss1", "ss2", "workbook", "cutoff_date", "month", "params"])
+
+SS2_DATE_FORMATS = ["%m/%d/%Y", "%-m/%-d/%Y", "%Y-%m-%d"]
+SS1_DATE_FORMATS = ["%m/%d/%Y", "%m/%d/%Y", "%d/%m/%Y"]
+SS2_TASKS = ["Primary Coverage", "Backup Coverage", "Training", "Shadowing", "primary coverage "]
+EXTRA_LEAD_COUNT = 3
+SS1_NAME_TYPO_RATE = 0.02 # Share of SS1 responses whose scribe / provider name is misspelled
+
+def misspell(rnd, name):
+    """A typo as typed into the form: two adjacent letters swapped, a letter dropped or a middle initial added."""
+    words = name.split(" "); w = rnd.randrange(len(words)); word = words[w]
+    kind = rnd.choice(["swap", "drop", "initial"]) if len(word) > 3 and word.isalpha() else "initial"
+    i = rnd.randrange(1, len(word) - 2) if kind != "initial" else 0
+    if kind == "swap": words[w] = word[:i] + word[i + 1] + word[i] + word[i + 2:]
+    elif kind == "drop": words[w] = word[:i] + word[i + 1:]
+    else: words.insert(1, rnd.choice("ABCDEFGHJKLMNPRST") + ".")
+    return " ".join(words)
+
+def default_scribes(rows):
+    # Roughly a month of days at small scales, more scribes (capped at ~300 days) as the tab grows
+    return max(20, -(-rows // 300))
+
+def generate_dataset(rows=1000, scribes=None, providers=40, seed=1, start=date(2025, 5, 1)):
+    """
+    Dataset with `rows` SS2 rows (one per scribe per day, from `start`), ~0.9 SS1 responses per SS2 row and one
+    'Count' row per day for the RMS providers of the built-in team config. Deterministic for a given seed.
+    """
+    rnd = random.Random(seed)
+    scribes = scribes or default_scribes(rows)
+    config = engine.BUILTIN_TEAM_CONFIG
+    rms = list(config.rms_provider_names)
+    managed = sorted(set().union(*config.leads.values()) - config.rms_providers)
+    others = [f"Dr. Provider {i:03d}" for i in range(max(0, providers - len(rms) - len(managed)))]
+    provider_pool = rms + managed + others
+    leads = [engine.DEFAULT_LEAD_NAME] * 2 + [f"Lead {i}" for i in range(2, EXTRA_LEAD_COUNT + 2)]
+    scribe_names = [f"Scribe {i:04d}" for i in range(scribes)]
+
+    ss2 = [["Scribe", "Lead", "Date", "Shift", "Task Assigned", "Provider Covered"] + [f"Col {i}" for i in range(6, 16)]
+           + ["Scheduled", "Uploaded"]]
+    ss1 = [["Timestamp", "Email", "Date of Service", "Coverage Type", "Provider Name", "Shift", "Scheduled (Zoom)",
+            "Uploaded (EOD)"] + [f"Col {i}" for i in range(8, 13)] + ["Scribe Name"]]
+    day = start; counts = {}
+    while len(ss2) <= rows:
+        for scribe in scribe_names:
+            if len(ss2) > rows: break
+            provider = rnd.choice(provider_pool); task = rnd.choice(SS2_TASKS)
+            q = rnd.choice(["", "", "", "5"]); r = rnd.choice(["", "", "", "4"])
+            ss2.append([scribe if rnd.random() > 0.02 else "", rnd.choice(leads), day.strftime(rnd.choice(SS2_DATE_FORMATS)), "",
+                        task, provider] + [""] * 10 + [q, r])
+            if rnd.random() < 0.85:
+                coverage = task.strip().title() if rnd.random() > 0.15 else rnd.choice(["Primary Coverage", "Training"])
+                reported = provider if rnd.random() > 0.08 else rnd.choice(provider_pool)
+                if rnd.random() < SS1_NAME_TYPO_RATE: reported = misspell(rnd, reported)
+                if rnd.random() < 0.3: reported += ", NP-C"
+                typed_scribe = misspell(rnd, scribe) if rnd.random() < SS1_NAME_TYPO_RATE else scribe
+                for _ in range(2 if rnd.random() < 0.05 else 1):
+                    ss1.append([f"{day:%m/%d/%Y} 18:{rnd.randint(0, 59):02d}:00", f"{scribe.lower().replace(' ', '.')}@example.com",
+                                day.strftime(rnd.choice(SS1_DATE_FORMATS)), coverage, reported, "",
+                                str(rnd.randint(0, 20)), str(rnd.randint(0, 20))] + [""] * 5
+                               + [typed_scribe.upper() if rnd.random() < 0.1 else typed_scribe])
+        for provider in rms: counts[(day, provider)] = rnd.choice([0, 3, 7, 12, "NW", None])
+        day += timedelta(days=1)
+    cutoff_date = day - timedelta(days=1)
+
+    wb = openpyxl.Workbook(write_only=True); ws = wb.create_sheet("Count")
+    ws.append(["Daily patient counts"])
+    ws.append(["Date"] + [f"{p.split(' ')[0]}/{p.split(' ')[-1][:1]}" for p in rms] + ["Total"])
+    d = start
+    while d <= cutoff_date:
+        ws.append([datetime(d.year, d.month, d.day)] + [counts[(d, p)] for p in rms] + [None])
+        d += timedelta(days=1)
+    buffer = io.BytesIO(); wb.save(buffer)
+    params = {"rows": rows, "scribes": scribes, "providers": len(provider_pool), "seed": seed, "days": (cutoff_date - start).days + 1}
+    return Dataset(ss1, ss2, buffer.getvalue(), cutoff_date, start.strftime("%B"), params)
@@ -0,0 +1,92 @@
+# bench/fake_sheets.py
+# In-process stand-in for the slice of the gspread API the engine uses (open_by_key, worksheet/get_worksheet/
+# worksheets, batch_get, batch_update, get_all_values). Values come back the way the Sheets API returns them:
+# trailing empty cells and rows trimmed. batch_update rewrites each range in the caller's data to '<title>'!A1
+# as gspread does, and fails like the API on a range it cannot parse. Every call is counted so scenarios can
+# report API usage; write_failures queues HTTP statuses the next batch_update calls fail with.
+
+import json
+from collections import Counter
+
+import gspread
+import requests
+from gspread.utils import a1_range_to_grid_range, absolute_range_name
+
+import tl_engine as engine
+
+def api_error(status, message):
+    """gspread APIError carrying a Sheets-style error response with the given HTTP status."""
+    response = requests.Response(); response.status_code = status
+    response._content = json.dumps({"error": {"code": status, "message": message, "status": "ERROR"}}).encode("utf-8")
+    return gspread.exceptions.APIError(response)
+
+class FakeWorksheet:
+    def __init__(self, title, rows, calls):
+        self.title, self.rows, self.calls = title, rows, calls
+        self.id = abs(hash(title)) % 10**9
+        self.write_failures = []
+
+    def _read(self, a1):
+        grid = a1_range_to_grid_range(a1)
+        row_start, row_end = grid.get("startRowIndex", 0), grid.get("endRowIndex", len(self.rows))
+        col_start, col_end = grid.get("startColumnIndex", 0), grid.get("endColumnIndex")
+        values = []
+        for row in self.rows[row_start:row_end]:
+            cells = row[col_start:col_end]
+            while cells and cells[-1] == "": cells = cells[:-1]
+            values.append(list(cells))
+        while values and not values[-1]: values.pop()
+        return values
+
+    def batch_get(self, ranges, **kwargs):
+        self.calls["batch_get"] += 1
+        return [self._read(a1) for a1 in ranges]
+
+    def batch_update(self, data, **kwargs):
+        self.calls["batch_update"] += 1
+        for entry in data: entry["range"] = absolute_range_name(self.title, entry["range"])
+        if self.write_failures: raise api_error(self.write_failures.pop(0), "Injected failure")
+        prefix = absolute_range_name(self.title) + "!"
+        for entry in data:
+            a1 = entry["range"][len(prefix):]
+            if not entry["range"].startswith(prefix) or "!" in a1: raise api_error(400, f"Unable to parse range: {entry['range']}")
+            grid = a1_range_to_grid_range(a1)
+            for i, values in enumerate(entry["values"]):
+                r = grid.get("startRowIndex", 0) + i
+                while len(self.rows) <= r: self.rows.append([])
+                row = self.rows[r]; c = grid.get("startColumnIndex", 0)
+                if len(row) < c + len(values): row.extend([""] * (c + len(values) - len(row)))
+                row[c:c + len(values)] = [str(v) for v in values]
+        return {"totalUpdatedCells": sum(len(v) for entry in data for v in entry["values"])}
+
+    def get_all_values(self):
+        self.calls["get_all_values"] += 1
+        width = max((len(r) for r in self.rows), default=0)
+        return [list(r) + [""] * (width - len(r)) for r in self.rows]
+
+class FakeSpreadsheet:
+    def __init__(self, title, worksheets):
+        self.title, self._worksheets = title, worksheets
+
+    def worksheet(self, title):
+        for ws in self._worksheets:
+            if ws.title == title: return ws
+        raise gspread.exceptions.WorksheetNotFound(title)
+
+    def get_worksheet(self, index): return self._worksheets[index]
+
+    def worksheets(self): return list(self._worksheets)
+
+class FakeClient:
+    """Serves SS1 as the first tab of SOURCE_SPREADSHEET_ID and the month tabs of DEST_SPREADSHEET_ID."""
+
+    def __init__(self, ss1_rows, month_tabs):
+        self.calls = Counter()
+        self.books = {
+            engine.SOURCE_SPREADSHEET_ID: FakeSpreadsheet("SS1", [FakeWorksheet("Form responses 1", ss1_rows, self.calls)]),
+            engine.DEST_SPREADSHEET_ID: FakeSpreadsheet("SS2", [FakeWorksheet(month, rows, self.calls) for month, rows in month_tabs.items()]),
+        }
+
+    def open_by_key(self, key):
+        self.calls["open_by_key"] += 1
+        return self.books[key]
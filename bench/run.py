@@ -0,0 +1,202 @@
+# bench/run.py
+# Timed scenarios for the engine against generated data, offline: SS1/SS2 come from an in-process fake gspread
+# client and the 'Count' workbook from a local HTTP server. Results are written as JSON; --baseline compares
+# medians with an earlier run and exits 1 on a regression.
+#
+#   python -m bench.run [--rows 1k,10k,100k] [--repeat 3] [--scenarios load_cold,validation] [--output bench.json]
+#   python -m bench.run --rows 10k --baseline bench.json [--tolerance 0.25]
+
+import os
+import tempfile
+
+os.environ.setdefault("TL_CACHE_DIR", tempfile.mkdtemp(prefix="tl-bench-")) # Before tl_engine reads it
+
+import argparse
+import json
+import logging
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import tl_engine as engine
+from bench.datagen import generate_dataset
+from bench.fake_sheets import FakeClient
+from bench.xlsx_server import serve_workbook
+
+RESULT_SCHEMA = 1
+DEFAULT_ROWS = "1k,10k,100k"
+DEFAULT_TOLERANCE = 0.25
+
+# --- Scenario context ---
+class Context:
+    """One generated dataset plus the fixtures and prebuilt inputs the scenarios share."""
+
+    def __init__(self, dataset, excel_url, xlsx_server):
+        self.dataset, self.excel_url, self.xlsx_server = dataset, excel_url, xlsx_server
+        self.team_config = engine.BUILTIN_TEAM_CONFIG
+        self.rms = list(self.team_config.rms_provider_names)
+        self.managed = sorted(self.team_config.leads[engine.DEFAULT_LEAD_NAME])
+        self.client = FakeClient([list(r) for r in dataset.ss1], {dataset.month: [list(r) for r in dataset.ss2]})
+        self.workbook_path = os.path.join(engine.CACHE_DIR, "bench-workbook.xlsx")
+        with open(self.workbook_path, "wb") as f: f.write(dataset.workbook)
+        cutoff = dataset.cutoff_date
+        self.ss1 = engine.CompactRows(dataset.ss1, engine.SRC_READ_COLUMNS)
+        self.ss2 = engine.CompactRows(dataset.ss2, engine.DEST_READ_COLUMNS)
+        self.ss2_index = engine.SS2Index(self.ss2)
+        self.ss1_validation_map = engine.build_ss1_validation_map(self.ss1, engine.parse_date_flexible, cutoff)
+        self.ss1_match_index = engine.build_ss1_match_index(self.ss1, cutoff)
+        self.excel_lookup, _ = engine.map_excel_workbook(self.workbook_path, self.rms, engine.parse_date_flexible, cutoff)
+        self.loaded = False
+
+def reset_caches(ctx):
+    engine.SS1_INDEX_CACHE.clear(); engine.EXCEL_LOOKUP_CACHE.clear()
+    for name in ("excel", os.path.basename(engine.SS1_STORE_PATH)):
+        path = os.path.join(engine.CACHE_DIR, name)
+        if os.path.isdir(path): shutil.rmtree(path)
+        elif os.path.exists(path): os.remove(path)
+    ctx.loaded = False
+
+def ensure_loaded(ctx):
+    if not ctx.loaded: load(ctx)
+
+# --- Scenarios ---
+# Each returns the number of input rows it processed; setup runs before every repetition and is not timed.
+def load(ctx):
+    engine.EXCEL_SHAREPOINT_URL = ctx.excel_url
+    snapshots, _ = engine.load_snapshots(ctx.client, [ctx.dataset.month], ctx.dataset.cutoff_date, team_config=ctx.team_config)
+    if snapshots[ctx.dataset.month] is None: raise RuntimeError("load_snapshots could not read the generated month tab")
+    ctx.loaded = True
+    return len(ctx.dataset.ss1) + len(ctx.dataset.ss2)
+
+def excel_mapping(ctx):
+    engine.map_excel_workbook(ctx.workbook_path, ctx.rms, engine.parse_date_flexible, ctx.dataset.cutoff_date)
+    return ctx.dataset.params["days"] # One 'Count' row per day
+
+def ss1_validation_map(ctx):
+    engine.build_ss1_validation_map(ctx.ss1, engine.parse_date_flexible, ctx.dataset.cutoff_date)
+    return len(ctx.ss1) - 1
+
+def ss2_index(ctx):
+    return len(engine.SS2Index(ctx.ss2))
+
+def name_matching(ctx):
+    engine.resolve_ss1_names(ctx.ss2_index, ctx.ss1_match_index, ctx.ss1_validation_map, ctx.team_config.name_match_threshold)
+    return len(ctx.ss1) - 1
+
+def plan_updates(ctx):
+    engine.plan_updates(ctx.ss2_index, ctx.ss1_match_index, ctx.excel_lookup, ctx.team_config.rms_providers, ctx.dataset.cutoff_date)
+    return len(ctx.ss2_index)
+
+def validation(ctx):
+    engine.run_comprehensive_validation_checks(ctx.ss2_index, ctx.ss1_validation_map, ctx.excel_lookup, ctx.rms, ctx.managed,
+                                               ctx.dataset.cutoff_date)
+    return len(ctx.ss2_index)
+
+SCENARIOS = { # name -> (setup, run)
+    "load_cold": (reset_caches, load),
+    "load_warm": (ensure_loaded, load),
+    "excel_mapping": (None, excel_mapping),
+    "ss1_validation_map": (None, ss1_validation_map),
+    "ss2_index": (None, ss2_index),
+    "name_matching": (None, name_matching),
+    "plan_updates": (None, plan_updates),
+    "validation": (None, validation),
+}
+
+def run_scenario(ctx, name, repeat):
+    setup, func = SCENARIOS[name]; seconds = []
+    for _ in range(repeat):
+        if setup: setup(ctx)
+        calls_before = sum(ctx.client.calls.values()); http_before = ctx.xlsx_server.requests; bytes_before = ctx.xlsx_server.bytes_sent
+        started = time.perf_counter(); rows = func(ctx); seconds.append(time.perf_counter() - started)
+    result = {"scenario": name, "scale_rows": ctx.dataset.params["rows"], "rows": rows, "repeat": repeat, "seconds": seconds,
+              "min": min(seconds), "median": statistics.median(seconds), "mean": statistics.fmean(seconds),
+              "rows_per_second": rows / min(seconds) if min(seconds) > 0 else None}
+    if func is load: # API usage of the last repetition
+        result["sheets_calls"] = sum(ctx.client.calls.values()) - calls_before
+        result["http_requests"] = ctx.xlsx_server.requests - http_before
+        result["http_bytes"] = ctx.xlsx_server.bytes_sent - bytes_before
+    return result
+
+# --- Reporting ---
+def parse_rows(text):
+    """'1k,10k,1M' -> [1000, 10000, 1000000]"""
+    multipliers = {"k": 1_000, "m": 1_000_000}
+    return [int(float(part[:-1]) * multipliers[part[-1].lower()]) if part[-1].lower() in multipliers else int(part)
+            for part in (p.strip() for p in text.split(",")) if part]
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare_with_baseline(results, baseline, tolerance):
+    """Scenarios whose median is more than `tolerance` (fraction) slower than in the baseline run."""
+    before = {(r["scenario"], r["scale_rows"]): r for r in baseline["results"]}
+    regressions = []
+    for r in results:
+        old = before.get((r["scenario"], r["scale_rows"]))
+        if old and r["median"] > old["median"] * (1 + tolerance):
+            regressions.append({"scenario": r["scenario"], "scale_rows": r["scale_rows"], "baseline_median": old["median"],
+                                "median": r["median"], "slowdown": r["median"] / old["median"] - 1})
+    return regressions
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the TL Sheet Updater engine")
+    parser.add_argument("--rows", default=DEFAULT_ROWS, help=f"SS2 rows per scale, comma-separated; k/M suffixes (default {DEFAULT_ROWS})")
+    parser.add_argument("--scribes", type=int, help="Scribes (default: grows with rows)")
+    parser.add_argument("--providers", type=int, default=40, help="Distinct providers (default 40)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=3, help="Timed repetitions per scenario (default 3)")
+    parser.add_argument("--scenarios", help=f"Comma-separated subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument("--output", help="Write the JSON results here (default: stdout)")
+    parser.add_argument("--baseline", help="Earlier JSON results to compare medians against")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Allowed slowdown vs the baseline (default 0.25)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Progress and engine messages on stderr")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.ERROR, format="%(levelname)s %(message)s", stream=sys.stderr)
+    names = [n.strip() for n in args.scenarios.split(",")] if args.scenarios else list(SCENARIOS)
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown: raise SystemExit(f"Unknown scenario(s): {', '.join(unknown)}")
+
+    results = []; datasets = []
+    for rows in parse_rows(args.rows):
+        started = time.perf_counter()
+        dataset = generate_dataset(rows, scribes=args.scribes, providers=args.providers, seed=args.seed)
+        datasets.append({**dataset.params, "ss1_rows": len(dataset.ss1) - 1, "workbook_bytes": len(dataset.workbook),
+                         "generate_seconds": time.perf_counter() - started})
+        with serve_workbook(dataset.workbook) as (url, server):
+            ctx = Context(dataset, url, server)
+            for name in names:
+                result = run_scenario(ctx, name, args.repeat); results.append(result)
+                logging.info(f"{rows} rows / {name}: median {result['median'] * 1e3:.1f} ms")
+
+    report = {"schema": RESULT_SCHEMA, "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+              "git_commit": git_commit(), "python": platform.python_version(), "platform": platform.platform(),
+              "params": {"rows": args.rows, "repeat": args.repeat, "seed": args.seed}, "datasets": datasets, "results": results}
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f: baseline = json.load(f)
+        report["regressions"] = compare_with_baseline(results, baseline, args.tolerance)
+        for r in report["regressions"]:
+            print(f"REGRESSION {r['scenario']} @ {r['scale_rows']} rows: {r['baseline_median'] * 1e3:.1f} ms -> "
+                  f"{r['median'] * 1e3:.1f} ms (+{r['slowdown']:.0%})", file=sys.stderr)
+        exit_code = 1 if report["regressions"] else 0
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f: f.write(text + "\n")
+    else:
+        print(text)
+    return exit_code
+
+if __name__ == "__main__":
+    sys.exit(main())
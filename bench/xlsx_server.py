@@ -0,0 +1,33 @@
+# bench/xlsx_server.py
+# Local HTTP stand-in for the SharePoint download: serves one workbook at any path, with an ETag so the engine's
+# conditional download (If-None-Match -> 304) is exercised as it is against SharePoint.
+
+import contextlib
+import hashlib
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class _WorkbookHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server; server.requests += 1
+        if self.headers.get("If-None-Match") == server.etag:
+            self.send_response(304); self.send_header("ETag", server.etag); self.end_headers(); return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+        self.send_header("Content-Length", str(len(server.workbook))); self.send_header("ETag", server.etag)
+        self.end_headers()
+        self.wfile.write(server.workbook); server.bytes_sent += len(server.workbook)
+
+    def log_message(self, format, *args): pass # Keep benchmark output clean
+
+@contextlib.contextmanager
+def serve_workbook(workbook_bytes):
+    """Yields (url, server); server.requests / server.bytes_sent count what the engine fetched."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _WorkbookHandler)
+    server.workbook = workbook_bytes; server.etag = '"' + hashlib.sha1(workbook_bytes).hexdigest() + '"'
+    server.requests = server.bytes_sent = 0
+    thread = threading.Thread(target=server.serve_forever, name="bench-xlsx", daemon=True); thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/Count.xlsx", server
+    finally:
+        server.shutdown(); server.server_close()
@@ -0,0 +1,7 @@
+# tests/conftest.py
+# tl_engine reads TL_CACHE_DIR at import time, so point it at a throwaway directory before any test module imports it.
+
+import os
+import tempfile
+
+os.environ.setdefault("TL_CACHE_DIR", tempfile.mkdtemp(prefix="tl-tests-"))
@@ -0,0 +1,79 @@
+# tests/test_compact_rows.py
+# CompactRows gives back the rows it was built from (projected columns only, short rows kept short), slices share
+# the code arrays, set_cell grows rows and the value table, and SS2Index built from it matches the plain-list build.
+
+from datetime import date
+
+import numpy as np
+
+import tl_engine as engine
+
+COLUMNS = [0, 2, 3]
+ROWS = [["Name", "skip", "Date", "Count"],
+        ["Ana", "x", "2025-06-01", 3],
+        ["Ben"],
+        ["Ana", "y", "", "3"],
+        [],
+        ["Cy", "z", "2025-06-02", "4", "extra"]]
+
+def projected(row): return [v if i in COLUMNS and v != "" else "" for i, v in enumerate(row[:max(COLUMNS) + 1])]
+
+def test_round_trip_keeps_projected_columns_and_row_lengths():
+    rows = engine.CompactRows(ROWS, COLUMNS)
+
+    assert len(rows) == len(ROWS)
+    assert list(rows) == [[str(v) if v != "" else "" for v in projected(row)] for row in ROWS]
+    assert rows[2] == ["Ben"] and rows[4] == [] and rows[1][3] == "3" # Non-str cells come back as text
+    assert rows.values.count("3") == 1 and rows.codes.dtype == np.uint16
+
+def test_slices_share_codes_and_values():
+    rows = engine.CompactRows(ROWS, COLUMNS)
+    data = rows[1:]
+
+    assert len(data) == len(ROWS) - 1 and data[0] == rows[1] and list(data) == list(rows)[1:]
+    assert np.shares_memory(data.codes, rows.codes) and data.values is rows.values
+    data.set_cell(0, 3, "9")
+    assert rows[1][3] == "9"
+
+def test_set_cell_grows_the_row_and_the_value_table():
+    rows = engine.CompactRows(ROWS, COLUMNS); before = len(rows.values)
+
+    rows.set_cell(2, 3, "new value"); rows.set_cell(4, 0, "Dee")
+
+    assert rows[2] == ["Ben", "", "", "new value"] and rows[4] == ["Dee"]
+    assert len(rows.values) == before + 2
+    assert rows == engine.CompactRows([*ROWS[:2], ["Ben", "", "", "new value"], ROWS[3], ["Dee"], ROWS[5]], COLUMNS)
+    assert rows != engine.CompactRows(ROWS, COLUMNS)
+
+def test_set_cell_widens_codes_past_uint16():
+    rows = engine.CompactRows([["a"]], [0])
+    rows.values.extend(str(i) for i in range(70000)); rows._codes_by_value.update((str(i), i + 2) for i in range(70000))
+
+    rows.set_cell(0, 0, "fresh")
+
+    assert rows.codes.dtype == np.uint32 and rows[0] == ["fresh"]
+
+def test_column_derives_once_per_distinct_value():
+    rows = engine.CompactRows(ROWS, COLUMNS); seen = []
+    def derive(value): seen.append(value); return value.upper()
+
+    column = rows[1:].column(0, derive)
+
+    assert column.tolist() == ["ANA", "BEN", "ANA", "", "CY"]
+    assert sorted(seen) == ["", "Ana", "Ben", "Cy"]
+    assert column[0] is column[2]
+
+def test_ss2_index_matches_the_list_build():
+    ss2 = [["Scribe", "Lead", "Date", "", "Task", "Provider"] + [""] * 10 + ["Q", "R"],
+           [" Ana ", "Lee", "2025-06-01", "", "Primary Coverage", "Dr. A", *[""] * 10, "1", ""],
+           ["Ben", "Lee", "bad", "", "Backup Coverage", "Dr. B"],
+           ["ana", "Kim", "2025-06-01", "", "Other", "Dr. A", *[""] * 10, "", "2"]]
+
+    compact = engine.SS2Index(engine.CompactRows(ss2, engine.DEST_READ_COLUMNS)); plain = engine.SS2Index(ss2)
+
+    for name in engine.SS2Index.COLUMNS: assert getattr(compact, name) == getattr(plain, name), name
+    assert compact.scribe_norm == ["ana", "ben", "ana"] and compact.task == [engine.Task.PRIMARY, engine.Task.BACKUP, engine.Task.OTHER]
+    assert compact.has_scribe_date("ana", date(2025, 6, 1)) and not compact.has_scribe_date("ben", date(2025, 6, 1))
+    assert not compact.has_scribe_date("zed", date(2025, 6, 1)) and not compact.has_scribe_date("ana", None)
+    assert compact.scribe_date_last.tolist() == [2] # The later row of a repeated (scribe, date) wins
+    assert {lead: p.tolist() for lead, p in compact.by_lead.items()} == {"Lee": [0, 1], "Kim": [2]}
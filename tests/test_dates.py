@@ -0,0 +1,31 @@
+# tests/test_dates.py
+# Date parsing: parse_date_column agrees with parse_date_flexible cell by cell, reports values the column's dominant
+# format would read differently, and maps invalid values to None; the per-value memo tolerates being cleared.
+
+from datetime import date
+
+import tl_engine as engine
+
+def test_column_matches_the_per_cell_parser():
+    values = ["05/06/2025", " 13/06/2025 ", "2025-06-14", "2025-06-15 10:30:00", "31/02/2025", "not a date", "", None, 7]
+
+    column = engine.parse_date_column(values)
+
+    assert column.dates == [engine.parse_date_flexible(v) for v in values]
+    assert column.dates[:4] == [date(2025, 6, 5), date(2025, 6, 13), date(2025, 6, 14), date(2025, 6, 15)]
+    assert column.dates[4:] == [None] * 5
+
+def test_ambiguous_values_are_reported_against_the_dominant_format():
+    column = engine.parse_date_column(["06/13/2025", "06/14/2025", "06/15/2025", "05/06/2025"])
+
+    assert column.dominant_format == "%m/%d/%Y"
+    assert column.dates[-1] == date(2025, 6, 5) # First format wins, as in parse_date_flexible
+    assert column.ambiguous == [("05/06/2025", date(2025, 6, 5), "%m/%d/%Y", date(2025, 5, 6))]
+
+def test_memo_cleared_by_another_thread(monkeypatch):
+    remember = engine._remember_dates
+    def remember_then_clear(parsed): remember(parsed); engine._parsed_date_memo.clear() # As if another loader hit the cap
+    monkeypatch.setattr(engine, "_remember_dates", remember_then_clear)
+
+    assert engine.parse_date_flexible("17/06/2025") == date(2025, 6, 17)
+    assert engine.parse_date_flexible("garbage") is None
@@ -0,0 +1,34 @@
+# tests/test_excel_cache.py
+# The on-disk SharePoint workbook cache under concurrent loaders: downloads and derived lookups written by several
+# threads at once, across a cutoff rollover, against the bench's local workbook server.
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+import tl_engine as engine
+from bench.datagen import generate_dataset
+from bench.xlsx_server import serve_workbook
+
+LOADERS = 8
+ROUNDS = 8
+
+def test_concurrent_loaders_share_the_cache(monkeypatch, tmp_path):
+    monkeypatch.setattr(engine, "CACHE_DIR", str(tmp_path))
+    dataset = generate_dataset(200)
+    rms = list(engine.BUILTIN_TEAM_CONFIG.rms_provider_names)
+    cutoffs = [dataset.cutoff_date - timedelta(days=i % 2) for i in range(LOADERS * 4)]
+
+    def load(cutoff):
+        lookup = engine.load_and_map_excel_data(url, rms, engine.parse_date_flexible, cutoff)[0]
+        return None if lookup is None else {key: (entry.count, entry.state) for key, entry in lookup.items()} # raw can be NaN
+
+    with serve_workbook(dataset.workbook) as (url, server):
+        for _ in range(ROUNDS):
+            engine.EXCEL_LOOKUP_CACHE.clear() # Every loader goes to disk
+            with ThreadPoolExecutor(max_workers=LOADERS) as pool: lookups = list(pool.map(load, cutoffs))
+            assert all(lookup is not None for lookup in lookups)
+            assert all(lookup == lookups[i % 2] for i, lookup in enumerate(lookups))
+
+    cache_dir = engine._excel_cache_dir(url)
+    assert not [name for name in os.listdir(cache_dir) if name.endswith((".part", ".tmp"))]
@@ -0,0 +1,47 @@
+# tests/test_name_matching.py
+# Fuzzy SS1 name resolution: the trigram index's threshold, margin and accept guard, and that the update planner only
+# uses auto-resolved scribe names when the team config opts in.
+
+from datetime import date
+
+import tl_engine as engine
+from bench.fake_sheets import FakeClient
+
+DAY = date(2025, 6, 3)
+
+def test_best_match_needs_the_threshold_and_a_clear_winner():
+    index = engine.NameIndex(["sarah khan", "maria lopez", "mario lopez", "room 12"])
+
+    assert index.best_match("sara khan", 0.88)[0] == "sarah khan"
+    assert index.best_match("sara khan", 0.99) is None
+    assert index.best_match("mari lopez", 0.8) is None # 'maria' and 'mario' are too close to call
+    assert index.best_match("room 13", 0.5) is None # Digits must agree
+
+def test_accept_guard_filters_candidates():
+    index = engine.NameIndex(["sarah khan", "sara kahn"])
+
+    assert index.best_match("sara khan", 0.8, accept=lambda name: name != "sarah khan")[0] == "sara kahn"
+    assert index.best_match("sara khan", 0.8, accept=lambda name: False) is None
+
+def make_snapshot():
+    ss2 = [["Scribe"] + [""] * 17, ["Sarah Khan", "Lead", DAY.strftime("%m/%d/%Y"), "", "Primary Coverage", "Dr. Who"] + [""] * 12]
+    ss1 = [["h"] * 14, ["", "", DAY.strftime("%m/%d/%Y"), "Primary Coverage", "Dr. Who", "", "6", "5"] + [""] * 5 + ["Sara Khan"]]
+    worksheet = FakeClient(ss1, {"June": ss2}).open_by_key(engine.DEST_SPREADSHEET_ID).worksheet("June")
+    return {"dest_worksheet": worksheet, "ss2_index": engine.SS2Index(engine.CompactRows(ss2, engine.DEST_READ_COLUMNS)),
+            "ss1_match_index": engine.build_ss1_match_index(engine.CompactRows(ss1, engine.SRC_READ_COLUMNS), DAY),
+            "ss1_validation_map": engine.build_ss1_validation_map(ss1, engine.parse_date_flexible, DAY), "excel_data_lookup": None}
+
+def team_config(**name_matching):
+    return engine.compile_team_config({"leads": {"Lead": ["Dr. Who"]}, "name_matching": {"threshold": 0.85, **name_matching}})
+
+def test_update_reports_but_does_not_apply_scribe_matches_by_default():
+    outcome = engine.run_update(make_snapshot(), DAY, team_config(), dry_run=True)
+
+    assert outcome.plan.cells == []
+    assert outcome.name_matches[["name", "resolved", "applied"]].values.tolist() == [["sara khan", "sarah khan", False]]
+
+def test_update_applies_scribe_matches_when_the_config_opts_in():
+    outcome = engine.run_update(make_snapshot(), DAY, team_config(apply_to_updates=True), dry_run=True)
+
+    assert [(c.row, c.col, c.value) for c in outcome.plan.cells] == [(2, 17, "6"), (2, 18, "5")]
+    assert outcome.name_matches["applied"].tolist() == [True]
@@ -0,0 +1,32 @@
+# tests/test_plan_state.py
+# Re-planning against the saved PlanState: rows whose inputs did not change are reused, and the plan is the same
+# one a fresh run would make, after part of the plan was written and some Excel counts and SS1 responses changed.
+
+import random
+
+import tl_engine as engine
+from bench.datagen import generate_dataset
+
+def plan_key(plan):
+    return [(c.row, c.col, c.value) for c in plan.cells], plan.details, plan.excel_mismatches, plan.ss1_r_info
+
+def test_replan_from_saved_state_matches_a_fresh_plan(tmp_path, monkeypatch):
+    monkeypatch.setattr(engine, "PLAN_STATE_DIR", str(tmp_path))
+    dataset = generate_dataset(2000); cutoff = dataset.cutoff_date; rnd = random.Random(7)
+    config = engine.BUILTIN_TEAM_CONFIG
+    workbook = tmp_path / "workbook.xlsx"; workbook.write_bytes(dataset.workbook)
+    excel, _ = engine.map_excel_workbook(str(workbook), list(config.rms_provider_names), engine.parse_date_flexible, cutoff)
+    ss1 = engine.build_ss1_match_index(engine.CompactRows(dataset.ss1, engine.SRC_READ_COLUMNS), cutoff)
+    index = engine.SS2Index(engine.CompactRows(dataset.ss2, engine.DEST_READ_COLUMNS))
+
+    first = engine.plan_updates(index, ss1, excel, config.rms_providers, cutoff)
+    engine.save_plan_state("sheet", "May", first.state)
+    for cell in rnd.sample(first.cells, len(first.cells) // 2): index.set_cell(cell.row, cell.col, cell.value)
+    for key in rnd.sample(sorted(excel, key=str), 20): excel[key] = excel[key]._replace(count=excel[key].count + 3)
+    for key in rnd.sample(sorted(ss1, key=str), 20): ss1[key] = [m._replace(r="42") for m in ss1[key]]
+
+    replan = engine.plan_updates(index, ss1, excel, config.rms_providers, cutoff, engine.load_plan_state("sheet", "May"))
+    fresh = engine.plan_updates(index, ss1, excel, config.rms_providers, cutoff)
+
+    assert 0 < replan.skipped_rows < len(first.state.rows)
+    assert plan_key(replan) == plan_key(fresh)
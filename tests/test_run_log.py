@@ -0,0 +1,19 @@
+# tests/test_run_log.py
+# The run log stays bounded: past its size cap it is rotated to <path>.1, keeping one older file.
+
+import json
+import os
+
+import tl_engine as engine
+
+def test_run_log_rotates_past_its_size_cap(tmp_path):
+    log_path = str(tmp_path / "run_log.jsonl")
+    for i in range(20):
+        with engine.instrumented_run(f"run {i}", log_path=None) as metrics: pass
+        engine.append_run_log(metrics, log_path, max_bytes=1000)
+
+    with open(log_path) as f: current = [json.loads(line)["run"] for line in f]
+    with open(log_path + ".1") as f: previous = [json.loads(line)["run"] for line in f]
+    assert os.path.getsize(log_path) < 1000 + 400 and current[-1] == "run 19"
+    assert previous and int(previous[-1].split()[1]) + 1 == int(current[0].split()[1])
+    assert sorted(os.listdir(tmp_path)) == ["run_log.jsonl", "run_log.jsonl.1"]
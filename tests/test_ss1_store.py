@@ -0,0 +1,48 @@
+# tests/test_ss1_store.py
+# The incremental SS1 store against the bench fake: new rows are appended, and edits above the re-checked tail are
+# picked up by a forced resync and by the first sync of a new day.
+
+import sqlite3
+
+import tl_engine as engine
+from bench.fake_sheets import FakeClient
+
+def make_worksheet(rows=40):
+    width = max(engine.SRC_READ_COLUMNS) + 1
+    sheet = [[f"h{c}" for c in range(width)]] + [[f"r{r}c{c}" for c in range(width)] for r in range(1, rows + 1)]
+    return FakeClient(sheet, {}).open_by_key(engine.SOURCE_SPREADSHEET_ID).get_worksheet(0)
+
+def sync(worksheet, store_path, **kwargs):
+    return engine.sync_source_store(worksheet, engine.SOURCE_SPREADSHEET_ID, engine.SRC_READ_COLUMNS, store_path, **kwargs)
+
+def scribe_of_row(rows, row_num):
+    return rows[row_num - 1][engine.SRC_COL_SCRIBE_NAME]
+
+def test_appended_rows_sync_incrementally(tmp_path):
+    worksheet = make_worksheet(); store = str(tmp_path / "ss1.sqlite3")
+    assert sync(worksheet, store)[1]["mode"] == "full"
+    worksheet.rows.append(list(worksheet.rows[-1]))
+
+    rows, stats = sync(worksheet, store)
+
+    assert stats["mode"] == "incremental" and stats["new_rows"] == 1 and len(rows) == len(worksheet.rows)
+
+def test_edit_above_the_tail_is_picked_up_by_a_forced_resync(tmp_path):
+    worksheet = make_worksheet(); store = str(tmp_path / "ss1.sqlite3")
+    sync(worksheet, store)
+    worksheet.rows[9][engine.SRC_COL_SCRIBE_NAME] = "Corrected Scribe"
+    assert scribe_of_row(sync(worksheet, store)[0], 10) != "Corrected Scribe" # Outside the re-checked tail
+
+    rows, stats = sync(worksheet, store, force_full=True)
+
+    assert stats["mode"] == "full" and scribe_of_row(rows, 10) == "Corrected Scribe"
+
+def test_first_sync_of_a_day_is_full(tmp_path):
+    worksheet = make_worksheet(); store = str(tmp_path / "ss1.sqlite3")
+    sync(worksheet, store)
+    worksheet.rows[9][engine.SRC_COL_SCRIBE_NAME] = "Corrected Scribe"
+    with sqlite3.connect(store) as conn: conn.execute("UPDATE meta SET value = '2000-01-01' WHERE key = 'full_sync_date'")
+
+    rows, stats = sync(worksheet, store)
+
+    assert stats["mode"] == "full" and scribe_of_row(rows, 10) == "Corrected Scribe"
@@ -0,0 +1,52 @@
+# tests/test_team_config.py
+# Team config loading and validation: the example file compiles, malformed configs raise ValueError naming the
+# problem and the file, and an edited file is picked up on the next load.
+
+import json
+import os
+
+import pytest
+
+import tl_engine as engine
+
+EXAMPLE_CONFIG = os.path.join(os.path.dirname(__file__), os.pardir, "tl_team.example.json")
+
+def test_example_config_compiles():
+    config = engine.load_team_config(EXAMPLE_CONFIG)
+
+    assert len(config.leads) > 1 and config.rms_providers and config.name_match_threshold == 0.88
+    assert all((lead, p) in config.managed_pairs for lead, providers in config.leads.items() for p in providers)
+
+def test_names_are_stripped_and_rms_order_kept():
+    config = engine.compile_team_config({"rms_providers": [" B ", "A", "B"], "leads": {" Lead ": [" Dr. X "]}})
+
+    assert config.leads == {"Lead": frozenset({"Dr. X"})} and config.rms_provider_names == ("B", "A")
+    assert config.name_match_threshold == engine.NAME_MATCH_THRESHOLD and config.name_match_updates is False
+
+@pytest.mark.parametrize("raw, message", [
+    ([], "non-empty 'leads'"),
+    ({"leads": {}}, "non-empty 'leads'"),
+    ({"leads": {"Lead": "Dr. X"}}, "lead 'Lead' needs a list"),
+    ({"leads": {"Lead": {"managed_providers": ["Dr. X", 3]}}}, "lead 'Lead' needs a list"),
+    ({"leads": {"Lead": []}, "rms_providers": "Dr. X"}, "'rms_providers' must be a list"),
+    ({"leads": {"Lead": []}, "name_matching": {"threshold": 0}}, "'name_matching' must be"),
+    ({"leads": {"Lead": []}, "name_matching": {"threshold": True}}, "'name_matching' must be"),
+    ({"leads": {"Lead": []}, "name_matching": 0.9}, "'name_matching' must be"),
+    ({"leads": {"Lead": []}, "name_matching": {"apply_to_updates": "yes"}}, "'name_matching.apply_to_updates' must be"),
+])
+def test_malformed_configs_are_rejected(raw, message):
+    with pytest.raises(ValueError, match=message) as error: engine.compile_team_config(raw, "team.json")
+    assert "team.json" in str(error.value)
+
+def test_threshold_null_turns_matching_off():
+    assert engine.compile_team_config({"leads": {"Lead": []}, "name_matching": {"threshold": None}}).name_match_threshold is None
+
+def test_edited_file_is_reloaded(tmp_path):
+    path = str(tmp_path / "team.json")
+    with open(path, "w") as f: json.dump({"leads": {"Lead": ["Dr. X"]}}, f)
+    assert engine.load_team_config(path) is engine.load_team_config(path) # Unchanged file: cached
+
+    with open(path, "w") as f: json.dump({"leads": {"Lead": ["Dr. X"], "Other": ["Dr. Y"]}}, f)
+    os.utime(path, ns=(0, os.stat(path).st_mtime_ns + 1))
+
+    assert set(engine.load_team_config(path).leads) == {"Lead", "Other"}
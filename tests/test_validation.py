@@ -0,0 +1,65 @@
+# tests/test_validation.py
+# The validation rules and their report lines: one SS2 row per rule (plus rows of another lead and after the cutoff,
+# which are out of scope), checked against the lines the original row-by-row validator produced for the same data.
+
+from datetime import date
+
+import tl_engine as engine
+
+D1, D2 = date(2025, 6, 2), date(2025, 6, 3); LEAD = "Saqib Sherwani"; CUTOFF = date(2025, 6, 5)
+
+def ss2_row(scribe, d, task, provider, lead=LEAD): return [scribe, lead, d.isoformat(), "", task, provider] + [""] * 12
+
+SS2 = [["Scribe"] + [""] * 17,
+    ss2_row("Ann", D1, "Training", "Alison Blake"),                 # RMS count but task
+    ss2_row("Bob", D1, "Primary Coverage", "Amanda DeBois"),        # RMS task, no count (NW)
+    ss2_row("Cy", D1, "Backup Coverage", "Heather Reynolds"),       # RMS task, no Excel entry
+    ss2_row("", D1, "Primary Coverage", "Erin Henderson"),          # Scribe missing
+    ss2_row("Dee", D1, "Primary Coverage", "Kei Batangan"),         # SS1 has only Training
+    ss2_row("Eve", D1, "Backup Coverage", "Dr. Kirmani Moe"),       # SS1 multiple Primary/Backup
+    ss2_row("Fay", D1, "Primary Coverage", "Dr. Mark Basham"),      # SS1 other provider
+    ss2_row("Gus", D2, "Training", "Amanda Reda Goglio"),           # SS1 says Primary, SS2 Training
+    ss2_row("Hal", D2, "Primary Coverage", "Amanda Reda Goglio"),   # No SS1 entries; duplicate coverage with Ivy
+    ss2_row("Ivy", D2, "Backup Coverage", "Amanda Reda Goglio"),
+    ss2_row("Jo", D2, "Primary Coverage", "Dr. Mark Basham", lead="Other Lead"), # Other lead: ignored
+    ss2_row("Ivy", date(2025, 6, 9), "Primary Coverage", "Erin Henderson"),      # After the cutoff: ignored
+]
+SS1 = {(D1, "dee"): [("Training", "Kei Batangan", 2)],
+       (D1, "eve"): [("Backup Coverage", "Dr. Kirmani Moe", 3), ("Primary Coverage", "Dr. Kirmani Moe", 4)],
+       (D1, "fay"): [("Primary Coverage", "Erin Henderson, NP-C", 5)],
+       (D2, "gus"): [("Primary Coverage", "Amanda Reda Goglio", 6)],
+       (D2, "ivy"): [("Backup Coverage", "Amanda Reda Goglio", 7)]}
+SS1_MAP = {k: tuple(engine.SS1Entry(*e) for e in v) for k, v in SS1.items()}
+EXCEL = {(D1, "Alison Blake"): engine.ExcelCount(4, 4, engine.EXCEL_COUNT_NUMBER), (D1, "Amanda DeBois"): engine.ExcelCount("NW", 0, engine.EXCEL_COUNT_NW)}
+
+EXPECTED = [
+    "VALIDATION (RMS): 'Alison Blake' on 2025-06-02 (SS2 Row 2), Excel count '4', but SS2 Task 'Training' not Primary/Backup.",
+    "VALIDATION (RMS): SS2 (Row 3) assigns Task 'Primary Coverage' to 'Amanda DeBois' on 2025-06-02, but Excel shows no positive count (found: 'NW').",
+    "VALIDATION (RMS): SS2 (Row 4) assigns Task 'Backup Coverage' to 'Heather Reynolds' on 2025-06-02, but Excel shows no positive count (found: 'No Excel Entry').",
+    "VALIDATION (Non-RMS): SS2 Row 5, Task 'Primary Coverage', Scribe Name missing for Provider 'Erin Henderson'.",
+    "VALIDATION (Non-RMS): SS2 (Row 6: Scribe 'Dee', Provider 'Kei Batangan') Task 'Primary Coverage' on 2025-06-02, but no Primary/Backup in SS1. (SS1 tasks: Training)",
+    "VALIDATION (Non-RMS): Scribe 'Eve' on 2025-06-02 has multiple (2) Primary/Backup in SS1. SS2 (Row 7) for 'Dr. Kirmani Moe' ambiguous.",
+    "VALIDATION (Non-RMS): Scribe 'Fay' on 2025-06-02 (SS2 Row 8), SS2 Provider 'Dr. Mark Basham', but SS1 (Row 5) reports for 'Erin Henderson, NP-C'.",
+    "VALIDATION (Non-RMS): SS1 (Row 6) reports Scribe 'Gus' did 'Primary Coverage' for 'Amanda Reda Goglio' on 2025-06-03, but SS2 Task (Row 9) is 'Training'.",
+    "VALIDATION (Non-RMS): SS2 (Row 10: Scribe 'Hal', Provider 'Amanda Reda Goglio') Task 'Primary Coverage' on 2025-06-03, but NO entries in SS1 for Scribe/Date.",
+    "VALIDATION (Uniqueness): Provider 'Amanda Reda Goglio' on 2025-06-03 has 2 active coverages in SS2: Scribe 'Hal' Task='Primary Coverage' (SS2 Row 10); Scribe 'Ivy' Task='Backup Coverage' (SS2 Row 11)",
+]
+
+def check(ss2):
+    return engine.run_comprehensive_validation_checks(engine.SS2Index(engine.CompactRows(ss2, engine.DEST_READ_COLUMNS)), SS1_MAP, EXCEL,
+                                                      engine.SPECIAL_PROVIDER_FULL_NAMES, engine.MY_MANAGED_PROVIDERS, CUTOFF)
+
+def test_every_rule_renders_the_original_report_lines():
+    assert check(SS2) == EXPECTED
+
+def test_findings_table_carries_one_rule_per_line():
+    config = engine.compile_team_config({"rms_providers": engine.SPECIAL_PROVIDER_FULL_NAMES, "leads": {LEAD: engine.MY_MANAGED_PROVIDERS}})
+    findings = engine.validation_findings(engine.SS2Index(engine.CompactRows(SS2, engine.DEST_READ_COLUMNS)), SS1_MAP, EXCEL, config, CUTOFF)
+
+    assert findings["rule"].tolist() == [engine.RULE_RMS_COUNT_TASK, engine.RULE_RMS_NO_COUNT, engine.RULE_RMS_NO_COUNT, engine.RULE_SCRIBE_MISSING,
+                                         engine.RULE_SS1_NO_ACTIVE, engine.RULE_SS1_MULTIPLE, engine.RULE_SS1_PROVIDER, engine.RULE_SS1_TASK,
+                                         engine.RULE_SS1_NO_ENTRIES, engine.RULE_DUPLICATE_COVERAGE]
+    assert [engine.render_finding(f) for f in findings.itertuples(index=False)] == EXPECTED
+
+def test_empty_tab_aborts():
+    assert check([["Scribe"] + [""] * 17]) == ["Validation Aborted: Destination data (SS2) is empty."]
@@ -0,0 +1,43 @@
+# tests/test_write_pipeline.py
+# The SS2 write pipeline against gspread's own Worksheet.batch_update (which rewrites the ranges of the data it is
+# given) and against the bench fake, with a throttled first attempt.
+
+import gspread
+from gspread.http_client import HTTPClient
+from gspread.worksheet import Worksheet
+
+import tl_engine as engine
+from bench.fake_sheets import FakeClient, api_error
+
+def no_sleep(seconds): pass
+
+class ThrottlingHTTPClient(HTTPClient):
+    """gspread HTTPClient that records the ranges of each values.batchUpdate and throttles the first one."""
+
+    def __init__(self):
+        self.sent = []
+
+    def values_batch_update(self, spreadsheet_id, body):
+        self.sent.append([entry["range"] for entry in body["data"]])
+        if len(self.sent) == 1: raise api_error(429, "Quota exceeded")
+        return {"totalUpdatedCells": sum(len(v) for entry in body["data"] for v in entry["values"])}
+
+def test_retry_resends_the_original_ranges_through_gspread():
+    http = ThrottlingHTTPClient()
+    worksheet = Worksheet(spreadsheet=None, properties={"title": "May", "sheetId": 1, "index": 0}, spreadsheet_id="sheet", client=http)
+    cells = [gspread.Cell(5, 17, 3), gspread.Cell(5, 18, 4), gspread.Cell(6, 17, 1), gspread.Cell(6, 18, 2)]
+
+    result = engine.write_cells_chunked(worksheet, cells, sleep=no_sleep)
+
+    assert result.error is None and result.retries == 1
+    assert http.sent == [["'May'!Q5:R6"], ["'May'!Q5:R6"]]
+
+def test_retry_lands_the_cells_on_the_fake_sheet():
+    client = FakeClient([["h"]], {"May": [["Scribe"], ["a"], ["b"]]})
+    worksheet = client.open_by_key(engine.DEST_SPREADSHEET_ID).worksheet("May")
+    worksheet.write_failures = [503]
+
+    result = engine.write_cells_chunked(worksheet, [gspread.Cell(2, 17, 3), gspread.Cell(3, 17, 5)], sleep=no_sleep)
+
+    assert result.error is None and result.retries == 1 and len(result.written) == 2
+    assert [row[16] for row in worksheet.rows[1:]] == ["3", "5"]
@@ -0,0 +1,235 @@
+# tl_cli.py
+# Command-line entry point for the TL Sheet Updater and Auditor, for scheduled and unattended runs.
+#
+#   python tl_cli.py update [--month October] [--dry-run] [--json]
+#   python tl_cli.py verify [--month October] [--json]
+#   python tl_cli.py watch [--month October] [--interval 600] [--dry-run] [--json]
+#
+# --month also takes a comma-separated list ("September,October") or "all" (every month tab in SS2); the tabs are
+# then loaded and processed together and a combined report is printed.
+#
+# Credentials: --credentials <service account JSON>, else $TL_SERVICE_ACCOUNT_FILE, else the
+# [gcp_service_account] section of .streamlit/secrets.toml (the same secret the app uses).
+# Leads and providers: --team-config <JSON/YAML>, else tl_team.json / $TL_TEAM_CONFIG (see tl_engine.load_team_config).
+# verify reports every configured lead (or only those given with --lead); update reports cell changes per lead.
+# Both list the SS1 names matched to SS2 names by similarity (name_matching in the team config) under name_matches;
+# update only uses scribe matches when name_matching.apply_to_updates is set, and marks each match with applied.
+# --metrics times each stage and counts HTTP calls, bytes, cache hits and retries: a summary goes to stderr and
+# the run is appended to the run log (tl_engine.RUN_LOG_PATH). watch records one run per cycle.
+# --resync-ss1 rebuilds the local SS1 store from the whole sheet (it otherwise syncs incrementally, with a full
+# rebuild on the first sync of each day), e.g. after older form responses were corrected.
+
+import argparse
+import json
+import logging
+import os.path
+import sys
+import time
+
+try: import tomllib
+except ModuleNotFoundError: import tomli as tomllib # Python < 3.11
+
+import pandas as pd
+
+from tl_engine import (
+    log, authorize_service_account, cache_stats, instrumented_run, load_team_config, load_snapshots, list_month_tabs, run_update_months, run_verify,
+    snapshot_name_resolution, render_finding, default_cutoff_date, current_month_name, UPDATE_KIND_CELLS,
+)
+
+STREAMLIT_SECRETS_FILE = os.path.join(".streamlit", "secrets.toml")
+WATCH_DEFAULT_INTERVAL_SECONDS = 600
+
+def load_service_account_info(credentials_path=None):
+    path = credentials_path or os.environ.get("TL_SERVICE_ACCOUNT_FILE")
+    if path:
+        with open(path, encoding="utf-8") as f: return json.load(f)
+    with open(STREAMLIT_SECRETS_FILE, "rb") as f: secrets = tomllib.load(f)
+    if "gcp_service_account" not in secrets: raise KeyError(f"No [gcp_service_account] section in {STREAMLIT_SECRETS_FILE}")
+    return secrets["gcp_service_account"]
+
+def _table_records(table):
+    dates = table["date"].map(lambda d: None if d is None or pd.isna(d) else d.isoformat())
+    return json.loads(table.assign(date=dates).to_json(orient="records", default_handler=str))
+
+def update_report(month, cutoff_date, outcome, dry_run):
+    write = outcome.write
+    cell_rows = outcome.table[outcome.table["kind"] == UPDATE_KIND_CELLS]
+    return {
+        "command": "update", "month": month, "cutoff_date": cutoff_date.isoformat(), "dry_run": dry_run,
+        "planned_cells": len(outcome.plan.cells), "skipped_rows": outcome.plan.skipped_rows,
+        "written_cells": len(write.written) if write else 0, "already_set_cells": len(outcome.already_set),
+        "failed_cells": len(write.failed) if write else 0, "retries": write.retries if write else 0,
+        "conflicts": len(outcome.conflicts), "updated_rows": outcome.updated_rows_count,
+        "updated_rows_by_lead": {str(lead): int(n) for lead, n in cell_rows["lead"].value_counts(sort=False).items()},
+        "error": str(write.error) if write and write.error else None,
+        "rows": _table_records(outcome.table), "name_matches": _table_records(outcome.name_matches),
+    }
+
+def verify_report(month, cutoff_date, findings, leads, name_matches):
+    """One report section per lead, all cut from the same findings table."""
+    findings = findings.assign(message=[render_finding(f) for f in findings.itertuples(index=False)])
+    by_lead = {lead: findings[findings["lead"] == lead] for lead in leads}
+    return {"command": "verify", "month": month, "cutoff_date": cutoff_date.isoformat(),
+            "issues": sum(len(f) for f in by_lead.values()),
+            "leads": [{"lead": lead, "issues": len(f), "rows": _table_records(f)} for lead, f in by_lead.items()],
+            "name_matches": _table_records(name_matches)}
+
+COMBINED_TOTAL_KEYS = {"update": ("planned_cells", "written_cells", "failed_cells", "conflicts", "skipped_rows", "updated_rows"),
+                       "verify": ("issues",)}
+
+def combined_report(reports):
+    """Single-month reports are passed through; several are wrapped with per-command totals."""
+    if len(reports) == 1: return reports[0]
+    command = reports[0]["command"]
+    combined = {"command": command, "months": [r["month"] for r in reports], "cutoff_date": reports[0]["cutoff_date"]}
+    if command == "update": combined["dry_run"] = reports[0]["dry_run"]; combined["error"] = next((r["error"] for r in reports if r["error"]), None)
+    combined.update({key: sum(r[key] for r in reports) for key in COMBINED_TOTAL_KEYS[command]})
+    combined["reports"] = reports
+    return combined
+
+def print_report(report, as_json):
+    if as_json:
+        print(json.dumps(report, ensure_ascii=False, default=str)); return
+    if "reports" in report:
+        for r in report["reports"]: print_report(r, False)
+        totals = ", ".join(f"{report[key]} {key.replace('_', ' ')}" for key in COMBINED_TOTAL_KEYS[report["command"]])
+        print(f"All {len(report['months'])} tabs ({', '.join(report['months'])}): {totals}"); return
+    if report["command"] == "update":
+        print(f"{report['month']} (up to {report['cutoff_date']}): {report['planned_cells']} cells planned, "
+              f"{report['written_cells']} written, {report['conflicts']} conflicts, {report['skipped_rows']} rows unchanged"
+              + (" [dry run]" if report["dry_run"] else ""))
+        for row in report["rows"]:
+            if row["kind"] == UPDATE_KIND_CELLS:
+                print(f"  Row {row['ss2_row']} {row['date']} {row['source']} {row['scribe']}: {row['q']}, {row['r']}")
+            else:
+                print(f"  {row['message']}")
+    else:
+        print(f"{report['month']} (up to {report['cutoff_date']}): {report['issues']} validation issues")
+        for section in report["leads"]:
+            print(f"  Lead {section['lead']}: {section['issues']} issues")
+            for row in section["rows"]: print(f"    {row['message']}")
+    for m in report["name_matches"]:
+        print(f"  {'Auto-resolved' if m['applied'] else 'Not applied: similar'} {m['kind']} '{m['name']}' -> '{m['resolved']}' (score {m['score']:.2f}"
+              + (f", {m['date']}" if m["date"] else "") + f", SS1 rows {', '.join(map(str, m['ss1_rows']))})")
+
+def print_metrics(metrics):
+    """Summary of an instrumented run on stderr; the full record is in the run log."""
+    m = metrics.as_dict()
+    lines = [f"Run '{m['run']}': {m['wall_seconds']:.2f} s" + (f" (failed: {m['error']})" if m["error"] else "")]
+    lines += [f"  {s['stage']}: {s['seconds']:.2f} s in {s['calls']} call(s)" + (f", {s['rows']} rows" if s["rows"] else "")
+              for s in m["stages"]]
+    lines += [f"  HTTP {c['call']}: {c['calls']} call(s), {c['seconds']:.2f} s, {c['bytes_received']} B in, {c['bytes_sent']} B out"
+              + (f", {c['errors']} errors" if c["errors"] else "") for c in m["http"]]
+    lines += [f"  {event}: {n}" for event, n in m["counters"].items()]
+    print("\n".join(lines), file=sys.stderr)
+
+def resolve_months(client, month_arg):
+    if not month_arg: return [current_month_name()]
+    if month_arg.strip().lower() == "all": return list_month_tabs(client)
+    return [m.strip() for m in month_arg.split(",") if m.strip()]
+
+def _load(client, months, cutoff_date, team_config, previous=None, resync_source=False):
+    """Loads the month tabs together; returns {month: snapshot} for the tabs that could be read."""
+    snapshots, _ = load_snapshots(client, months, cutoff_date, previous=previous, team_config=team_config, resync_source=resync_source,
+                                  on_loaded=lambda label, elapsed: log.info(f"{label}: done in {elapsed:.1f} s"))
+    for month in months:
+        if snapshots[month] is None: log.error(f"Could not load data for sheet '{month}' in Destination (SS2).")
+    for stats in cache_stats():
+        log.info(f"{stats['cache']} cache: {stats['hits']} hits, {stats['misses']} misses, {stats['entries']}/{stats['max_entries']} entries")
+    return {month: snapshot for month, snapshot in snapshots.items() if snapshot is not None}
+
+def _selected_leads(team_config, lead_args):
+    unknown = [lead for lead in lead_args or [] if lead not in team_config.leads]
+    if unknown: raise SystemExit(f"Unknown lead(s) {', '.join(unknown)}; configured: {', '.join(team_config.leads)}")
+    return lead_args or list(team_config.leads)
+
+def _update_reports(snapshots, cutoff_date, dry_run, team_config):
+    outcomes = run_update_months(snapshots, cutoff_date, team_config, dry_run=dry_run)
+    return combined_report([update_report(month, cutoff_date, outcome, dry_run) for month, outcome in outcomes.items()])
+
+def cmd_update(client, args):
+    months, cutoff_date = resolve_months(client, args.month), default_cutoff_date()
+    snapshots = _load(client, months, cutoff_date, args.team_config, resync_source=args.resync_ss1) if months else {}
+    if not snapshots: return 1
+    report = _update_reports(snapshots, cutoff_date, args.dry_run, args.team_config)
+    print_report(report, args.json)
+    return 1 if report["error"] or len(snapshots) < len(months) else 0
+
+def cmd_verify(client, args):
+    leads = _selected_leads(args.team_config, args.lead)
+    months, cutoff_date = resolve_months(client, args.month), default_cutoff_date()
+    snapshots = _load(client, months, cutoff_date, args.team_config, resync_source=args.resync_ss1) if months else {}
+    if not snapshots: return 1
+    print_report(combined_report([verify_report(month, cutoff_date, run_verify(snapshot, cutoff_date, args.team_config), leads,
+                                                snapshot_name_resolution(snapshot, args.team_config).matches)
+                                  for month, snapshot in snapshots.items()]), args.json)
+    return 1 if len(snapshots) < len(months) else 0
+
+def cmd_watch(client, args):
+    """
+    Keeps the client and the last snapshot in memory and runs an update every --interval seconds. Each cycle
+    re-reads SS2, syncs the SS1 store incrementally and revalidates the cached workbook; indexes are rebuilt
+    only for the parts that changed, and rows whose inputs did not change are not re-planned.
+    """
+    snapshots = {}; resync_source = args.resync_ss1 # Only the first cycle
+    while True:
+        started = time.monotonic()
+        try:
+            with instrumented_run("watch", enabled=args.metrics) as metrics:
+                months, cutoff_date = resolve_months(client, args.month), default_cutoff_date()
+                team_config = load_team_config(args.team_config_path) # Picks up edits to the config between cycles
+                snapshots = _load(client, months, cutoff_date, team_config, snapshots, resync_source) if months else {}
+                resync_source = False
+                if snapshots:
+                    print_report(_update_reports(snapshots, cutoff_date, args.dry_run, team_config), args.json)
+                    sys.stdout.flush()
+            if metrics: print_metrics(metrics)
+        except Exception:
+            log.exception("Watch cycle failed; retrying at the next interval")
+            snapshots = {}
+        time.sleep(max(0.0, args.interval - (time.monotonic() - started)))
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="TL Sheet Updater and Auditor (command line)")
+    parser.add_argument("--credentials", help="Service account JSON key file")
+    parser.add_argument("--team-config", dest="team_config_path", help="Team configuration (JSON, or YAML with PyYAML installed)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Log progress messages to stderr")
+    parser.add_argument("--metrics", action="store_true", help="Time each stage and count API calls; summary on stderr, record in the run log")
+    parser.add_argument("--resync-ss1", action="store_true", help="Rebuild the local SS1 store from the whole sheet instead of syncing new rows")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name, func, help_text in (("update", cmd_update, "Fill in Q/R counts for a month tab"),
+                                  ("verify", cmd_verify, "Run the validation report for a month tab"),
+                                  ("watch", cmd_watch, "Keep running updates on a schedule")):
+        p = sub.add_parser(name, help=help_text)
+        p.set_defaults(func=func)
+        p.add_argument("--month", help="SS2 month tab, a comma-separated list of tabs, or 'all' (default: current month in IST)")
+        p.add_argument("--json", action="store_true", help="Print the result as JSON")
+        if name != "verify": p.add_argument("--dry-run", action="store_true", help="Plan the updates without writing them")
+        if name == "verify": p.add_argument("--lead", action="append", help="Report only this lead (repeatable; default: every configured lead)")
+        if name == "watch": p.add_argument("--interval", type=float, default=WATCH_DEFAULT_INTERVAL_SECONDS, help="Seconds between runs")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format="%(levelname)s %(message)s", stream=sys.stderr)
+    try:
+        args.team_config = load_team_config(args.team_config_path)
+    except Exception as e:
+        log.error(f"Could not read the team configuration: {e}")
+        return 1
+    try:
+        client = authorize_service_account(load_service_account_info(args.credentials))
+    except Exception as e:
+        log.error(f"Failed to authorize gspread client with Service Account: {e}")
+        return 1
+    try:
+        if args.command == "watch": return args.func(client, args) # One instrumented run per cycle
+        with instrumented_run(args.command, enabled=args.metrics) as metrics:
+            exit_code = args.func(client, args)
+        if metrics: print_metrics(metrics)
+        return exit_code
+    except KeyboardInterrupt:
+        return 130
+
+if __name__ == "__main__":
+    sys.exit(main())
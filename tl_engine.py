@@ -0,0 +1,1903 @@
+# tl_engine.py
+# Core of the TL Sheet Updater and Auditor: reading SS1, SS2 and the SharePoint Excel, planning and writing
+# the Q/R updates, and validation. It has no Streamlit dependency; the app (TLsheetUpdater.py) and the
+# command line (tl_cli.py) both drive it.
+
+import gspread
+from google.oauth2.service_account import Credentials as ServiceAccountCredentials
+from google.auth.transport.requests import AuthorizedSession
+import os.path
+
+from datetime import datetime, timedelta
+import pytz
+import pandas as pd
+import numpy as np
+import openpyxl
+import requests
+import traceback
+import re
+import time
+import logging
+import functools
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+import json
+import hashlib
+import itertools
+import sqlite3
+import pickle
+import glob
+import random
+import tempfile
+import calendar
+import difflib
+import heapq
+import threading
+import contextlib
+import contextvars
+import urllib.parse
+from collections import namedtuple, OrderedDict, Counter
+from enum import IntEnum
+
+# --- Configuration ---
+# Ensure these IDs and names are correct
+SOURCE_SPREADSHEET_ID = '1Fo3-zzub663AnMLIPpgHVpP5Dsb7Zk2H554PFDHliY8'
+DEST_SPREADSHEET_ID = '17SFltoaYiEVVHDN7flctrHn1TKj01xCCyrsoiCN7L8c'
+SOURCE_SHEET_INDEX = 0 # 'Form responses 1'
+# DEST_TARGET_MONTH_SHEET_NAME will be set by user input
+
+EXCEL_SHAREPOINT_URL = 'https://panaceasolutionsllc-my.sharepoint.com/:x:/p/saqib/EQuk1cHbsH9KtafkGnzmaiABUBtt4x-5vamjr5hdpGsQwg'
+
+# Column indices (0-based for reading lists of lists from gspread)
+# Source Sheet (SS1 - 'Form responses 1')
+SRC_COL_DATE_OF_SERVICE = 2
+SRC_COL_COVERAGE_TYPE = 3
+SRC_COL_PROVIDER_NAME_READ = 4 # For validation
+SRC_COL_SCHEDULED_ZOOM = 6
+SRC_COL_UPLOADED_EOD = 7
+SRC_COL_SCRIBE_NAME = 13
+
+# Destination Sheet (SS2 - 'May' tab, etc.)
+DEST_COL_A_SCRIBE_NAME_READ = 0
+DEST_COL_B_LEAD_READ = 1
+DEST_COL_C_DATE_READ = 2
+DEST_COL_E_TASK_ASSIGNED_READ = 4
+DEST_COL_F_PROVIDER_COVERED_READ = 5
+DEST_COL_Q_SCHEDULED_READ = 16
+DEST_COL_R_UPLOADED_READ = 17
+
+# Columns actually read from each sheet; only these are fetched from the API (see get_projected_values)
+SRC_READ_COLUMNS = (SRC_COL_DATE_OF_SERVICE, SRC_COL_COVERAGE_TYPE, SRC_COL_PROVIDER_NAME_READ,
+                    SRC_COL_SCHEDULED_ZOOM, SRC_COL_UPLOADED_EOD, SRC_COL_SCRIBE_NAME)
+DEST_READ_COLUMNS = (DEST_COL_A_SCRIBE_NAME_READ, DEST_COL_B_LEAD_READ, DEST_COL_C_DATE_READ,
+                     DEST_COL_E_TASK_ASSIGNED_READ, DEST_COL_F_PROVIDER_COVERED_READ,
+                     DEST_COL_Q_SCHEDULED_READ, DEST_COL_R_UPLOADED_READ)
+
+# Column numbers (1-based for gspread cell updates)
+DEST_COL_Q_SCHEDULED_WRITE = 17
+DEST_COL_R_UPLOADED_WRITE = 18
+
+SPECIAL_PROVIDER_FULL_NAMES = [
+    "Alison Blake", "Amanda DeBois", "Heather Reynolds",
+    "Melanie Arrington", "Nikki Kelly", "Sarah Driggs", "Danelle Schmutz"
+]
+
+# !!! USER ACTION REQUIRED: Verify/Update this list precisely !!!
+# Providers managed by "Saqib Sherwani" - names as they appear in SS2 Column F
+MY_MANAGED_PROVIDERS = [
+    "Erin Henderson",
+    "Kei Batangan",
+    "Dr. Christine Potterjones", # Corrected from "Dr. Christine Potterjones" if that was a typo
+    "Amanda Reda Goglio",
+    "Dr. Kirmani Moe",
+    "Dr. Mark Basham",
+    "Alison Blake",       # Also in SPECIAL_PROVIDER_FULL_NAMES
+    "Amanda DeBois",      # Also in SPECIAL_PROVIDER_FULL_NAMES
+    "Heather Reynolds",   # Also in SPECIAL_PROVIDER_FULL_NAMES
+    "Melanie Arrington",  # Also in SPECIAL_PROVIDER_FULL_NAMES
+    "Nikki Kelly",        # Also in SPECIAL_PROVIDER_FULL_NAMES
+    "Sarah Driggs",       # Also in SPECIAL_PROVIDER_FULL_NAMES
+    "Danelle Schmutz",    # Also in SPECIAL_PROVIDER_FULL_NAMES
+    "Celeste Callinan",
+    "Seana Wishart",
+    "Beth Sanford",
+    "Dr. Kaleb Wartgow",
+    "Chinor Fattahi"
+    # Add any other specific providers from SS2 Col F that are managed by Saqib Sherwani
+    # and remove any that are not. The list you provided has been used here.
+    # Ensure these names are exactly as they appear in SS2, Column F.
+]
+
+# --- Team configuration ---
+# Leads, the SS2 providers each one manages (matched against SS2 Columns B and F) and the RMS providers (whose
+# counts come from the SharePoint Excel) are read from a JSON file, or YAML if PyYAML is installed:
+#   {"rms_providers": ["Alison Blake", ...],
+#    "leads": {"Saqib Sherwani": {"managed_providers": ["Erin Henderson", ...]}, "Other Lead": {...}},
+#    "name_matching": {"threshold": 0.88, "apply_to_updates": false}}
+# See tl_team.example.json. Without the file the lists above are used as a single-lead configuration.
+TEAM_CONFIG_PATH = os.environ.get("TL_TEAM_CONFIG", "tl_team.json")
+DEFAULT_LEAD_NAME = "Saqib Sherwani"
+NAME_MATCH_THRESHOLD = 0.88 # Similarity (0-1] an SS1 name needs to be auto-resolved to an SS2 name; null in the config turns it off
+# Auto-resolved scribe names only change what verify reports unless apply_to_updates is set: a similar name on the tab
+# can be a different person, and the planner would then write their SS1 counts into that person's row.
+NAME_MATCH_APPLY_TO_UPDATES = False
+
+# leads: {lead: frozenset(providers)} in file order; rms_provider_names keeps the file order for reading the Excel;
+# rms_providers and managed_pairs ((lead, provider) pairs) are the sets rows are checked against.
+TeamConfig = namedtuple("TeamConfig", ["leads", "rms_provider_names", "rms_providers", "managed_pairs", "name_match_threshold",
+                                       "name_match_updates", "source"])
+
+def compile_team_config(raw, source="<built-in>"):
+    """Checks a parsed team config and compiles it into a TeamConfig. Raises ValueError on a malformed config."""
+    if not isinstance(raw, dict) or not isinstance(raw.get("leads"), dict) or not raw["leads"]:
+        raise ValueError(f"Team config {source}: expected a non-empty 'leads' mapping of lead name -> {{'managed_providers': [...]}}")
+    leads = {}
+    for lead, entry in raw["leads"].items():
+        providers = entry.get("managed_providers") if isinstance(entry, dict) else entry
+        if not isinstance(providers, list) or not all(isinstance(p, str) for p in providers):
+            raise ValueError(f"Team config {source}: lead '{lead}' needs a list of provider names under 'managed_providers'")
+        leads[str(lead).strip()] = frozenset(p.strip() for p in providers)
+    rms = raw.get("rms_providers", [])
+    if not isinstance(rms, list) or not all(isinstance(p, str) for p in rms):
+        raise ValueError(f"Team config {source}: 'rms_providers' must be a list of provider names")
+    rms_names = tuple(dict.fromkeys(p.strip() for p in rms))
+    matching = raw.get("name_matching", {})
+    threshold = matching.get("threshold", NAME_MATCH_THRESHOLD) if isinstance(matching, dict) else None
+    if not isinstance(matching, dict) or (threshold is not None and (isinstance(threshold, bool) or not isinstance(threshold, (int, float))
+                                                                      or not 0 < threshold <= 1)):
+        raise ValueError(f"Team config {source}: 'name_matching' must be {{'threshold': <number in (0, 1]> or null}}")
+    apply_to_updates = matching.get("apply_to_updates", NAME_MATCH_APPLY_TO_UPDATES)
+    if not isinstance(apply_to_updates, bool):
+        raise ValueError(f"Team config {source}: 'name_matching.apply_to_updates' must be true or false")
+    return TeamConfig(leads, rms_names, frozenset(rms_names),
+                      frozenset((lead, p) for lead, providers in leads.items() for p in providers), threshold, apply_to_updates, source)
+
+BUILTIN_TEAM_CONFIG = compile_team_config({"rms_providers": SPECIAL_PROVIDER_FULL_NAMES,
+                                           "leads": {DEFAULT_LEAD_NAME: {"managed_providers": MY_MANAGED_PROVIDERS}}})
+_team_config_cache = {} # path -> (mtime_ns, TeamConfig)
+
+def load_team_config(path=None):
+    """
+    TeamConfig from `path` (default TEAM_CONFIG_PATH), re-read only when the file changes. The built-in
+    single-lead config is returned when no path is given and the default file does not exist.
+    """
+    if path is None and not os.path.exists(TEAM_CONFIG_PATH): return BUILTIN_TEAM_CONFIG
+    path = path or TEAM_CONFIG_PATH
+    mtime = os.stat(path).st_mtime_ns
+    cached = _team_config_cache.get(path)
+    if cached and cached[0] == mtime: return cached[1]
+    with open(path, encoding="utf-8") as f:
+        if path.lower().endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise ImportError(f"Reading {path} needs PyYAML (pip install pyyaml); a JSON config works without it.") from None
+            raw = yaml.safe_load(f)
+        else:
+            raw = json.load(f)
+    config = compile_team_config(raw, path)
+    _team_config_cache[path] = (mtime, config)
+    return config
+
+
+# Local on-disk cache (SS1 response store, downloaded workbook, etc.)
+CACHE_DIR = os.environ.get("TL_CACHE_DIR", ".tl_cache")
+SS1_STORE_PATH = os.path.join(CACHE_DIR, "ss1_responses.sqlite3")
+SS1_TAIL_CHECK_ROWS = 5 # Stored tail rows re-read on each sync to detect edits to history
+
+# Path to your OAuth credentials.json file
+CREDENTIALS_FILE = 'credentials.json' # Download from Google Cloud Console
+TOKEN_FILE = 'token.json' # Will be created after first successful auth
+OAUTH_SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
+
+
+# --- Notifications ---
+# Helpers report through `notify` rather than printing or calling Streamlit. Its target is anything with
+# error/warning/info/success methods: the app points it at the streamlit module, the CLI keeps the logger.
+log = logging.getLogger("tl_engine")
+
+class _LogTarget:
+    def error(self, msg): log.error(msg)
+    def warning(self, msg): log.warning(msg)
+    def info(self, msg): log.info(msg)
+    def success(self, msg): log.info(msg)
+
+class Notifier:
+    def __init__(self, target): self.target = target
+    def use(self, target): self.target = target
+    def error(self, msg): self.target.error(msg)
+    def warning(self, msg): self.target.warning(msg)
+    def info(self, msg): self.target.info(msg)
+    def success(self, msg): self.target.success(msg)
+
+notify = Notifier(_LogTarget())
+
+# --- Run instrumentation ---
+# A run (one load, update or verify, or one watch cycle) can record where its time went: wall time and rows per
+# stage, every HTTP call made on the pooled sessions (so every gspread call and the SharePoint download) with its
+# bytes, cache hits and Sheets retries. instrumented_run() switches it on for the code inside the block; the active
+# RunMetrics sits in a context variable, so with no run active each hook costs one lookup that returns None.
+# Stage seconds are summed over threads: concurrent loads can add up to more than the run's wall time.
+RUN_LOG_PATH = os.path.join(CACHE_DIR, "run_log.jsonl") # One JSON object per instrumented run
+RUN_LOG_MAX_BYTES = 5 * 1024 * 1024 # Past this size the log is rotated to <path>.1 (one older file is kept)
+
+class RunMetrics:
+    """Thread-safe counters for one instrumented run; as_dict() is what the run log and the app show."""
+
+    def __init__(self, label):
+        self.label, self.started_at, self.wall_seconds, self.error = label, time.time(), None, None
+        self.stages = {}; self.http = {}; self.counters = Counter()
+        self._lock = threading.Lock(); self._started = time.perf_counter()
+
+    def add_stage(self, name, seconds, rows=None):
+        with self._lock:
+            entry = self.stages.setdefault(name, {"stage": name, "calls": 0, "seconds": 0.0, "rows": None})
+            entry["calls"] += 1; entry["seconds"] += seconds
+            if rows is not None: entry["rows"] = (entry["rows"] or 0) + rows
+
+    def add_http_call(self, call, seconds, bytes_received, bytes_sent, status):
+        with self._lock:
+            entry = self.http.setdefault(call, {"call": call, "calls": 0, "seconds": 0.0, "bytes_received": 0, "bytes_sent": 0, "errors": 0})
+            entry["calls"] += 1; entry["seconds"] += seconds
+            entry["bytes_received"] += bytes_received; entry["bytes_sent"] += bytes_sent
+            if status >= 400: entry["errors"] += 1
+
+    def count(self, event, n=1):
+        with self._lock: self.counters[event] += n
+
+    def finish(self): self.wall_seconds = time.perf_counter() - self._started
+
+    def as_dict(self):
+        with self._lock:
+            return {"run": self.label, "started": datetime.fromtimestamp(self.started_at, pytz.utc).isoformat(timespec="seconds"),
+                    "wall_seconds": self.wall_seconds, "error": self.error,
+                    "stages": sorted((dict(s) for s in self.stages.values()), key=lambda s: -s["seconds"]),
+                    "http": sorted((dict(c) for c in self.http.values()), key=lambda c: -c["seconds"]),
+                    "counters": dict(sorted(self.counters.items()))}
+
+_active_run = contextvars.ContextVar("tl_active_run", default=None)
+
+def append_run_log(metrics, log_path=RUN_LOG_PATH, max_bytes=RUN_LOG_MAX_BYTES):
+    try:
+        os.makedirs(os.path.dirname(log_path) or ".", exist_ok=True)
+        with contextlib.suppress(FileNotFoundError): # No log yet, or another process just rotated it
+            if max_bytes and os.path.getsize(log_path) >= max_bytes: os.replace(log_path, log_path + ".1")
+        with open(log_path, "a", encoding="utf-8") as f: f.write(json.dumps(metrics.as_dict(), ensure_ascii=False, default=str) + "\n")
+    except OSError as e: log.warning(f"Could not append to the run log {log_path}: {e}")
+
+@contextlib.contextmanager
+def instrumented_run(label, enabled=True, log_path=RUN_LOG_PATH):
+    """
+    Collects RunMetrics for everything run inside the block, including worker threads started through
+    _submit_in_context. Yields the RunMetrics (None when not enabled) and appends them to log_path at the end.
+    """
+    if not enabled:
+        yield None; return
+    metrics = RunMetrics(label); token = _active_run.set(metrics)
+    try: yield metrics
+    except BaseException as e:
+        metrics.error = f"{type(e).__name__}: {e}"; raise
+    finally:
+        _active_run.reset(token); metrics.finish()
+        if log_path: append_run_log(metrics, log_path)
+
+def _submit_in_context(pool, func, *args):
+    # Worker threads do not inherit context variables; run the task in a copy of the caller's context
+    return pool.submit(contextvars.copy_context().run, func, *args)
+
+def count_event(event, n=1):
+    metrics = _active_run.get()
+    if metrics is not None: metrics.count(event, n)
+
+def record_stage(name, seconds, rows=None):
+    metrics = _active_run.get()
+    if metrics is not None: metrics.add_stage(name, seconds, rows)
+
+@contextlib.contextmanager
+def _timed_stage(metrics, name, rows):
+    started = time.perf_counter()
+    try: yield
+    finally: metrics.add_stage(name, time.perf_counter() - started, rows)
+
+_NO_STAGE = contextlib.nullcontext()
+
+def stage(name, rows=None):
+    """Context manager timing a block as stage `name` of the active run."""
+    metrics = _active_run.get()
+    return _NO_STAGE if metrics is None else _timed_stage(metrics, name, rows)
+
+def instrumented_stage(name, rows=None):
+    """Decorator timing each call as stage `name`; rows(result, *args, **kwargs) gives the rows the call processed."""
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            metrics = _active_run.get()
+            if metrics is None: return func(*args, **kwargs)
+            started = time.perf_counter(); result, done = None, False
+            try:
+                result = func(*args, **kwargs); done = True
+                return result
+            finally:
+                metrics.add_stage(name, time.perf_counter() - started, rows(result, *args, **kwargs) if rows and done else None)
+        return wrapper
+    return decorate
+
+def _record_http_response(response, *args, **kwargs):
+    """Response hook on the pooled sessions: one HTTP call (host plus Sheets API verb or HTTP method) of the active run."""
+    metrics = _active_run.get()
+    if metrics is None: return
+    request = response.request; url = urllib.parse.urlsplit(request.url)
+    verb = url.path.rsplit(":", 1)[-1] if ":" in url.path and (url.hostname or "").endswith("googleapis.com") else request.method
+    # Streamed bodies (the workbook download) are read later by the caller; count the declared length
+    received = int(response.headers.get("Content-Length") or 0) if kwargs.get("stream") else len(response.content)
+    body = request.body or b""
+    metrics.add_http_call(f"{url.hostname} {verb}", response.elapsed.total_seconds(), received,
+                          len(body.encode("utf-8") if isinstance(body, str) else body), response.status_code)
+
+IST_TIMEZONE = pytz.timezone('Asia/Kolkata')
+
+def default_cutoff_date(now_ist=None):
+    """Yesterday in IST: the last day whose data is processed."""
+    return ((now_ist or datetime.now(IST_TIMEZONE)) - timedelta(days=1)).date()
+
+def current_month_name(now_ist=None):
+    return (now_ist or datetime.now(IST_TIMEZONE)).strftime("%B")
+
+# --- Helper Functions ---
+
+# Excel 'Count' cell: the raw value as read, its integer count (0 for blank/"NW"/non-numeric) and which state it is in
+ExcelCount = namedtuple("ExcelCount", ["raw", "count", "state"])
+EXCEL_COUNT_EMPTY, EXCEL_COUNT_NW, EXCEL_COUNT_NUMBER, EXCEL_COUNT_INVALID = "empty", "nw", "number", "invalid"
+
+# Credential suffixes stripped from provider names, tried in this order (longer forms before their prefixes)
+PROVIDER_NAME_SUFFIXES = ["NP-C", "FNP-C", "PA-C", "NP", "PA", "FNP", "Ng", "APRN", "MD", "DO", "DNP"]
+
+class ProviderNameNormalizer:
+    """
+    Normalizes provider names for comparison ('Dr. Jane Doe, NP-C' -> 'jane doe') with all patterns compiled once.
+    Results are interned per distinct input string, so the cost grows with unique names rather than rows.
+    """
+    _title_re = re.compile(r'^[Dd][Rr][sS]?\.\s*')
+    _trailing_parens_re = re.compile(r'\s*\([^)]*\)$')
+
+    def __init__(self, suffixes=PROVIDER_NAME_SUFFIXES, max_cache_entries=50000):
+        escaped = [re.escape(sfx) for sfx in suffixes]
+        # Each suffix is stripped in turn (", NP" anywhere, then " NP" at the end), exactly as before;
+        # the combined pattern only decides whether any of those substitutions can apply at all.
+        self._suffix_res = ([re.compile(r',\s*' + e, re.IGNORECASE) for e in escaped] +
+                            [re.compile(r'\s+' + e + '$', re.IGNORECASE) for e in escaped])
+        alternation = '|'.join(escaped)
+        self._any_suffix_re = re.compile(rf',\s*(?:{alternation})|\s+(?:{alternation})$', re.IGNORECASE)
+        self.max_cache_entries = max_cache_entries
+        self._cache = {}; self.hits = 0; self.misses = 0
+
+    def _normalize(self, name):
+        name = self._title_re.sub('', name.strip())
+        if self._any_suffix_re.search(name):
+            for suffix_re in self._suffix_res: name = suffix_re.sub('', name)
+        name = self._trailing_parens_re.sub('', name)
+        return name.replace(',', '').strip().lower()
+
+    def __call__(self, name_str):
+        if not isinstance(name_str, str): return ""
+        cached = self._cache.get(name_str)
+        if cached is not None: self.hits += 1; return cached
+        self.misses += 1
+        if len(self._cache) >= self.max_cache_entries: self._cache.clear()
+        result = self._cache[name_str] = self._normalize(name_str)
+        return result
+
+    def normalize_many(self, names):
+        """Normalizes a whole column, doing the work once per distinct value."""
+        distinct = {name: self(name) for name in dict.fromkeys(n for n in names if isinstance(n, str))}
+        return [distinct.get(name, "") if isinstance(name, str) else "" for name in names]
+
+    def cache_info(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self._cache)}
+
+provider_name_normalizer = ProviderNameNormalizer()
+
+def normalize_provider_name(name_str):
+    return provider_name_normalizer(name_str)
+
+# Date formats tried in order; the first one that parses wins (so an ambiguous '05/06/2025' is read day-first)
+DATE_FORMATS = ["%d/%m/%Y", "%m/%d/%Y", "%d/%m/%y", "%m/%d/%y", "%Y-%m-%d"]
+DATE_MEMO_MAX_ENTRIES = 20000
+_parsed_date_memo = {} # stripped date string -> date or None; a month tab only has ~31 distinct values
+_MISSING = object()
+
+def _parse_date_uncached(date_str):
+    for fmt in DATE_FORMATS:
+        try: return datetime.strptime(date_str, fmt).date()
+        except ValueError: continue
+    try: return datetime.fromisoformat(date_str.split(' ')[0]).date()
+    except ValueError: pass
+    return None
+
+def _remember_dates(parsed):
+    if len(_parsed_date_memo) + len(parsed) > DATE_MEMO_MAX_ENTRIES: _parsed_date_memo.clear()
+    _parsed_date_memo.update(parsed)
+
+def parse_date_flexible(date_str):
+    if not date_str or not isinstance(date_str, str): return None
+    date_str = date_str.strip()
+    p_date = _parsed_date_memo.get(date_str, _MISSING) # One lookup: another thread may clear the memo at any time
+    if p_date is _MISSING:
+        p_date = _parse_date_uncached(date_str); _remember_dates({date_str: p_date})
+    return p_date
+
+# Result of parse_date_column: one date (or None) per input value, the format most of the column uses,
+# and the values whose reading depends on the format, as (value, date used, other format, date under it).
+DateColumn = namedtuple("DateColumn", ["dates", "dominant_format", "ambiguous"])
+
+def _parse_with_format(values, fmt):
+    parsed = pd.to_datetime(pd.Series(values, dtype=object), format=fmt, errors='coerce')
+    return [None if pd.isna(ts) else ts.date() for ts in parsed]
+
+@instrumented_stage("date parsing", rows=lambda result, values, *args, **kwargs: len(values))
+def parse_date_column(values, sample_size=200):
+    """
+    Parses a whole column of date strings, giving exactly what parse_date_flexible would for each cell.
+    Distinct values are parsed once, a format at a time over the column (first format wins, as in
+    DATE_FORMATS), with the per-cell fallback only for values no format matches. The column's dominant
+    format is inferred from a sample; values that format would read as a different date are reported
+    in .ambiguous rather than silently re-interpreted.
+    """
+    keys = [v.strip() if isinstance(v, str) else "" for v in values]
+    distinct = [k for k in dict.fromkeys(keys) if k]
+
+    sample = distinct[:sample_size]; format_hits = {}
+    for fmt in DATE_FORMATS:
+        format_hits[fmt] = sum(d is not None for d in _parse_with_format(sample, fmt)) if sample else 0
+    best = max(format_hits.values(), default=0)
+    dominant_formats = [fmt for fmt in DATE_FORMATS if best and format_hits[fmt] == best] # Several if tied
+
+    resolved = {}; chosen_format = {}; remaining = distinct
+    for fmt in DATE_FORMATS:
+        if not remaining: break
+        unresolved = []
+        for value, p_date in zip(remaining, _parse_with_format(remaining, fmt)):
+            if p_date is None: unresolved.append(value)
+            else: resolved[value] = p_date; chosen_format[value] = fmt
+        remaining = unresolved
+    for value in remaining: resolved[value] = _parse_date_uncached(value) # Outliers, e.g. ISO timestamps
+
+    ambiguous = []
+    for fmt in dominant_formats:
+        others = [v for v in chosen_format if chosen_format[v] != fmt]
+        for value, alt_date in zip(others, _parse_with_format(others, fmt)):
+            if alt_date is not None and alt_date != resolved[value]:
+                ambiguous.append((value, resolved[value], fmt, alt_date))
+    _remember_dates(resolved)
+    return DateColumn([resolved.get(k) for k in keys], dominant_formats[0] if dominant_formats else None, ambiguous)
+
+def column_ranges_a1(col_indices):
+    """Groups 0-based column indices into contiguous A1 column ranges, e.g. (0, 1, 2, 4, 16) -> ['A:C', 'E:E', 'Q:Q']."""
+    ranges = []
+    for col in sorted(set(col_indices)):
+        if ranges and ranges[-1][1] == col - 1: ranges[-1][1] = col
+        else: ranges.append([col, col])
+    to_letter = lambda c: gspread.utils.rowcol_to_a1(1, c + 1)[:-1]
+    return [(start, f"{to_letter(start)}:{to_letter(end)}") for start, end in ranges]
+
+@instrumented_stage("sheets read", rows=lambda result, *args, **kwargs: len(result))
+def get_projected_values(worksheet, col_indices, start_row=1):
+    """
+    Reads only the given columns (from start_row down) with a single batched request and returns them as
+    full-width rows (same shape as get_all_values), with the columns that were not fetched left as empty strings.
+    """
+    ranges = column_ranges_a1(col_indices)
+    if start_row > 1: # 'C:E' -> 'C10:E'
+        ranges = [(c, a1.replace(":", f"{start_row}:", 1)) for c, a1 in ranges]
+    value_ranges = worksheet.batch_get([a1 for _, a1 in ranges])
+    width = max(col_indices) + 1
+    row_count = max((len(vr) for vr in value_ranges), default=0)
+    rows = [[""] * width for _ in range(row_count)]
+    for (start_col, _), vr in zip(ranges, value_ranges):
+        for r_idx, values in enumerate(vr):
+            rows[r_idx][start_col:start_col + len(values)] = values
+    return rows
+
+# --- Compact sheet rows ---
+# Snapshots keep SS1 and the SS2 tabs as CompactRows instead of lists of lists of str: only the projected
+# columns, each an array of small integer codes into one table of distinct strings. Names, leads, tasks and
+# dates repeat on nearly every row, so a cell costs 2-4 bytes instead of a list slot plus its own str object.
+COMPACT_ROWS_BLOCK = 1024 # Rows decoded per step when iterating
+
+class CompactRows:
+    """
+    Dictionary-encoded, column-projected copy of a sheet's rows (header first). Indexing, slicing and iteration
+    give the rows back as plain lists (full width, unprojected columns empty), so code written for lists of lists
+    works unchanged; slices share the code arrays instead of copying them.
+    """
+
+    def __init__(self, rows, columns):
+        self.columns = tuple(sorted(columns)); self.width = max(self.columns) + 1
+        self.values = [""]; self._codes_by_value = {"": 0}
+        codes = np.zeros((len(rows), len(self.columns)), dtype=np.uint32)
+        for i, row in enumerate(rows):
+            for j, col in enumerate(self.columns):
+                if col < len(row) and row[col] != "": codes[i, j] = self._code(row[col])
+        self.codes = codes.astype(np.uint16) if len(self.values) <= np.iinfo(np.uint16).max else codes
+        self.lengths = np.fromiter((min(len(row), self.width) for row in rows), dtype=np.uint8, count=len(rows))
+
+    def _code(self, value):
+        value = value if isinstance(value, str) else str(value)
+        code = self._codes_by_value.get(value)
+        if code is None:
+            code = self._codes_by_value[value] = len(self.values); self.values.append(value)
+        return code
+
+    def _view(self, codes, lengths):
+        view = object.__new__(CompactRows)
+        view.__dict__.update(self.__dict__); view.codes, view.lengths = codes, lengths
+        return view
+
+    def _decode(self, length, code_row):
+        row = [""] * length
+        for col, code in zip(self.columns, code_row):
+            if col < length: row[col] = self.values[code]
+        return row
+
+    def __len__(self): return len(self.lengths)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice): return self._view(self.codes[index], self.lengths[index])
+        return self._decode(int(self.lengths[index]), self.codes[index].tolist())
+
+    def __iter__(self):
+        for start in range(0, len(self), COMPACT_ROWS_BLOCK):
+            block = slice(start, start + COMPACT_ROWS_BLOCK)
+            for length, code_row in zip(self.lengths[block].tolist(), self.codes[block].tolist()):
+                yield self._decode(length, code_row)
+
+    def __eq__(self, other):
+        if not isinstance(other, CompactRows): return NotImplemented
+        if self.columns != other.columns or not np.array_equal(self.lengths, other.lengths): return False
+        if self.values == other.values: return np.array_equal(self.codes, other.codes)
+        # Same strings coded differently (e.g. after set_cell); compare the decoded cells
+        return np.array_equal(np.asarray(self.values, dtype=object)[self.codes], np.asarray(other.values, dtype=object)[other.codes])
+
+    def column(self, col, derive=None):
+        """Object array of one projected column, one value per row, with derive(value) computed once per distinct value."""
+        codes = self.codes[:, self.columns.index(col)]
+        table = np.empty(len(self.values), dtype=object)
+        for code in np.unique(codes).tolist(): table[code] = self.values[code] if derive is None else derive(self.values[code])
+        return table[codes]
+
+    def set_cell(self, index, col, value):
+        """Sets one cell of a projected column in place (0-based row index and column)."""
+        code = self._code(value)
+        if code > np.iinfo(self.codes.dtype).max: self.codes = self.codes.astype(np.uint32)
+        self.codes[index, self.columns.index(col)] = code
+        self.lengths[index] = max(int(self.lengths[index]), col + 1)
+
+# --- In-process caches ---
+# Indexes derived from SS1 and the Excel lookup are kept in memory across reruns, sessions and watch cycles.
+# They are keyed by a fingerprint of their input (the SS1 content digest, the workbook's SHA-256) rather than
+# by the data itself, so a lookup costs a tuple comparison however large the sheet is.
+
+class FingerprintCache:
+    """Thread-safe, size-bounded LRU of derived values keyed by input fingerprints, with hit/miss counters."""
+
+    def __init__(self, name, max_entries):
+        self.name, self.max_entries = name, max_entries
+        self._entries = OrderedDict(); self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            hit = key in self._entries
+            if hit: self._entries.move_to_end(key); self.hits += 1; value = self._entries[key]
+            else: self.misses += 1; value = default
+        count_event(f"{self.name} cache {'hit' if hit else 'miss'}")
+        return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value; self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False); self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        # compute() runs outside the lock; two threads missing the same key at once both compute it
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute(); self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock: self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {"cache": self.name, "entries": len(self._entries), "max_entries": self.max_entries, "hits": self.hits,
+                "misses": self.misses, "evictions": self.evictions, "hit_rate": self.hits / lookups if lookups else None}
+
+SS1_INDEX_CACHE = FingerprintCache("SS1 indexes", max_entries=4)     # (SS1 digest, cutoff) -> date column, match and validation maps
+EXCEL_LOOKUP_CACHE = FingerprintCache("Excel lookup", max_entries=4) # derived pickle path (workbook SHA, RMS list, cutoff) -> lookup
+
+def cache_stats():
+    return [cache.stats() for cache in (SS1_INDEX_CACHE, EXCEL_LOOKUP_CACHE)]
+
+# --- Shared HTTP transport ---
+# One keep-alive connection pool per destination: the authorized session carries every gspread call,
+# and a plain session (no Google token) is used for the SharePoint download. Both report their calls to the active run.
+HTTP_POOL_SIZE = 8
+
+def _mount_pooled_adapter(session):
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE)
+    session.mount("https://", adapter); session.mount("http://", adapter)
+    session.hooks["response"].append(_record_http_response)
+    return session
+
+@functools.lru_cache(maxsize=None)
+def get_http_session():
+    session = _mount_pooled_adapter(requests.Session())
+    session.headers.update(EXCEL_DOWNLOAD_HEADERS)
+    return session
+
+def authorize_service_account(creds_info):
+    """gspread client for a service account key (the JSON key as a mapping), on a pooled authorized session."""
+    creds = ServiceAccountCredentials.from_service_account_info(creds_info, scopes=OAUTH_SCOPES)
+    return gspread.Client(auth=creds, session=_mount_pooled_adapter(AuthorizedSession(creds)))
+
+# --- Local cache files ---
+# Several app sessions, threads and CLI runs share CACHE_DIR. Files there are written to a private temp file in the
+# same directory and moved into place with os.replace, so readers only ever see a complete file and concurrent
+# writers never share a partial one.
+@contextlib.contextmanager
+def atomic_output(path, mode="wb", **kwargs):
+    """Open file for writing whose content replaces `path` only if the block completes."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=os.path.basename(path) + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode, **kwargs) as f: yield f
+        os.replace(tmp_path, path)
+    finally:
+        with contextlib.suppress(FileNotFoundError): os.remove(tmp_path)
+
+# --- SharePoint workbook cache ---
+# The downloaded workbook and the lookup derived from it are kept under CACHE_DIR/excel/<url hash>/.
+# Downloads are conditional (ETag / Last-Modified) and the bytes are content-hashed, so an unchanged
+# workbook is neither re-downloaded nor re-parsed, including after a process restart.
+EXCEL_DOWNLOAD_HEADERS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'}
+
+EXCEL_LOOKUP_FORMAT = 2 # Bump when the pickled lookup layout changes
+
+def _excel_cache_dir(excel_url):
+    return os.path.join(CACHE_DIR, "excel", hashlib.sha1(excel_url.encode("utf-8")).hexdigest()[:16])
+
+@instrumented_stage("excel download")
+def fetch_excel_workbook(excel_url, timeout=45):
+    """
+    Returns (workbook_path, content_sha256) for the SharePoint workbook, downloading it only if the server
+    reports a change. Returns (None, None) on failure (errors are shown in the app).
+    """
+    if "?" in excel_url: download_url = excel_url + "&download=1"
+    else: download_url = excel_url + "?download=1"
+    cache_dir = _excel_cache_dir(excel_url)
+    workbook_path = os.path.join(cache_dir, "workbook.xlsx"); meta_path = os.path.join(cache_dir, "meta.json")
+    os.makedirs(cache_dir, exist_ok=True)
+
+    meta = {}
+    if os.path.exists(workbook_path):
+        try:
+            with open(meta_path) as f: meta = json.load(f)
+        except (OSError, ValueError): pass # Missing or unreadable: download unconditionally
+    headers = {}
+    if meta.get("etag"): headers['If-None-Match'] = meta["etag"]
+    if meta.get("last_modified"): headers['If-Modified-Since'] = meta["last_modified"]
+
+    with get_http_session().get(download_url, headers=headers, timeout=timeout, allow_redirects=True, stream=True) as response:
+        if response.status_code == 304 and meta.get("sha256"):
+            count_event("Excel workbook not modified"); return workbook_path, meta["sha256"]
+        response.raise_for_status()
+        # A private temp file per download: concurrent loaders never write into each other's partial file
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix="workbook.", suffix=".part")
+        try:
+            digest = hashlib.sha256(); first_chunk = None
+            with os.fdopen(fd, "wb") as f:
+                for chunk in response.iter_content(chunk_size=1 << 16):
+                    if not chunk: continue
+                    if first_chunk is None: first_chunk = chunk
+                    digest.update(chunk); f.write(chunk)
+            if not first_chunk or not first_chunk.startswith(b'PK\x03\x04'):
+                notify.error("Excel Error: Downloaded content is not a valid Excel file (PK header missing)."); return None, None
+            new_meta = {"etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified"),
+                        "sha256": digest.hexdigest()}
+            if new_meta["sha256"] != meta.get("sha256"): os.replace(tmp_path, workbook_path) # Else the server re-sent identical bytes
+        finally:
+            with contextlib.suppress(FileNotFoundError): os.remove(tmp_path)
+
+    with atomic_output(meta_path, "w") as f: json.dump(new_meta, f)
+    return workbook_path, new_meta["sha256"]
+
+def _excel_derived_path(excel_url, content_sha, special_provider_full_names_list, cutoff_date):
+    key = hashlib.sha1(json.dumps([EXCEL_LOOKUP_FORMAT, sorted(special_provider_full_names_list), str(cutoff_date)]).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(_excel_cache_dir(excel_url), f"derived-{content_sha[:16]}-{key}.pickle")
+
+def load_and_map_excel_data(excel_url, special_provider_full_names_list, date_parser_func, cutoff_date):
+    try:
+        workbook_path, content_sha = fetch_excel_workbook(excel_url)
+        if workbook_path is None: return None, None
+    except Exception as e: notify.error(f"Error loading/processing Excel: {e}"); return None, None
+
+    derived_path = _excel_derived_path(excel_url, content_sha, special_provider_full_names_list, cutoff_date)
+    result = EXCEL_LOOKUP_CACHE.get(derived_path) # The path names everything the lookup depends on
+    if result is not None: return result
+    try:
+        with open(derived_path, "rb") as f: result = pickle.load(f)
+        count_event("Excel lookup read from disk")
+        EXCEL_LOOKUP_CACHE.put(derived_path, result); return result
+    except (OSError, pickle.UnpicklingError, EOFError): pass
+
+    result = map_excel_workbook(workbook_path, special_provider_full_names_list, date_parser_func, cutoff_date)
+    if result[0] is not None:
+        EXCEL_LOOKUP_CACHE.put(derived_path, result)
+        try:
+            for stale in glob.glob(os.path.join(os.path.dirname(derived_path), "derived-*.pickle")):
+                if stale != derived_path:
+                    with contextlib.suppress(FileNotFoundError): os.remove(stale) # Another loader may have removed it first
+            with atomic_output(derived_path) as f: pickle.dump(result, f)
+        except OSError as e: log.warning(f"Could not cache the Excel lookup on disk: {e}") # Only costs a re-parse next time
+    return result
+
+def map_excel_workbook(workbook_path, special_provider_full_names_list, date_parser_func, cutoff_date):
+    excel_lookup_dict = {}; dynamic_excel_col_for_provider = {}
+    try:
+        df_excel, dynamic_excel_col_for_provider = read_excel_count_columns(
+            workbook_path, special_provider_full_names_list, date_parser_func, cutoff_date)
+        if df_excel is None: return None, None
+
+        count_table = build_excel_count_table(df_excel, 'ParsedDate', dynamic_excel_col_for_provider, cutoff_date)
+        excel_lookup_dict = dict(zip(zip(count_table['date'], count_table['provider']),
+                                     map(ExcelCount._make, zip(count_table['raw'], count_table['count'], count_table['state']))))
+        if len(excel_lookup_dict) == 0 and df_excel['ParsedDate'].notna().any():
+             notify.warning("Excel Warning: excel_lookup_dict empty but parseable dates exist. Check provider column names or date range.")
+        return excel_lookup_dict, dynamic_excel_col_for_provider
+    except Exception as e: notify.error(f"Error loading/processing Excel: {e}"); return None, None
+
+# 'Count' tab layout: row 1 is a title, row 2 holds the column headers, data starts on row 3.
+EXCEL_HEADER_ROW = 2
+# Rows are in date order, so reading stops after this many consecutive rows dated after the cutoff.
+# Kept at a month's worth so mistyped dates, or text dates read day-first (01-12 land in other months),
+# cannot cut the sheet short.
+EXCEL_ROWS_PAST_CUTOFF_BEFORE_STOP = 31
+
+def _excel_cell_value(val):
+    # Same cell conversion as pd.read_excel: blanks become NaN and integral floats become ints
+    if val is None: return np.nan
+    if isinstance(val, float) and val.is_integer(): return int(val)
+    return val
+
+@instrumented_stage("excel parse", rows=lambda result, *args, **kwargs: 0 if result[0] is None else len(result[0]))
+def read_excel_count_columns(workbook_path, special_provider_full_names_list, date_parser_func, cutoff_date):
+    """
+    Streams the 'Count' tab in read-only mode and keeps only the Date column and the provider columns.
+    Returns (DataFrame with a 'ParsedDate' column plus one column per matched provider header,
+    {full provider name: header}), or (None, None) if the Date column cannot be identified.
+    """
+    def convert_excel_date(val):
+        if isinstance(val, datetime): return val.date()
+        parsed_dt = date_parser_func(str(val).strip())
+        if parsed_dt: return parsed_dt
+        excel_formats = ["%m/%d/%Y", "%m/%d/%y", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d"]
+        for fmt in excel_formats:
+            try: return datetime.strptime(str(val).strip().split(" ")[0], fmt.split(" ")[0]).date()
+            except ValueError: continue
+        return None
+
+    wb = openpyxl.load_workbook(workbook_path, read_only=True, data_only=True)
+    try:
+        ws = wb["Count"]
+        header_cells = next(ws.iter_rows(min_row=EXCEL_HEADER_ROW, max_row=EXCEL_HEADER_ROW, values_only=True), ())
+        headers = [f"Unnamed: {i}" if v is None else v for i, v in enumerate(header_cells)]
+
+        date_idx = None; guessed_date_col = False
+        for i, col in enumerate(headers):
+            if str(col).strip().lower() == 'date': date_idx = i; break
+        if date_idx is None and len(headers) > 1 and 'unnamed: 0' in str(headers[0]).lower():
+            date_idx = 1; guessed_date_col = True # Confirmed below once the column values are seen
+        if date_idx is None: notify.error("Excel Error: 'Date' column not identified."); return None, None
+
+        provider_idx = {}; dynamic_excel_col_for_provider = {}
+        for full_name in special_provider_full_names_list:
+            first_name = full_name.split(' ')[0]
+            for i, col_hdr in enumerate(headers):
+                if str(col_hdr).strip().startswith(first_name + "/"):
+                    dynamic_excel_col_for_provider[full_name] = str(col_hdr).strip(); provider_idx[str(col_hdr).strip()] = i; break
+            if full_name not in dynamic_excel_col_for_provider:
+                notify.warning(f"Excel: Column not found for special provider: {full_name}")
+
+        parsed_dates = []; raw_dates = []; columns = {hdr: [] for hdr in provider_idx}
+        date_cache = {}; rows_past_cutoff = 0
+        for row in ws.iter_rows(min_row=EXCEL_HEADER_ROW + 1, values_only=True):
+            date_val = row[date_idx] if date_idx < len(row) else None
+            p_date = None
+            if date_val is not None:
+                if date_val not in date_cache: date_cache[date_val] = convert_excel_date(date_val)
+                p_date = date_cache[date_val]
+            if p_date and p_date > cutoff_date:
+                rows_past_cutoff += 1
+                if rows_past_cutoff >= EXCEL_ROWS_PAST_CUTOFF_BEFORE_STOP: break
+            elif p_date: rows_past_cutoff = 0
+            parsed_dates.append(p_date)
+            if guessed_date_col: raw_dates.append(str(date_val))
+            for hdr, i in provider_idx.items():
+                columns[hdr].append(_excel_cell_value(row[i] if i < len(row) else None))
+    finally:
+        wb.close()
+
+    if guessed_date_col:
+        date_column_name = headers[1]
+        if str(date_column_name).strip().lower() != 'date':
+            if not any(re.search(r'\d{1,2}[/-]\d{1,2}[/-]\d{2,4}', v) for v in raw_dates):
+                notify.error("Excel Error: 'Date' column not identified."); return None, None
+            notify.info(f"Excel: Guessed Date column: {date_column_name}")
+    df_excel = pd.DataFrame({hdr: pd.Series(vals) for hdr, vals in columns.items()}, index=range(len(parsed_dates)))
+    df_excel['ParsedDate'] = pd.Series(parsed_dates, dtype=object)
+    return df_excel, dynamic_excel_col_for_provider
+
+def build_excel_count_table(df_excel, parsed_date_col, provider_columns, cutoff_date):
+    """
+    Reshapes the 'Count' tab into a long (date, provider, raw, count, state) table in one vectorized pass.
+    Rows keep the sheet order per provider, so a later duplicate date wins when the table is turned into a dict.
+    """
+    cols = {excel_col: ss2_name for ss2_name, excel_col in provider_columns.items() if excel_col in df_excel.columns}
+    dates = df_excel[parsed_date_col]
+    in_range = dates.map(lambda d: d is not None and d <= cutoff_date).astype(bool)
+    wide = df_excel.loc[in_range, [parsed_date_col] + list(cols)]
+    wide = wide.astype({c: object for c in cols}).rename(columns={parsed_date_col: 'date', **cols}) # object keeps raw ints as ints
+    long = wide.melt(id_vars='date', var_name='provider', value_name='raw')
+
+    raw = long['raw']
+    text = raw.astype(str).str.strip()
+    is_empty = raw.isna().to_numpy()
+    is_nw = (~is_empty) & (text.str.upper() == "NW").to_numpy()
+    numeric = pd.to_numeric(text.where(~(is_empty | is_nw)), errors='coerce').to_numpy(dtype=float)
+    is_number = np.isfinite(numeric) & ~(is_empty | is_nw)
+    long['count'] = np.where(is_number, np.trunc(np.where(is_number, numeric, 0)), 0).astype(int)
+    long['state'] = np.select([is_empty, is_nw, is_number], [EXCEL_COUNT_EMPTY, EXCEL_COUNT_NW, EXCEL_COUNT_NUMBER], EXCEL_COUNT_INVALID)
+    return long
+
+SS1Entry = namedtuple("SS1Entry", ["coverage_type", "provider_name_ss1", "ss1_row_num"])
+
+def _compact_source(source_data):
+    return source_data if isinstance(source_data, CompactRows) else CompactRows(source_data or [], SRC_READ_COLUMNS)
+
+def _ss1_keyed_rows(rows, cols, date_parser_func, cutoff_date, row_filter=None):
+    """Positions of the SS1 data rows that have every column in cols, a date up to the cutoff and a scribe (and pass row_filter), with their dates and normalized scribes."""
+    dates = rows.column(SRC_COL_DATE_OF_SERVICE, lambda v: date_parser_func(str(v)))
+    in_range = np.fromiter((d is not None and d <= cutoff_date for d in dates), dtype=bool, count=len(dates))
+    scribe_norm = rows.column(SRC_COL_SCRIBE_NAME, lambda v: v.strip().lower())
+    keep = (rows.lengths > max(cols)) & in_range & scribe_norm.astype(bool)
+    if row_filter is not None: keep &= row_filter
+    positions = np.flatnonzero(keep)
+    return positions.tolist(), dates[positions].tolist(), scribe_norm[positions].tolist()
+
+def build_ss1_validation_map(source_data_list, date_parser_func, cutoff_date):
+    """(date, scribe_norm) -> (SS1Entry, ...) in sheet order for every SS1 response up to the cutoff."""
+    rows = _compact_source(source_data_list)[1:]
+    if not len(rows): return {}
+    positions, dates, scribes = _ss1_keyed_rows(rows, [SRC_COL_DATE_OF_SERVICE, SRC_COL_SCRIBE_NAME, SRC_COL_COVERAGE_TYPE, SRC_COL_PROVIDER_NAME_READ],
+                                                date_parser_func, cutoff_date)
+    coverage = rows.column(SRC_COL_COVERAGE_TYPE, str.strip)[positions].tolist()
+    provider = rows.column(SRC_COL_PROVIDER_NAME_READ, str.strip)[positions].tolist()
+    ss1_map = {}
+    for pos, p_date, scribe_norm, cov, prov in zip(positions, dates, scribes, coverage, provider):
+        ss1_map.setdefault((p_date, scribe_norm), []).append(SS1Entry(cov, prov, pos + 2))
+    return {key: tuple(entries) for key, entries in ss1_map.items()}
+
+# --- SS2 month tab index ---
+class Task(IntEnum):
+    OTHER = 0
+    PRIMARY = 1
+    BACKUP = 2
+
+    @classmethod
+    def from_label(cls, label):
+        return TASK_LABELS.get(label.lower(), cls.OTHER)
+
+    @property
+    def is_active(self): # Primary or Backup coverage
+        return self != Task.OTHER
+
+TASK_LABELS = {"primary coverage": Task.PRIMARY, "backup coverage": Task.BACKUP}
+
+class SS2Index:
+    """
+    Columnar view of an SS2 month tab, built once per snapshot and shared by the update planner and validation.
+    Position i holds SS2 row number i + 2 (row 1 is the header). Text columns are stripped; date is None
+    when the cell does not parse. date_ordinal holds the dates as an int64 array (0 for None) for vectorized use.
+    Columns are built from the CompactRows codes, so rows with the same cell share one derived value object.
+    """
+    COLUMNS = ("date", "scribe", "scribe_norm", "lead", "provider", "provider_norm", "task_label", "task", "q", "r")
+
+    def __init__(self, dest_data_list):
+        rows = dest_data_list if isinstance(dest_data_list, CompactRows) else CompactRows(dest_data_list or [], DEST_READ_COLUMNS)
+        data = rows[1:]
+        column = lambda col, derive=str.strip: data.column(col, derive).tolist()
+        self.date_column = parse_date_column(column(DEST_COL_C_DATE_READ))
+        self.date = self.date_column.dates
+        self.scribe = column(DEST_COL_A_SCRIBE_NAME_READ); self.scribe_norm = column(DEST_COL_A_SCRIBE_NAME_READ, lambda v: v.strip().lower())
+        self.lead = column(DEST_COL_B_LEAD_READ)
+        self.provider = column(DEST_COL_F_PROVIDER_COVERED_READ)
+        self.provider_norm = column(DEST_COL_F_PROVIDER_COVERED_READ, lambda v: normalize_provider_name(v.strip()))
+        self.task_label = column(DEST_COL_E_TASK_ASSIGNED_READ)
+        self.task = column(DEST_COL_E_TASK_ASSIGNED_READ, lambda v: Task.from_label(v.strip()))
+        self.q = column(DEST_COL_Q_SCHEDULED_READ); self.r = column(DEST_COL_R_UPLOADED_READ)
+        self.date_ordinal = np.fromiter((d.toordinal() if d else 0 for d in self.date), dtype=np.int64, count=len(self.date))
+
+        # (scribe_norm, date) keys as sorted int64s (scribe id << 32 | date ordinal) and, per key, the position of
+        # its last row (a later row wins, as in the old lookup map)
+        self._scribe_ids = {}
+        scribe_id = np.fromiter((self._scribe_ids.setdefault(s, len(self._scribe_ids)) for s in self.scribe_norm), dtype=np.int64,
+                                count=len(self.scribe_norm))
+        keyed = np.flatnonzero((self.date_ordinal > 0) & np.fromiter(map(bool, self.scribe_norm), dtype=bool, count=len(self.scribe_norm)))[::-1]
+        self.scribe_date_keys, first = np.unique((scribe_id[keyed] << 32) | self.date_ordinal[keyed], return_index=True)
+        self.scribe_date_last = np.sort(keyed[first])
+        lead_ids = {}
+        lead_id = np.fromiter((lead_ids.setdefault(lead, len(lead_ids)) for lead in self.lead), dtype=np.int64, count=len(self.lead))
+        self.by_lead = {lead: np.flatnonzero(lead_id == i) for lead, i in lead_ids.items()} # lead -> positions
+
+    def has_scribe_date(self, scribe_norm, p_date):
+        """Whether some row has this scribe on this date."""
+        scribe_id = self._scribe_ids.get(scribe_norm)
+        if scribe_id is None or not p_date: return False
+        key = (scribe_id << 32) | p_date.toordinal()
+        at = np.searchsorted(self.scribe_date_keys, key)
+        return bool(at < len(self.scribe_date_keys) and self.scribe_date_keys[at] == key)
+
+    def __len__(self): return len(self.date)
+
+    @staticmethod
+    def row_num(pos): return pos + 2
+
+    @staticmethod
+    def position(row_num): return row_num - 2
+
+    def set_cell(self, row_num, col_1_based, value):
+        """Mirrors a written Q/R cell into the index."""
+        pos = self.position(row_num)
+        if col_1_based == DEST_COL_Q_SCHEDULED_WRITE: self.q[pos] = str(value).strip()
+        elif col_1_based == DEST_COL_R_UPLOADED_WRITE: self.r[pos] = str(value).strip()
+
+UpdatePlan = namedtuple("UpdatePlan", ["cells", "details", "excel_mismatches", "ss1_r_info", "state", "skipped_rows"])
+SS1Match = namedtuple("SS1Match", ["ordinal", "scribe", "q", "r"])
+
+def build_ss1_match_index(source_data, cutoff_date):
+    """(scribe_norm, date) -> (SS1Match, ...) in sheet order, for the SS1 rows the planner can use. Built once per snapshot."""
+    rows = _compact_source(source_data)[1:]
+    if not len(rows): return {}
+    active = rows.column(SRC_COL_COVERAGE_TYPE, lambda v: v.strip().lower() in TASK_LABELS).astype(bool)
+    positions, dates, scribes = _ss1_keyed_rows(rows, [SRC_COL_COVERAGE_TYPE, SRC_COL_DATE_OF_SERVICE, SRC_COL_SCRIBE_NAME,
+                                                       SRC_COL_SCHEDULED_ZOOM, SRC_COL_UPLOADED_EOD], parse_date_flexible, cutoff_date, active)
+    scribe = rows.column(SRC_COL_SCRIBE_NAME)[positions].tolist()
+    q = rows.column(SRC_COL_SCHEDULED_ZOOM, str.strip)[positions].tolist(); r = rows.column(SRC_COL_UPLOADED_EOD, str.strip)[positions].tolist()
+    matches = {}
+    for pos, p_date, scribe_norm, match in zip(positions, dates, scribes, map(SS1Match._make, zip(positions, scribe, q, r))):
+        matches.setdefault((scribe_norm, p_date), []).append(match)
+    return {key: tuple(key_matches) for key, key_matches in matches.items()}
+
+def _plan_excel_row(ss2_index, pos, excel_entry):
+    """Phase 1 for one RMS-provider row: Q/R from the Excel count. Returns (cells, details, excel_mismatches, ss1_r_info)."""
+    cells, details, mismatches = [], [], []
+    s2_num = ss2_index.row_num(pos); p_date_s2 = ss2_index.date[pos]; prov_s2 = ss2_index.provider[pos]
+    if excel_entry is not None:
+        excel_num_c = excel_entry.count
+        if excel_num_c > 0:
+            task_raw = ss2_index.task_label[pos]
+            if ss2_index.task[pos].is_active:
+                ex_q = ss2_index.q[pos]
+                ex_r = ss2_index.r[pos]
+                q_u = False; r_u = False; q_m = f"Q Exists('{ex_q}')"; r_m = f"R Exists('{ex_r}')"
+                if not ex_q: cells.append((s2_num, DEST_COL_Q_SCHEDULED_WRITE, excel_num_c)); q_u=True; q_m=f"Q to {excel_num_c}"
+                if not ex_r: cells.append((s2_num, DEST_COL_R_UPLOADED_WRITE, excel_num_c)); r_u=True; r_m=f"R to {excel_num_c}"
+                if q_u or r_u: details.append({"s":f"Excel-{prov_s2}","d":p_date_s2.strftime('%Y-%m-%d'),"dr":s2_num,"qn":q_m,"rs":r_m,"qa":q_u,"ra":r_u})
+            else: mismatches.append(f"UPDATE EXCEL VAL: SS2R {s2_num} ('{prov_s2}', {p_date_s2}). ExcelCnt={excel_num_c}, SS2Task='{task_raw}'. No upd.")
+    return cells, details, mismatches, []
+
+def _plan_ss1_row(ss2_index, pos, ss1_matches):
+    """Phase 2 for one row: Q/R from the SS1 responses for its scribe and date, in SS1 order."""
+    cells, details, r_info = [], [], []
+    dest_r_num = ss2_index.row_num(pos)
+    for m in ss1_matches:
+        try:
+            p_src_date = ss2_index.date[pos]
+            q_u_ss1=False; r_u_ss1=False; q_s_ss1="No Q change"; r_s_ss1="No R change"
+
+            ex_q = ss2_index.q[pos]
+            s_val_q = m.q
+            if not ex_q and s_val_q: cells.append((dest_r_num, DEST_COL_Q_SCHEDULED_WRITE, s_val_q)); q_u_ss1=True; q_s_ss1=f"SS1:Q to '{s_val_q}'"
+            elif ex_q: q_s_ss1=f"SS1:Q Exists('{ex_q}')"
+
+            ex_r = ss2_index.r[pos]
+            s_val_r = m.r
+            if not ex_r and s_val_r: cells.append((dest_r_num, DEST_COL_R_UPLOADED_WRITE, s_val_r)); r_u_ss1=True; r_s_ss1=f"SS1:R to '{s_val_r}'"
+            elif ex_r:
+                r_s_ss1=f"SS1:R Exists('{ex_r}')"
+                if s_val_r and ex_r != s_val_r: r_info.append((m.ordinal, f"SS1_R_INFO: Scribe {m.scribe}, {p_src_date},DRow {dest_r_num}. DestR:'{ex_r}',SrcR:'{s_val_r}'. No upd."))
+
+            if q_u_ss1 or r_u_ss1: details.append({"s":m.scribe,"d":p_src_date.strftime('%Y-%m-%d'),"dr":dest_r_num,"qn":q_s_ss1,"rs":r_s_ss1,"qa":q_u_ss1,"ra":r_u_ss1})
+        except Exception: pass
+    return cells, details, [], r_info
+
+# --- Planner state ---
+# What the planner saw on each row at the last committed run is kept per worksheet under CACHE_DIR/plan_state as a
+# PlanState: the SS2 row numbers it considered, a 64-bit digest of each row's inputs (date, scribe, provider, task,
+# Q, R and the Excel count or SS1 responses it depends on), and the outcomes of only those rows that produced
+# something. The digests are computed for the whole tab at once with pandas' stable hashing, so finding the
+# rows that changed costs a few vectorized passes; only those rows go through the per-row planner.
+PLAN_STATE_DIR = os.path.join(CACHE_DIR, "plan_state")
+PLAN_STATE_VERSION = 2
+
+PlanState = namedtuple("PlanState", ["rows", "digests", "outcomes"]) # rows ascending (int64), digests (uint64), {row: outcome}
+def _planner_inputs(ss2_index, ss1_match_index, excel_data_lookup, special, cutoff_date):
+    """
+    Positions the planner considers (ascending), whether each is an Excel row, and what it depends on: the ExcelCount
+    (or None) for RMS-provider rows, the SS1 matches for the last SS2 row of each scribe/date with SS1 responses.
+    """
+    dates = ss2_index.date_ordinal
+    in_range = (dates > 0) & (dates <= cutoff_date.toordinal())
+    if excel_data_lookup is not None: is_excel = pd.Series(ss2_index.provider, dtype=object).isin(special).to_numpy()
+    else: is_excel = np.zeros(len(ss2_index), dtype=bool)
+    # An SS1 response only ever updates the last SS2 row for its scribe/date
+    last_for_key = np.zeros(len(ss2_index), dtype=bool); last_for_key[ss2_index.scribe_date_last] = True
+    positions = np.flatnonzero(in_range & (is_excel | last_for_key)); is_excel = is_excel[positions]
+
+    date, provider, scribe_norm = ss2_index.date, ss2_index.provider, ss2_index.scribe_norm
+    dependencies = [excel_data_lookup.get((date[pos], provider[pos])) if excel else ss1_match_index.get((scribe_norm[pos], date[pos]))
+                    for pos, excel in zip(positions.tolist(), is_excel.tolist())]
+    keep = is_excel | np.fromiter(map(bool, dependencies), dtype=bool, count=len(dependencies)) # Rows without SS1 responses
+    if not keep.all():
+        dependencies = list(itertools.compress(dependencies, keep)); positions, is_excel = positions[keep], is_excel[keep]
+    return positions, is_excel, dependencies
+
+def _planner_digests(ss2_index, positions, is_excel, dependencies):
+    """uint64 digest of each considered row's planner inputs."""
+    dependency = np.zeros(len(positions), dtype=np.uint64)
+    excel_at = np.flatnonzero(is_excel); ss1_at = np.flatnonzero(~is_excel)
+    dependency[excel_at] = [dependencies[i].count + 1 if dependencies[i] is not None else 0 for i in excel_at.tolist()]
+    if len(ss1_at):
+        ss1_deps = [dependencies[i] for i in ss1_at.tolist()]
+        ordinal, scribe, q, r = zip(*itertools.chain.from_iterable(ss1_deps))
+        matches = pd.util.hash_pandas_object(pd.DataFrame({"ordinal": np.asarray(ordinal, dtype=np.int64), "scribe": scribe, "q": q, "r": r}),
+                                             index=False).to_numpy()
+        starts = np.cumsum([0] + [len(d) for d in ss1_deps[:-1]])
+        dependency[ss1_at] = np.add.reduceat(matches, starts) # The ordinals keep the order of the responses in the digest
+
+    frame = pd.DataFrame({"date": ss2_index.date_ordinal[positions], "excel": is_excel, "dependency": dependency,
+                          **{col: np.asarray(getattr(ss2_index, col), dtype=object)[positions]
+                             for col in ("scribe_norm", "provider", "task_label", "q", "r")}})
+    # Stable hashing (unlike hash()), so the digests compare with a state saved by an earlier process
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy()
+
+@instrumented_stage("plan", rows=lambda result, ss2_index, *args, **kwargs: len(ss2_index))
+def plan_updates(ss2_index, ss1_match_index, excel_data_lookup, special_provider_full_names, cutoff_date, prior_state=None):
+    """
+    Works out the Q/R cells to fill in SS2: RMS providers from the Excel counts (Phase 1), everyone else
+    from the SS1 form responses matched on scribe and date (Phase 2). Existing Q/R values are never overwritten.
+
+    Each SS2 row is planned independently. Rows whose input digest matches prior_state (the PlanState of the last
+    committed run) are not planned again: their outcome is taken from the state. The new PlanState is returned in
+    .state and the number of reused rows in .skipped_rows.
+    """
+    positions, is_excel, dependencies = _planner_inputs(ss2_index, ss1_match_index, excel_data_lookup,
+                                                        set(special_provider_full_names), cutoff_date)
+    rows = positions + 2 # SS2Index.row_num
+    digests = _planner_digests(ss2_index, positions, is_excel, dependencies)
+
+    unchanged = np.zeros(len(rows), dtype=bool)
+    if prior_state is not None and len(prior_state.rows) and len(rows):
+        at = np.minimum(np.searchsorted(prior_state.rows, rows), len(prior_state.rows) - 1)
+        unchanged = (prior_state.rows[at] == rows) & (prior_state.digests[at] == digests)
+    outcomes = {}
+    if unchanged.any():
+        kept = np.isin(np.fromiter(prior_state.outcomes, dtype=np.int64, count=len(prior_state.outcomes)), rows[unchanged])
+        outcomes = {row: outcome for row, outcome, k in zip(prior_state.outcomes, prior_state.outcomes.values(), kept.tolist()) if k}
+    for i in np.flatnonzero(~unchanged).tolist():
+        pos = int(positions[i])
+        outcome = _plan_excel_row(ss2_index, pos, dependencies[i]) if is_excel[i] else _plan_ss1_row(ss2_index, pos, dependencies[i])
+        if any(outcome): outcomes[pos + 2] = outcome
+
+    cells, details, mismatches, r_info = [], [], [], []
+    for row in sorted(outcomes):
+        outcome = outcomes[row]
+        cells.extend(outcome[0]); details.extend(outcome[1]); mismatches.extend(outcome[2]); r_info.extend(outcome[3])
+    return UpdatePlan([gspread.Cell(*c) for c in cells], details, mismatches, [msg for _, msg in sorted(r_info, key=lambda x: x[0])],
+                      PlanState(rows, digests, outcomes), int(unchanged.sum()))
+
+def _plan_state_path(spreadsheet_id, worksheet_title):
+    key = hashlib.sha1(f"{spreadsheet_id}|{worksheet_title}".encode("utf-8")).hexdigest()[:16]
+    return os.path.join(PLAN_STATE_DIR, f"{key}.pkl")
+
+def load_plan_state(spreadsheet_id, worksheet_title):
+    """PlanState saved by the last committed run on the worksheet, or None."""
+    try:
+        with open(_plan_state_path(spreadsheet_id, worksheet_title), "rb") as f: state = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError): return None
+    if not isinstance(state, dict) or state.get("version") != PLAN_STATE_VERSION: return None
+    return PlanState(state["rows"], state["digests"], state["outcomes"])
+
+def save_plan_state(spreadsheet_id, worksheet_title, state):
+    path = _plan_state_path(spreadsheet_id, worksheet_title)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with atomic_output(path) as f:
+            pickle.dump({"version": PLAN_STATE_VERSION, "rows": state.rows, "digests": state.digests, "outcomes": state.outcomes}, f,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+    except OSError: traceback.print_exc() # the state only saves planning time
+
+# --- SS2 write pipeline ---
+# Planned cells are coalesced into rectangular Q:R ranges (consecutive rows with the same columns share one range)
+# and sent as values.batchUpdate calls of at most WRITE_CHUNK_MAX_CELLS cells. 429/5xx responses are retried with
+# exponential backoff and jitter. Resuming an interrupted run needs no journal of its own: the re-run plans from the
+# sheet, and the pre-write re-read (check_write_conflicts) drops cells that already hold their planned value.
+WRITE_CHUNK_MAX_CELLS = 400
+WRITE_MAX_RETRIES = 5
+WRITE_BACKOFF_BASE_SECONDS = 1.0
+WRITE_BACKOFF_MAX_SECONDS = 32.0
+
+WriteChunk = namedtuple("WriteChunk", ["data", "cells"])
+WriteResult = namedtuple("WriteResult", ["written", "failed", "error", "chunks_sent", "retries"])
+
+def _cell_json_value(value):
+    return value.item() if isinstance(value, np.generic) else value
+
+def coalesce_cell_ranges(cells, max_cells=WRITE_CHUNK_MAX_CELLS):
+    """Groups cells into (a1_range, values, cells) rectangles: runs of consecutive rows with identical columns, capped at max_cells."""
+    by_row = {}
+    for cell in cells: by_row.setdefault(cell.row, {})[cell.col] = cell
+    ranges = []; run = None
+    for row_num in sorted(by_row):
+        row_cells = by_row[row_num]; cols = tuple(sorted(row_cells))
+        contiguous = cols[-1] - cols[0] + 1 == len(cols)
+        if run and contiguous and run["cols"] == cols and run["last_row"] == row_num - 1 and (len(run["rows"]) + 1) * len(cols) <= max_cells:
+            run["rows"].append(row_cells); run["last_row"] = row_num; continue
+        if run: ranges.append(run); run = None
+        if contiguous:
+            run = {"cols": cols, "first_row": row_num, "last_row": row_num, "rows": [row_cells]}
+        else: # a gap between columns would overwrite the cell in between, so write these one by one
+            ranges.extend({"cols": (c,), "first_row": row_num, "last_row": row_num, "rows": [{c: row_cells[c]}]} for c in cols)
+    if run: ranges.append(run)
+
+    out = []
+    for r in ranges:
+        a1 = gspread.utils.rowcol_to_a1(r["first_row"], r["cols"][0])
+        if len(r["cols"]) > 1 or r["last_row"] > r["first_row"]: a1 += ":" + gspread.utils.rowcol_to_a1(r["last_row"], r["cols"][-1])
+        values = [[_cell_json_value(row_cells[c].value) for c in r["cols"]] for row_cells in r["rows"]]
+        out.append((a1, values, [row_cells[c] for row_cells in r["rows"] for c in r["cols"]]))
+    return out
+
+def chunk_cell_ranges(ranges, max_cells=WRITE_CHUNK_MAX_CELLS):
+    """Packs coalesced ranges into WriteChunks of at most max_cells cells."""
+    chunks = []; data = []; cells = []
+    def flush():
+        if data: chunks.append(WriteChunk(list(data), list(cells))); data.clear(); cells.clear()
+    for a1, values, range_cells in ranges:
+        if cells and len(cells) + len(range_cells) > max_cells: flush()
+        data.append({"range": a1, "values": values}); cells.extend(range_cells)
+    flush()
+    return chunks
+
+def _retry_delay(error, attempt):
+    """Seconds to wait before retrying a failed Sheets call, or None if the error is not worth retrying."""
+    if isinstance(error, gspread.exceptions.APIError):
+        status = getattr(error.response, "status_code", None) or error.code
+        if status != 429 and not (isinstance(status, int) and status >= 500): return None
+        retry_after = error.response.headers.get("Retry-After") if error.response is not None else None
+        if retry_after and str(retry_after).isdigit(): return min(float(retry_after), WRITE_BACKOFF_MAX_SECONDS)
+    elif not isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)): return None
+    return min(WRITE_BACKOFF_MAX_SECONDS, WRITE_BACKOFF_BASE_SECONDS * 2 ** attempt) * random.uniform(0.5, 1.0)
+
+def _call_with_retries(func, max_retries=WRITE_MAX_RETRIES, sleep=time.sleep):
+    """Calls func(), retrying transient Sheets errors. Returns (result, retries); the last error is re-raised."""
+    attempt = 0
+    while True:
+        try: return func(), attempt
+        except Exception as e:
+            delay = _retry_delay(e, attempt) if attempt < max_retries else None
+            if delay is None: raise
+            attempt += 1; count_event("Sheets retries"); sleep(delay)
+
+@instrumented_stage("sheets write", rows=lambda result, *args, **kwargs: len({c.row for c in result.written}))
+def write_cells_chunked(worksheet, cells, on_chunk_committed=None, max_cells=WRITE_CHUNK_MAX_CELLS,
+                        max_retries=WRITE_MAX_RETRIES, sleep=time.sleep):
+    """
+    Writes the planned cells through the chunked pipeline and returns a WriteResult. on_chunk_committed(cells) is
+    called after each chunk lands, so callers can mirror it into their snapshot. Stops at the first chunk that
+    still fails after retries; 'failed' then holds that chunk and everything after it.
+    """
+    chunks = chunk_cell_ranges(coalesce_cell_ranges(cells, max_cells), max_cells)
+    written, chunks_sent, retries = [], 0, 0
+
+    for i, chunk in enumerate(chunks):
+        try:
+            # gspread rewrites each entry's range to '<title>'!A1 in place, so every attempt gets fresh copies
+            _, attempts = _call_with_retries(lambda: worksheet.batch_update([dict(d) for d in chunk.data], value_input_option='USER_ENTERED'),
+                                             max_retries, sleep)
+            retries += attempts
+        except Exception as e:
+            return WriteResult(written, [c for rest in chunks[i:] for c in rest.cells], e, chunks_sent, retries)
+        written.extend(chunk.cells); chunks_sent += 1
+        if on_chunk_committed: on_chunk_committed(chunk.cells)
+    return WriteResult(written, [], None, chunks_sent, retries)
+
+# --- Pre-write conflict check ---
+# The plan is made from a snapshot that can be minutes old while team leads keep editing the tab. Right before
+# writing, the targeted Q/R cells are re-read in one batched read (one range per run of consecutive target rows);
+# cells that are no longer empty are dropped from the write and reported as conflicts instead of being overwritten.
+WriteConflict = namedtuple("WriteConflict", ["cell", "current"])
+
+def _target_row_ranges(cells):
+    """A1 ranges covering the targeted columns for each run of consecutive target rows, with each run's first row."""
+    rows = sorted({c.row for c in cells}); min_col = min(c.col for c in cells); max_col = max(c.col for c in cells)
+    runs = []
+    for row_num in rows:
+        if runs and runs[-1][1] == row_num - 1: runs[-1][1] = row_num
+        else: runs.append([row_num, row_num])
+    return [(f"{gspread.utils.rowcol_to_a1(a, min_col)}:{gspread.utils.rowcol_to_a1(b, max_col)}", a) for a, b in runs], min_col
+
+@instrumented_stage("conflict check", rows=lambda result, worksheet, cells, *args, **kwargs: len({c.row for c in cells}))
+def check_write_conflicts(worksheet, cells, max_retries=WRITE_MAX_RETRIES, sleep=time.sleep):
+    """
+    Re-reads the cells about to be written. Returns (cells_to_write, conflicts, already_set): cells whose target is
+    still empty, WriteConflicts for cells someone else filled in, and cells that already hold the planned value.
+    """
+    if not cells: return [], [], []
+    ranges, min_col = _target_row_ranges(cells)
+    value_ranges, _ = _call_with_retries(lambda: worksheet.batch_get([a1 for a1, _ in ranges]), max_retries, sleep)
+    current = {}
+    for (_, first_row), values in zip(ranges, value_ranges):
+        for i, row_vals in enumerate(values):
+            for j, val in enumerate(row_vals): current[(first_row + i, min_col + j)] = str(val).strip()
+
+    to_write, conflicts, already_set = [], [], []
+    for cell in cells:
+        now = current.get((cell.row, cell.col), "")
+        if not now: to_write.append(cell)
+        elif now == str(_cell_json_value(cell.value)).strip(): already_set.append(cell)
+        else: conflicts.append(WriteConflict(cell, now))
+    return to_write, conflicts, already_set
+
+# --- Fuzzy name matching ---
+# SS1 names are typed into a form, so a scribe or provider there can carry a typo or a middle initial that the exact
+# joins miss. SS1 names with no exact match are looked up in a trigram index over the names the SS2 tab uses: a lookup
+# only walks the postings of its own trigrams and rescores a short list, so its cost does not grow with the sheet.
+# A candidate is accepted when it reaches the threshold, beats the runner-up by NAME_MATCH_MARGIN and has the same
+# digits; accepted matches are applied to the SS1 lookups and reported as NameMatch rows, never silently. The update
+# planner only uses the re-keyed lookups when the team config opts in (see NAME_MATCH_APPLY_TO_UPDATES); otherwise its
+# matches are reported with applied False.
+NAME_MATCH_MARGIN = 0.03
+NAME_INDEX_SHORTLIST = 8 # Candidates rescored per lookup
+NAME_REORDERED_FACTOR = 0.95 # Weight of a match found only with the name's words reordered
+NAME_INDEX_MAX_POSTINGS = 500 # Trigrams shared by more names than this are skipped (no signal, unbounded postings)
+NAME_MATCH_COLUMNS = ["kind", "date", "name", "resolved", "score", "ss1_rows", "applied"]
+
+NameMatch = namedtuple("NameMatch", NAME_MATCH_COLUMNS) # kind 'scribe' (per date) or 'provider'; ss1_rows it concerns
+NameResolution = namedtuple("NameResolution", ["ss1_match_index", "ss1_validation_map", "provider_aliases", "matches"])
+
+_name_punctuation_re = re.compile(r"[^\w\s]")
+_digits_re = re.compile(r"\d+")
+
+def name_match_key(name):
+    """'Jane Q. Doe' -> 'jane doe': lower case, punctuation removed, single-letter tokens (initials) dropped."""
+    tokens = _name_punctuation_re.sub(" ", name.lower()).split()
+    return " ".join(t for t in tokens if len(t) > 1 or not t.isalpha()) or " ".join(tokens)
+
+def _trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def _name_similarity(matcher, key, other):
+    # Character similarity of two keys (matcher holds `key` as its second sequence), also with the tokens sorted
+    # ('doe jane' vs 'jane doe') at a small discount, so an in-order name wins a tie. Sorting keeps the characters,
+    # so it cannot beat quick_ratio(), the bound on both.
+    matcher.set_seq1(other); direct = matcher.ratio()
+    if direct >= matcher.quick_ratio() or " " not in key: return direct
+    reordered = difflib.SequenceMatcher(None, " ".join(sorted(other.split())), " ".join(sorted(key.split()))).ratio()
+    return max(direct, NAME_REORDERED_FACTOR * reordered)
+
+class NameIndex:
+    """Trigram index over a vocabulary of names; candidates(name) ranks the closest ones (memoized per name)."""
+
+    def __init__(self, names):
+        self.names = sorted(set(filter(None, names)))
+        self.keys = [name_match_key(n) for n in self.names]
+        self._postings = {}; self._candidates = {}
+        for i, key in enumerate(self.keys):
+            for gram in _trigrams(key): self._postings.setdefault(gram, []).append(i)
+
+    def __len__(self): return len(self.names)
+
+    def candidates(self, name, limit=NAME_INDEX_SHORTLIST):
+        """[(name, score)] best first: a shortlist by shared trigrams, rescored by character similarity."""
+        cached = self._candidates.get((name, limit))
+        if cached is not None: return cached
+        key = name_match_key(name); shared = Counter()
+        for gram in _trigrams(key):
+            postings = self._postings.get(gram, ())
+            if len(postings) <= NAME_INDEX_MAX_POSTINGS: shared.update(postings)
+        shortlist = heapq.nlargest(limit, shared.items(), key=lambda item: item[1])
+        matcher = difflib.SequenceMatcher(None, b=key)
+        scored = [(self.names[i], round(_name_similarity(matcher, key, self.keys[i]), 3)) for i, _ in shortlist]
+        result = self._candidates[(name, limit)] = sorted(scored, key=lambda c: (-c[1], c[0]))
+        return result
+
+    def best_match(self, name, threshold, accept=None):
+        """(name, score) of the one candidate that clears threshold and the runner-up, or None. accept(name) filters candidates."""
+        digits = _digits_re.findall(name)
+        ranked = [c for c in self.candidates(name) if _digits_re.findall(c[0]) == digits and (accept is None or accept(c[0]))]
+        if not ranked or ranked[0][1] < threshold: return None
+        if len(ranked) > 1 and ranked[0][1] - ranked[1][1] < NAME_MATCH_MARGIN: return None
+        return ranked[0]
+
+def name_matches_table(matches):
+    return pd.DataFrame(matches, columns=NAME_MATCH_COLUMNS).astype({"score": float, "applied": bool})
+
+@instrumented_stage("name matching", rows=lambda result, ss2_index, *args, **kwargs: len(result.matches))
+def resolve_ss1_names(ss2_index, ss1_match_index, ss1_validation_map, threshold=NAME_MATCH_THRESHOLD):
+    """
+    Resolves SS1 names with no exact counterpart on the SS2 tab. A scribe/date key is moved onto the SS2 scribe it
+    matches if that scribe has a row on the date and no SS1 response of their own for it; provider names get an
+    alias (normalized SS1 name -> SS2 provider_norm) for the provider check. Returns a NameResolution with re-keyed
+    copies of the lookups (the inputs are not modified) and the matches table. threshold None turns matching off.
+    """
+    matches = []; provider_aliases = {}
+    if threshold is None: return NameResolution(ss1_match_index, ss1_validation_map, provider_aliases, name_matches_table(matches))
+
+    scribes = set(filter(None, ss2_index.scribe_norm))
+    keys = set(ss1_match_index) | {(scribe, d) for d, scribe in ss1_validation_map}
+    unknown = sorted((k for k in keys if k[0] not in scribes), key=lambda k: (k[1], k[0]))
+    match_index, validation_map = dict(ss1_match_index), dict(ss1_validation_map)
+    scribe_index = NameIndex(scribes) if unknown else None
+    for name, d in unknown:
+        best = scribe_index.best_match(name, threshold, accept=lambda c: ss2_index.has_scribe_date(c, d) and (c, d) not in keys)
+        if best is None: continue
+        resolved, score = best; keys.add((resolved, d))
+        responses = match_index.pop((name, d), None)
+        if responses is not None: match_index[(resolved, d)] = responses
+        entries = validation_map.pop((d, name), None)
+        if entries is not None: validation_map[(d, resolved)] = entries
+        rows = sorted({e.ss1_row_num for e in entries or ()} | {m.ordinal + 2 for m in responses or ()})
+        matches.append(NameMatch("scribe", d, name, resolved, score, rows, True))
+
+    providers = set(filter(None, ss2_index.provider_norm)); provider_index = None
+    best_by_name = {}; rows_by_name = {}
+    for entries in validation_map.values():
+        for e in entries:
+            norm = normalize_provider_name(e.provider_name_ss1)
+            if not norm or norm in providers: continue
+            if norm not in best_by_name:
+                provider_index = provider_index or NameIndex(providers)
+                best_by_name[norm] = provider_index.best_match(norm, threshold)
+            if best_by_name[norm]: rows_by_name.setdefault(norm, []).append(e.ss1_row_num)
+    for norm, rows in sorted(rows_by_name.items()):
+        resolved, score = best_by_name[norm]; provider_aliases[norm] = resolved
+        matches.append(NameMatch("provider", None, norm, resolved, score, sorted(rows), True))
+    return NameResolution(match_index, validation_map, provider_aliases, name_matches_table(matches))
+
+# --- Validation ---
+# The rules are evaluated as joins over whole columns: SS2 x Excel counts on (date, provider) for RMS providers,
+# SS2 x SS1 on (date, scribe) for everyone else, and a group-by on (date, provider) for uniqueness.
+# Each finding is one row of a typed table; the message text is only produced by render_finding for display.
+RULE_RMS_COUNT_TASK = "RMS_COUNT_BUT_TASK"         # Excel has a positive count but SS2 task is not Primary/Backup
+RULE_RMS_NO_COUNT = "RMS_TASK_BUT_NO_COUNT"        # SS2 task is Primary/Backup but Excel has no positive count
+RULE_SCRIBE_MISSING = "SCRIBE_MISSING"             # Active SS2 task without a scribe name
+RULE_SS1_NO_ACTIVE = "SS1_NO_PRIMARY_BACKUP"       # SS1 has entries for the scribe/date, none Primary/Backup
+RULE_SS1_MULTIPLE = "SS1_MULTIPLE_PRIMARY_BACKUP"  # More than one Primary/Backup in SS1 for the scribe/date
+RULE_SS1_PROVIDER = "SS1_PROVIDER_MISMATCH"        # SS1 reports a different provider
+RULE_SS1_TASK = "SS1_TASK_MISMATCH"                # SS1 reports Primary/Backup, SS2 task is something else
+RULE_SS1_NO_ENTRIES = "SS1_NO_ENTRIES"             # No SS1 entries at all for the scribe/date
+RULE_DUPLICATE_COVERAGE = "DUPLICATE_COVERAGE"     # Several active coverages for one provider/date in SS2
+
+RULE_SEVERITY = {RULE_SS1_MULTIPLE: "warning"} # Everything else is an error
+FINDING_COLUMNS = ["lead", "rule", "severity", "date", "ss2_row", "ss1_row", "scribe", "provider", "task",
+                   "ss1_provider", "ss1_task", "excel_value", "count", "detail"]
+
+def _ss2_validation_frame(ss2_index, team_config, cutoff_date):
+    # Rows of every configured lead, kept where the provider is one that lead manages
+    positions = sorted(p for lead, lead_positions in ss2_index.by_lead.items() if lead in team_config.leads for p in lead_positions.tolist())
+    frame = pd.DataFrame({col: [getattr(ss2_index, col)[p] for p in positions] for col in SS2Index.COLUMNS}, dtype=object)
+    frame["pos"] = positions
+    frame["active"] = [t.is_active for t in frame["task"]] if len(frame) else []
+    managed = [(lead, provider) in team_config.managed_pairs for lead, provider in zip(frame["lead"], frame["provider"])]
+    in_scope = frame["date"].map(lambda d: d is not None and d <= cutoff_date).astype(bool) & pd.Series(managed, index=frame.index, dtype=bool)
+    return frame[in_scope]
+
+def _ss1_scribe_date_summary(ss1_reports_map):
+    """One row per (date, scribe) key of the SS1 map: Primary/Backup entry count and the first such entry."""
+    entries = pd.DataFrame([(d, scribe, *e) for (d, scribe), key_entries in ss1_reports_map.items() for e in key_entries],
+                           columns=["date", "scribe_norm", "ss1_task", "ss1_provider", "ss1_row"], dtype=object)
+    entries["active"] = entries["ss1_task"].map(lambda t: t.lower().strip() in TASK_LABELS).astype(bool)
+    summary = entries.groupby(["date", "scribe_norm"], sort=False)["active"].sum().rename("n_active").reset_index()
+    first_active = entries[entries["active"]].drop_duplicates(["date", "scribe_norm"])
+    summary = summary.merge(first_active[["date", "scribe_norm", "ss1_task", "ss1_provider", "ss1_row"]],
+                            on=["date", "scribe_norm"], how="left")
+    summary["has_ss1"] = True
+    return summary
+
+@instrumented_stage("validation", rows=lambda result, ss2_index, *args, **kwargs: len(ss2_index))
+def validation_findings(ss2_index, ss1_reports_map, excel_data_lookup_dict, team_config, cutoff_date, provider_aliases=None):
+    """
+    Returns the validation findings for the SS2 rows of every lead in team_config, in one pass, as a DataFrame
+    with FINDING_COLUMNS. Rows are grouped by lead (config order) and in report order within each lead.
+    provider_aliases maps normalized SS1 provider names onto SS2 ones (see resolve_ss1_names).
+    """
+    ss2 = _ss2_validation_frame(ss2_index, team_config, cutoff_date)
+    parts = []
+
+    # RMS providers: SS2 x Excel counts on (date, provider)
+    is_rms = ss2["provider"].isin(team_config.rms_providers)
+    rms = ss2[is_rms]
+    excel = pd.DataFrame([(d, prov, ec.raw, ec.count) for (d, prov), ec in (excel_data_lookup_dict or {}).items()],
+                         columns=["date", "provider", "excel_value", "count"], dtype=object)
+    excel["has_excel"] = True
+    rms = rms.merge(excel, on=["date", "provider"], how="left")
+    has_excel = rms["has_excel"].eq(True)
+    rms["excel_value"] = rms["excel_value"].where(has_excel, "No Excel Entry")
+    positive = rms["count"].where(has_excel, 0).astype(int) > 0
+    rms["rule"] = np.select([positive & ~rms["active"].astype(bool), ~positive & rms["active"].astype(bool)],
+                            [RULE_RMS_COUNT_TASK, RULE_RMS_NO_COUNT], "")
+    parts.append(rms[rms["rule"] != ""])
+
+    # Everyone else: SS2 x SS1 on (date, scribe)
+    other = ss2[~is_rms]
+    other = other.merge(_ss1_scribe_date_summary(ss1_reports_map), on=["date", "scribe_norm"], how="left")
+    active = other["active"].astype(bool); has_ss1 = other["has_ss1"].eq(True)
+    n_active = other["n_active"].where(has_ss1, 0).astype(int)
+    provider_aliases = provider_aliases or {}
+    ss1_provider_norm = pd.Series([provider_aliases.get(n, n) for n in provider_name_normalizer.normalize_many(other["ss1_provider"].tolist())],
+                                  index=other.index, dtype=object)
+    other["rule"] = np.select(
+        [(other["scribe_norm"] == "") & active,
+         has_ss1 & (n_active == 0) & active,
+         has_ss1 & (n_active > 1),
+         has_ss1 & (n_active == 1) & active & (other["provider_norm"] != ss1_provider_norm),
+         has_ss1 & (n_active == 1) & ~active,
+         ~has_ss1 & active],
+        [RULE_SCRIBE_MISSING, RULE_SS1_NO_ACTIVE, RULE_SS1_MULTIPLE, RULE_SS1_PROVIDER, RULE_SS1_TASK, RULE_SS1_NO_ENTRIES], "")
+    other["count"] = n_active
+    no_active = other["rule"] == RULE_SS1_NO_ACTIVE # Only these findings list the SS1 tasks
+    other["detail"] = None
+    other.loc[no_active, "detail"] = pd.Series([[e.coverage_type for e in ss1_reports_map[(d, sc)]] for d, sc in
+                                                zip(other.loc[no_active, "date"], other.loc[no_active, "scribe_norm"])],
+                                               index=other.index[no_active], dtype=object)
+    parts.append(other[other["rule"] != ""])
+
+    # Uniqueness: each lead's active coverages grouped by (date, normalized provider)
+    covering = ss2[ss2["active"].astype(bool)]
+    dup_sizes = covering.groupby(["lead", "date", "provider_norm"], sort=False)["pos"].transform("size")
+    dups = covering[dup_sizes > 1]
+    if len(dups):
+        dup_groups = dups.groupby(["lead", "date", "provider_norm"], sort=False)
+        dup_findings = dup_groups.agg(pos=("pos", "min"), provider=("provider", "first"), count=("pos", "size"),
+                                      scribes=("scribe", list), tasks=("task_label", list), positions=("pos", list)).reset_index()
+        dup_findings["detail"] = [list(zip(sc, tk, [p + 2 for p in ps])) for sc, tk, ps in
+                                  zip(dup_findings["scribes"], dup_findings["tasks"], dup_findings["positions"])]
+        dup_findings["rule"] = RULE_DUPLICATE_COVERAGE
+        parts.append(dup_findings)
+
+    findings = pd.concat([p for p in parts if len(p)], ignore_index=True) if any(len(p) for p in parts) else pd.DataFrame(columns=FINDING_COLUMNS + ["pos"])
+    findings["phase"] = (findings["rule"] == RULE_DUPLICATE_COVERAGE).astype(int) # Uniqueness findings come last
+    findings["lead_order"] = findings["lead"].map({lead: i for i, lead in enumerate(team_config.leads)})
+    findings = findings.sort_values(["lead_order", "phase", "pos"], kind="stable").reset_index(drop=True)
+    findings["ss2_row"] = findings["pos"] + 2
+    findings["task"] = findings["task_label"] if "task_label" in findings.columns else None
+    findings["severity"] = findings["rule"].map(lambda r: RULE_SEVERITY.get(r, "error"))
+    for col in FINDING_COLUMNS:
+        if col not in findings.columns: findings[col] = None
+    return findings[FINDING_COLUMNS]
+
+def render_finding(f):
+    """Formats one findings-table row as the report line shown to the user."""
+    d = f.date.strftime('%Y-%m-%d'); row = int(f.ss2_row)
+    if f.rule == RULE_RMS_COUNT_TASK:
+        return f"VALIDATION (RMS): '{f.provider}' on {d} (SS2 Row {row}), Excel count '{f.excel_value}', but SS2 Task '{f.task}' not Primary/Backup."
+    if f.rule == RULE_RMS_NO_COUNT:
+        return f"VALIDATION (RMS): SS2 (Row {row}) assigns Task '{f.task}' to '{f.provider}' on {d}, but Excel shows no positive count (found: '{f.excel_value}')."
+    if f.rule == RULE_SCRIBE_MISSING:
+        return f"VALIDATION (Non-RMS): SS2 Row {row}, Task '{f.task}', Scribe Name missing for Provider '{f.provider}'."
+    if f.rule == RULE_SS1_NO_ACTIVE:
+        details = f"(SS1 tasks: {', '.join(f.detail)})" if f.detail else "(SS1 no tasks)"
+        return f"VALIDATION (Non-RMS): SS2 (Row {row}: Scribe '{f.scribe}', Provider '{f.provider}') Task '{f.task}' on {d}, but no Primary/Backup in SS1. {details}"
+    if f.rule == RULE_SS1_MULTIPLE:
+        return f"VALIDATION (Non-RMS): Scribe '{f.scribe}' on {d} has multiple ({int(f.count)}) Primary/Backup in SS1. SS2 (Row {row}) for '{f.provider}' ambiguous."
+    if f.rule == RULE_SS1_PROVIDER:
+        return f"VALIDATION (Non-RMS): Scribe '{f.scribe}' on {d} (SS2 Row {row}), SS2 Provider '{f.provider}', but SS1 (Row {int(f.ss1_row)}) reports for '{f.ss1_provider}'."
+    if f.rule == RULE_SS1_TASK:
+        return f"VALIDATION (Non-RMS): SS1 (Row {int(f.ss1_row)}) reports Scribe '{f.scribe}' did '{f.ss1_task}' for '{f.ss1_provider}' on {d}, but SS2 Task (Row {row}) is '{f.task}'."
+    if f.rule == RULE_SS1_NO_ENTRIES:
+        return f"VALIDATION (Non-RMS): SS2 (Row {row}: Scribe '{f.scribe}', Provider '{f.provider}') Task '{f.task}' on {d}, but NO entries in SS1 for Scribe/Date."
+    if f.rule == RULE_DUPLICATE_COVERAGE:
+        details = "; ".join([f"Scribe '{scribe}' Task='{task}' (SS2 Row {r})" for scribe, task, r in f.detail])
+        return f"VALIDATION (Uniqueness): Provider '{f.provider}' on {d} has {int(f.count)} active coverages in SS2: {details}"
+    return f"VALIDATION ({f.rule}): SS2 Row {row}"
+
+def run_comprehensive_validation_checks(ss2_index, ss1_reports_map, excel_data_lookup_dict,
+                                        special_provider_full_names, my_managed_providers_list, cutoff_date):
+    if not ss2_index or len(ss2_index) == 0:
+        return ["Validation Aborted: Destination data (SS2) is empty."]
+    team_config = compile_team_config({"rms_providers": list(special_provider_full_names),
+                                       "leads": {DEFAULT_LEAD_NAME: {"managed_providers": list(my_managed_providers_list)}}})
+    findings = validation_findings(ss2_index, ss1_reports_map, excel_data_lookup_dict, team_config, cutoff_date)
+    return [render_finding(f) for f in findings.itertuples(index=False)]
+
+# --- Sheet access ---
+def get_sheet_data(gspread_client, spreadsheet_id, sheet_name_or_index, sheet_type="Destination", columns=None):
+    worksheet = open_worksheet(gspread_client, spreadsheet_id, sheet_name_or_index, sheet_type)
+    if worksheet is None: return None, None
+    try:
+        if columns: return get_projected_values(worksheet, columns), worksheet
+        return worksheet.get_all_values(), worksheet
+    except Exception as e:
+        notify.error(f"An unexpected error occurred reading {sheet_type} sheet (ID: {spreadsheet_id}, Tab: {sheet_name_or_index}): {e}")
+        traceback.print_exc()
+    return None, None
+
+def open_worksheet(gspread_client, spreadsheet_id, sheet_name_or_index, sheet_type="Destination"):
+    try:
+        # Explicitly use open_by_key as it's known to work in your environment
+        if hasattr(gspread_client, 'open_by_key'):
+            spreadsheet = gspread_client.open_by_key(spreadsheet_id)
+        elif hasattr(gspread_client, 'open_by_id'): # Fallback, though likely to fail for you
+            notify.warning(f"Attempting to use 'open_by_id' for {sheet_type} as 'open_by_key' was not found (this is unexpected).")
+            spreadsheet = gspread_client.open_by_id(spreadsheet_id)
+        else:
+            notify.error(f"CRITICAL: gspread client for {sheet_type} has neither 'open_by_key' nor 'open_by_id'.")
+            return None
+
+        # Proceed to get worksheet
+        if isinstance(sheet_name_or_index, int):
+            worksheet = spreadsheet.get_worksheet(sheet_name_or_index)
+        else:
+            worksheet = spreadsheet.worksheet(sheet_name_or_index)
+        
+        notify.info(f"Successfully accessed the sheet: '{worksheet.title}' in '{spreadsheet.title}'")
+        return worksheet
+
+    except gspread.exceptions.WorksheetNotFound:
+        notify.error(f"Error: Tab '{sheet_name_or_index}' not found in {sheet_type} Spreadsheet (ID: {spreadsheet_id}).")
+    except AttributeError as ae: # Catch the specific error if it still occurs
+        notify.error(f"AttributeError when trying to open {sheet_type} sheet (ID: {spreadsheet_id}, Tab: {sheet_name_or_index}): {ae}")
+        notify.error("This indicates an issue with the gspread client object's methods. Please ensure gspread is correctly installed and authenticated.")
+        traceback.print_exc() # For more detailed error in logs
+    except Exception as e:
+        notify.error(f"An unexpected error occurred opening {sheet_type} sheet (ID: {spreadsheet_id}, Tab: {sheet_name_or_index}): {e}")
+        traceback.print_exc()
+    return None
+
+MONTH_NAMES = list(calendar.month_name)[1:]
+
+def list_month_tabs(gspread_client, spreadsheet_id=DEST_SPREADSHEET_ID):
+    """Titles of the tabs named after a month ('May', 'October', ...), in spreadsheet order. Empty on failure."""
+    try:
+        worksheets = gspread_client.open_by_key(spreadsheet_id).worksheets()
+    except Exception as e:
+        notify.error(f"Could not list the month tabs of Destination SS2 (ID: {spreadsheet_id}): {e}")
+        traceback.print_exc(); return []
+    month_names = {m.lower() for m in MONTH_NAMES}
+    return [ws.title for ws in worksheets if ws.title.strip().lower() in month_names]
+
+# --- Incremental SS1 ingestion ---
+# 'Form responses 1' only grows at the bottom, so the projected SS1 rows are kept in a local SQLite store.
+# Each sync re-reads the last SS1_TAIL_CHECK_ROWS stored rows plus everything after them in one request;
+# if the re-read tail no longer matches what was stored, history was edited and the store is rebuilt.
+# Edits further up are invisible to that check, so the store is also rebuilt from the whole sheet on the first
+# sync of each day (IST) and whenever a caller forces it (the app's Rebuild SS1 cache button, the CLI's --resync-ss1).
+# The store also keeps a content digest chained over each appended batch; it fingerprints the SS1 rows for
+# SS1_INDEX_CACHE without hashing the whole sheet on every load.
+
+def _rows_digest(rows):
+    return hashlib.sha1(json.dumps(rows, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+def _extend_digest(previous_digest, new_rows):
+    """Chains a batch of appended rows onto a content digest. Equal digests mean the same rows in the same order."""
+    if not new_rows: return previous_digest
+    return hashlib.sha1((previous_digest + json.dumps(new_rows, ensure_ascii=False)).encode("utf-8")).hexdigest()
+
+def _open_ss1_store(path=SS1_STORE_PATH):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+    conn.execute("CREATE TABLE IF NOT EXISTS rows (row_num INTEGER PRIMARY KEY, data TEXT NOT NULL)")
+    return conn
+
+@instrumented_stage("SS1 sync", rows=lambda result, *args, **kwargs: result[1]["new_rows"])
+def sync_source_store(worksheet, spreadsheet_id, col_indices, store_path=SS1_STORE_PATH, force_full=False):
+    """
+    Brings the local SS1 store up to date with the worksheet and returns all stored rows (header included),
+    shaped like get_projected_values. Returns (rows, stats) where stats has 'mode' ('full'/'incremental'),
+    'new_rows' and 'digest' (content digest of the rows). force_full rebuilds the store from the whole sheet.
+    """
+    signature = json.dumps([spreadsheet_id, worksheet.title, list(col_indices)])
+    today = datetime.now(IST_TIMEZONE).date().isoformat()
+    conn = _open_ss1_store(store_path)
+    try:
+        with conn:
+            meta = dict(conn.execute("SELECT key, value FROM meta"))
+            watermark = conn.execute("SELECT COALESCE(MAX(row_num), 0) FROM rows").fetchone()[0]
+            full_resync = (force_full or meta.get("signature") != signature or watermark == 0 or "digest" not in meta
+                           or meta.get("full_sync_date") != today)
+            new_rows = []; start_row = 1
+
+            if not full_resync:
+                start_row = max(1, watermark - SS1_TAIL_CHECK_ROWS + 1)
+                fetched = get_projected_values(worksheet, col_indices, start_row=start_row)
+                stored_tail = [json.loads(d) for (d,) in conn.execute(
+                    "SELECT data FROM rows WHERE row_num >= ? ORDER BY row_num", (start_row,))]
+                fetched_tail = fetched[:len(stored_tail)]
+                if len(fetched_tail) < len(stored_tail) or _rows_digest(fetched_tail) != _rows_digest(stored_tail):
+                    full_resync = True
+                else:
+                    new_rows = fetched[len(stored_tail):]; start_row = watermark + 1
+
+            if full_resync:
+                new_rows = get_projected_values(worksheet, col_indices); start_row = 1
+                conn.execute("DELETE FROM rows")
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('signature', ?)", (signature,))
+                conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('full_sync_date', ?)", (today,))
+
+            digest = _extend_digest("" if full_resync else meta["digest"], new_rows)
+            conn.executemany("INSERT INTO rows (row_num, data) VALUES (?, ?)",
+                             [(start_row + i, json.dumps(r, ensure_ascii=False)) for i, r in enumerate(new_rows)])
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('digest', ?)", (digest,))
+            all_rows = [json.loads(d) for (d,) in conn.execute("SELECT data FROM rows ORDER BY row_num")]
+    finally:
+        conn.close()
+    count_event(f"SS1 sync {'full' if full_resync else 'incremental'}")
+    return all_rows, {"mode": "full" if full_resync else "incremental", "new_rows": len(new_rows), "digest": digest}
+
+def load_source_data(gspread_client, force_full=False):
+    """
+    Returns (rows, digest) for SS1 via the incremental store (rebuilt from the whole sheet if force_full), falling
+    back to a direct read if the store is unusable; (None, None) if SS1 cannot be read.
+    """
+    worksheet = open_worksheet(gspread_client, SOURCE_SPREADSHEET_ID, SOURCE_SHEET_INDEX, "Source SS1")
+    if worksheet is None: return None, None
+    try:
+        rows, stats = sync_source_store(worksheet, SOURCE_SPREADSHEET_ID, SRC_READ_COLUMNS, force_full=force_full)
+        return rows, stats["digest"]
+    except sqlite3.Error as e:
+        notify.warning(f"SS1 local store unavailable ({e}); reading the full sheet instead.")
+        traceback.print_exc()
+    except Exception as e:
+        notify.error(f"An unexpected error occurred reading Source SS1 sheet (ID: {SOURCE_SPREADSHEET_ID}): {e}")
+        traceback.print_exc(); return None, None
+    try:
+        rows = get_projected_values(worksheet, SRC_READ_COLUMNS)
+        return rows, _extend_digest("", rows)
+    except Exception as e:
+        notify.error(f"An unexpected error occurred reading Source SS1 sheet (ID: {SOURCE_SPREADSHEET_ID}): {e}")
+        traceback.print_exc()
+    return None, None
+
+# --- Snapshots ---
+# A month snapshot holds what one SS2 tab needs: its rows, worksheet and SS2Index, plus the SS1 rows and the SS1/Excel
+# lookups. The SS1/Excel part covers all months, so it is loaded once and shared: its lookups are partitioned by date,
+# and each month snapshot only gets the partitions for the dates that appear on its tab.
+LOAD_SOURCE_LABELS = {"ss2": "SS2 month tab", "ss1": "SS1 form responses", "excel": "SharePoint Excel"}
+LOAD_MAX_WORKERS = 6
+
+def _timed_call(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+def partition_by_date(mapping, date_pos):
+    """{date: {key: value}} for a dict keyed by tuples holding a date at date_pos."""
+    partitions = {}
+    for key, value in (mapping or {}).items(): partitions.setdefault(key[date_pos], {})[key] = value
+    return partitions
+
+def _view_for_dates(partitions, dates):
+    return {key: value for d in dates for key, value in partitions.get(d, {}).items()}
+
+@instrumented_stage("SS1 indexes", rows=lambda result, source_data, *args, **kwargs: max(0, len(source_data or ()) - 1))
+def _build_ss1_parts(source_data, cutoff_date):
+    return {"source_date_column": parse_date_column(_compact_source(source_data)[1:].column(SRC_COL_DATE_OF_SERVICE).tolist()),
+            "ss1_match_by_date": partition_by_date(build_ss1_match_index(source_data, cutoff_date), 1),
+            "ss1_validation_by_date": partition_by_date(build_ss1_validation_map(source_data, parse_date_flexible, cutoff_date), 0)}
+
+def build_shared_snapshot(source_data, source_digest, excel_data_lookup, cutoff_date):
+    """SS1/Excel part of a snapshot. The SS1 indexes come from SS1_INDEX_CACHE when the SS1 digest was seen before."""
+    if source_digest is None: ss1_parts = _build_ss1_parts(source_data, cutoff_date)
+    else: ss1_parts = SS1_INDEX_CACHE.get_or_compute((source_digest, cutoff_date), lambda: _build_ss1_parts(source_data, cutoff_date))
+    return {"source_data": source_data, "source_digest": source_digest, **ss1_parts,
+            "excel_by_date": partition_by_date(excel_data_lookup, 0) if excel_data_lookup is not None else None,
+            "cutoff_date": cutoff_date, "loaded_at": time.time()}
+
+def build_month_snapshot(dest_month_name, data_ss2, ws_ss2, shared, cutoff_date, previous=None):
+    reuse_index = previous is not None and previous["cutoff_date"] == cutoff_date and previous["dest_data"] == data_ss2
+    if reuse_index: ss2_index = previous["ss2_index"]; count_event("SS2 index reused")
+    else:
+        with stage("SS2 index", len(data_ss2) - 1): ss2_index = SS2Index(data_ss2)
+    tab_dates = set(filter(None, ss2_index.date))
+    return {
+        "month": dest_month_name, "dest_data": data_ss2, "dest_worksheet": ws_ss2, "ss2_index": ss2_index, "shared": shared,
+        "source_data": shared["source_data"], "source_date_column": shared["source_date_column"],
+        "ss1_match_index": _view_for_dates(shared["ss1_match_by_date"], tab_dates),
+        "ss1_validation_map": _view_for_dates(shared["ss1_validation_by_date"], tab_dates),
+        "excel_data_lookup": _view_for_dates(shared["excel_by_date"], tab_dates) if shared["excel_by_date"] is not None else None,
+        "cutoff_date": cutoff_date, "loaded_at": shared["loaded_at"] # Expires together with SS1/Excel
+    }
+
+def load_snapshots(gspread_client, dest_month_names, cutoff_date, shared=None, previous=None, on_loaded=None, thread_initializer=None,
+                   team_config=None, resync_source=False):
+    """
+    Loads the snapshots for several SS2 month tabs. The tabs, SS1 and the Excel workbook are all fetched concurrently;
+    SS1 and Excel are skipped when a current `shared` part is passed in; otherwise their indexes still come from the
+    fingerprint caches when the data did not change. previous maps month -> last snapshot of that tab, whose SS2
+    index is reused if the re-read tab is unchanged. on_loaded(label, seconds) is called as each
+    source finishes. resync_source rebuilds the local SS1 store from the whole sheet (when SS1 is loaded at all).
+    Returns ({month: snapshot or None}, shared); None marks a tab that could not be read.
+    """
+    previous = previous or {}
+    rms_provider_names = list((team_config or load_team_config()).rms_provider_names)
+    if shared is not None and shared.get("rms_provider_names") != rms_provider_names: shared = None # Excel lookup is per RMS list
+    pool = ThreadPoolExecutor(max_workers=min(LOAD_MAX_WORKERS, len(dest_month_names) + 2), thread_name_prefix="tl-load",
+                              initializer=thread_initializer)
+    futures = {_submit_in_context(pool, _timed_call, get_sheet_data, gspread_client, DEST_SPREADSHEET_ID, month,
+                                  "Destination SS2", DEST_READ_COLUMNS): ("ss2", month) for month in dest_month_names}
+    if shared is None:
+        futures[_submit_in_context(pool, _timed_call, load_source_data, gspread_client, resync_source)] = ("ss1", None)
+        futures[_submit_in_context(pool, _timed_call, load_and_map_excel_data, EXCEL_SHAREPOINT_URL, rms_provider_names,
+                                   parse_date_flexible, cutoff_date)] = ("excel", None)
+    results = {}; tabs = {}
+    try:
+        for future in as_completed(futures):
+            source, month = futures[future]
+            result, elapsed = future.result()
+            record_stage(f"load {LOAD_SOURCE_LABELS[source]}", elapsed)
+            if source == "ss2":
+                with stage("compact rows", len(result[0] or ())):
+                    tabs[month] = (CompactRows(result[0], DEST_READ_COLUMNS), result[1]) if result[0] and result[1] else None
+                if on_loaded: on_loaded(f"{LOAD_SOURCE_LABELS[source]} '{month}'", elapsed)
+                # If every requested tab turned out to be missing we stop right away without waiting for SS1/Excel
+                if len(tabs) == len(dest_month_names) and not any(tabs.values()): return dict.fromkeys(dest_month_names), shared
+            else:
+                results[source] = result
+                if on_loaded: on_loaded(LOAD_SOURCE_LABELS[source], elapsed)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    if shared is None:
+        source_data, source_digest = results["ss1"]
+        if source_data is not None:
+            with stage("compact rows", len(source_data)): source_data = CompactRows(source_data, SRC_READ_COLUMNS)
+        shared = build_shared_snapshot(source_data, source_digest, results["excel"][0], cutoff_date)
+        shared["rms_provider_names"] = rms_provider_names
+    return {month: build_month_snapshot(month, *tabs[month], shared, cutoff_date, previous.get(month)) if tabs[month] else None
+            for month in dest_month_names}, shared
+
+def load_snapshot(gspread_client, dest_month_name, cutoff_date, shared=None, previous=None, on_loaded=None, thread_initializer=None,
+                  team_config=None, resync_source=False):
+    """Single-tab load_snapshots. Returns (snapshot, shared), with snapshot None if the SS2 month tab cannot be read."""
+    snapshots, shared = load_snapshots(gspread_client, [dest_month_name], cutoff_date, shared,
+                                       {dest_month_name: previous} if previous else None, on_loaded, thread_initializer, team_config,
+                                       resync_source)
+    return snapshots[dest_month_name], shared
+
+
+# --- Update results ---
+# One row per applied change, Excel mismatch, SS1 R note or conflict; shown by the app and emitted by the CLI.
+UPDATE_KIND_CELLS, UPDATE_KIND_EXCEL_MISMATCH, UPDATE_KIND_SS1_R_INFO = "cell update", "excel mismatch", "ss1 R info"
+UPDATE_KIND_CONFLICT = "conflict"
+
+def update_results_table(plan, ss2_index, conflicts=()):
+    rows = []
+    for detail in sorted(plan.details, key=lambda x: (x["dr"], x["d"])):
+        source_type = "Excel" if detail["s"].startswith("Excel-") else "SS1"
+        pos = ss2_index.position(detail["dr"])
+        rows.append({"kind": UPDATE_KIND_CELLS, "date": datetime.strptime(detail["d"], '%Y-%m-%d').date(),
+                     "ss2_row": detail["dr"], "lead": ss2_index.lead[pos], "source": source_type, "scribe": detail["s"],
+                     "provider": ss2_index.provider[pos], "q": detail["qn"], "r": detail["rs"]})
+    rows += [{"kind": UPDATE_KIND_EXCEL_MISMATCH, "message": msg} for msg in plan.excel_mismatches]
+    rows += [{"kind": UPDATE_KIND_SS1_R_INFO, "message": msg} for msg in plan.ss1_r_info]
+    for c in conflicts:
+        pos = ss2_index.position(c.cell.row); col = gspread.utils.rowcol_to_a1(1, c.cell.col)[:-1]
+        rows.append({"kind": UPDATE_KIND_CONFLICT, "date": ss2_index.date[pos], "ss2_row": c.cell.row, "lead": ss2_index.lead[pos],
+                     "scribe": ss2_index.scribe[pos], "provider": ss2_index.provider[pos],
+                     "message": f"CONFLICT: SS2 Row {c.cell.row} column {col} is now '{c.current}' (planned '{c.cell.value}'). Not overwritten."})
+    return pd.DataFrame(rows, columns=["kind", "date", "ss2_row", "lead", "source", "scribe", "provider", "q", "r", "message"]).astype({"ss2_row": "Int64"})
+
+# --- Update and verify runs ---
+UpdateOutcome = namedtuple("UpdateOutcome", ["plan", "write", "conflicts", "already_set", "table", "updated_rows_count", "name_matches"])
+
+def mirror_into_snapshot(snapshot, cells):
+    """Keeps the snapshot in step with cells written to the sheet, so the next run does not re-plan them."""
+    dest_data, ss2_index = snapshot["dest_data"], snapshot["ss2_index"]
+    for cell in cells:
+        dest_data.set_cell(cell.row - 1, cell.col - 1, str(cell.value))
+        ss2_index.set_cell(cell.row, cell.col, cell.value)
+
+def snapshot_name_resolution(snapshot, team_config=None):
+    """resolve_ss1_names for the snapshot at the config's threshold, kept in the snapshot (its SS1 views and SS2 names do not change)."""
+    threshold = (team_config or load_team_config()).name_match_threshold
+    cached = snapshot.get("name_resolution")
+    if cached is None or cached[0] != threshold:
+        cached = snapshot["name_resolution"] = (threshold, resolve_ss1_names(snapshot["ss2_index"], snapshot["ss1_match_index"],
+                                                                            snapshot["ss1_validation_map"], threshold))
+    return cached[1]
+
+def run_update(snapshot, cutoff_date, team_config=None, dry_run=False):
+    """
+    Plans the Q/R updates for the snapshot's month (all rows, whatever their lead; the results table carries each
+    row's lead) and, unless dry_run, checks the target cells for conflicts and writes them. Progress is reported
+    through notify. Auto-resolved SS1 scribe names are used only if the team config's name_match_updates is set;
+    the outcome's name_matches says which were applied. Returns an UpdateOutcome; write is None when no write was attempted (nothing planned, or dry_run).
+    If the target cells cannot be re-read, nothing is written and write carries that error with every planned cell as failed.
+    """
+    dest_worksheet, ss2_index = snapshot["dest_worksheet"], snapshot["ss2_index"]
+    team_config = team_config or load_team_config()
+    names = snapshot_name_resolution(snapshot, team_config)
+    ss1_match_index = names.ss1_match_index if team_config.name_match_updates else snapshot["ss1_match_index"]
+    plan = plan_updates(ss2_index, ss1_match_index, snapshot["excel_data_lookup"], team_config.rms_providers, cutoff_date,
+                        prior_state=load_plan_state(DEST_SPREADSHEET_ID, dest_worksheet.title))
+    updates_to_make = plan.cells
+    write_result = None; conflicts = []; already_set = []
+
+    if not updates_to_make:
+        notify.info(f"No updates to apply to '{dest_worksheet.title}' based on current data.")
+    elif dry_run:
+        notify.info(f"Dry run: {len(updates_to_make)} cell updates to '{dest_worksheet.title}' were planned and not written.")
+    else:
+        notify.info(f"Attempting to apply {len(updates_to_make)} cell updates to '{dest_worksheet.title}'...")
+        try:
+            cells_to_write, conflicts, already_set = check_write_conflicts(dest_worksheet, updates_to_make)
+        except Exception as e:
+            notify.error(f"Could not re-read the target cells before writing, nothing was written: {e}")
+            traceback.print_exc(); write_result = WriteResult([], list(updates_to_make), e, 0, 0)
+        else:
+            mirror_into_snapshot(snapshot, already_set + [gspread.Cell(c.cell.row, c.cell.col, c.current) for c in conflicts])
+            if conflicts:
+                notify.warning(f"{len(conflicts)} cells were filled in on the sheet after the data was loaded and were left as they are (see Conflicts below).")
+            if already_set:
+                notify.info(f"{len(already_set)} cells already held the planned value (e.g. written by an interrupted run) and were skipped.")
+
+            write_result = write_cells_chunked(dest_worksheet, cells_to_write, on_chunk_committed=lambda cells: mirror_into_snapshot(snapshot, cells))
+            applied = len(write_result.written)
+            if write_result.retries:
+                notify.warning(f"Google Sheets throttled or failed {write_result.retries} time(s); those chunks were retried.")
+            if write_result.error is None:
+                notify.success(f"Successfully applied {applied} cell updates to '{dest_worksheet.title}'!")
+            else:
+                notify.error(f"Error applying updates to '{dest_worksheet.title}': {write_result.error}")
+                notify.warning(f"{applied} cells were written; {len(write_result.failed)} were not. Run the update again to resume.")
+
+    if not dry_run and (write_result is None or write_result.error is None):
+        save_plan_state(DEST_SPREADSHEET_ID, dest_worksheet.title, plan.state)
+    updated_rows = len(set(cell.row for cell in write_result.written)) if write_result else 0
+    name_matches = names.matches.assign(applied=team_config.name_match_updates & (names.matches["kind"] == "scribe"))
+    return UpdateOutcome(plan, write_result, conflicts, already_set, update_results_table(plan, ss2_index, conflicts), updated_rows,
+                         name_matches)
+
+def run_verify(snapshot, cutoff_date, team_config=None):
+    """
+    Validation findings table for the snapshot's month, for all configured leads (see validation_findings), with
+    SS1 names auto-resolved as in snapshot_name_resolution.
+    """
+    team_config = team_config or load_team_config()
+    names = snapshot_name_resolution(snapshot, team_config)
+    return validation_findings(snapshot["ss2_index"], names.ss1_validation_map, snapshot["excel_data_lookup"], team_config, cutoff_date,
+                               names.provider_aliases)
+
+def run_update_months(snapshots, cutoff_date, team_config=None, dry_run=False, thread_initializer=None):
+    """run_update for several month snapshots, one worker per tab (each writes to its own tab). Returns {month: UpdateOutcome}."""
+    with ThreadPoolExecutor(max_workers=min(LOAD_MAX_WORKERS, max(1, len(snapshots))), thread_name_prefix="tl-update",
+                            initializer=thread_initializer) as pool:
+        futures = {month: _submit_in_context(pool, run_update, snapshot, cutoff_date, team_config, dry_run)
+                   for month, snapshot in snapshots.items()}
+        return {month: future.result() for month, future in futures.items()}
+
+def run_verify_months(snapshots, cutoff_date, **kwargs):
+    """Combined findings table (with a 'month' column) for several month snapshots."""
+    return combine_month_tables({month: run_verify(snapshot, cutoff_date, **kwargs) for month, snapshot in snapshots.items()})
+
+def combine_month_tables(tables):
+    """Stacks per-month result tables into one, with the tab name in a leading 'month' column."""
+    frames = [table.assign(month=month) for month, table in tables.items()]
+    non_empty = [f for f in frames if len(f)]
+    if not non_empty: return frames[0] if frames else pd.DataFrame(columns=["month"])
+    combined = pd.concat(non_empty, ignore_index=True)
+    return combined[["month"] + [c for c in combined.columns if c != "month"]]